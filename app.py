@@ -1,14 +1,17 @@
 import config, os, json
+from typing import Optional
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 from config import get_settings
 from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi import Request, HTTPException, BackgroundTasks
+from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import Request, HTTPException
 from review_ai.utils import SuggestionRequest, SuggestionResult
-from review_ai.analysis import get_task_manager, download_result
+from review_ai.analysis import get_task_manager, analysis_hash
+from review_ai.responses import CompressionMiddleware, FastJSONResponse, encoded_response
 
 
 # Example location to check on full review analysis (only has 30 reviews) for faster testing
@@ -18,7 +21,6 @@ from review_ai.analysis import get_task_manager, download_result
 "Gypsy Hotel CUSAT"
 
 
-app = FastAPI()
 manager = get_task_manager(
     model =          get_settings().openai_model,
     delay =          get_settings().delay,                              
@@ -29,7 +31,49 @@ manager = get_task_manager(
     num_reviews =    get_settings().num_reviews,  
     serpapi_key =    get_settings().serpapi_key,                          
     num_suggestion = get_settings().num_suggestion,                       
+    serpapi_http2 =           get_settings().serpapi_http2,
+    serpapi_max_connections = get_settings().serpapi_max_connections,
+    review_store_ttl =        get_settings().review_store_ttl,
+    suggestion_cache_size =   get_settings().suggestion_cache_size,
+    suggestion_cache_ttl =    get_settings().suggestion_cache_ttl,
+    suggestion_cache_min_results = get_settings().suggestion_cache_min_results,
+    browser_pool_size =       get_settings().browser_pool_size,
+    embedded_workers =        get_settings().embedded_workers,
+    job_max_attempts =        get_settings().job_max_attempts,
+    job_lease_seconds =       get_settings().job_lease_seconds,
+    job_retention_days =      get_settings().job_retention_days,
+    stream_partial_results =  get_settings().stream_partial_results,
+    result_store_max_bytes =  get_settings().result_store_max_bytes,
+    result_store_ttl =        get_settings().result_store_ttl,
+    batch_token_budget =      get_settings().batch_token_budget,
+    combine_token_budget =    get_settings().combine_token_budget,
+    combine_max_fan_in =      get_settings().combine_max_fan_in,
+    instant_max_age =         get_settings().instant_max_age,
+    database_path =           get_settings().database_path,
+    fake_backends =           get_settings().fake_backends,
+    fake_serpapi_latency =    get_settings().fake_serpapi_latency,
+    fake_llm_latency =        get_settings().fake_llm_latency,
+    llm_concurrency =       get_settings().llm_concurrency,
+    llm_reserved_instant =  get_settings().llm_reserved_instant,
+    llm_model_concurrency = get_settings().llm_model_concurrency,
 )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the database pool and start the background tasks on startup, and close them on shutdown.
+
+    Args:
+        app (FastAPI): The application instance.
+    """
+    await manager.startup()
+    yield
+    await manager.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware, minimum_size=get_settings().compression_min_size)
 templates = Jinja2Templates(directory="review_ai/templates")
 app.mount("/static", StaticFiles(directory="review_ai/static"), name="static")
 
@@ -42,7 +86,6 @@ async def index(request: Request):
     Args:
         request (Request): The request object.
     """
-    await manager.start_cleanup_task()
     return templates.TemplateResponse("index.html", {"request": request})
 
 
@@ -57,7 +100,6 @@ async def analyze(request: Request):
     Returns:
         HTMLResponse: The rendered template as an HTML response.
     """
-    await manager.start_cleanup_task()
     return templates.TemplateResponse("analyze.html", {"request": request})
 
 
@@ -72,7 +114,6 @@ async def retrieve(request: Request):
     Returns:
         HTMLResponse: The rendered template as an HTML response.
     """
-    await manager.start_cleanup_task()
     return templates.TemplateResponse("retrieve.html", {"request": request})
 
 
@@ -94,19 +135,21 @@ async def autocomplete(request: SuggestionRequest):
             latitude=request.latitude if request.latitude is not None else 9.9185,
             longitude=request.longitude if request.longitude is not None else 76.2558,
         )
-        return JSONResponse(content=suggestion.model_dump())
+        return FastJSONResponse(content=suggestion.model_dump())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/analyze")
-async def analyze_restaurant(request: Request, background_tasks: BackgroundTasks):
+async def analyze_restaurant(request: Request):
     """
     Analyze a restaurant based on the provided dataId and analysisType.
 
+    A full analysis already saved is returned as is, unless `refresh` is true in which case it is updated with the reviews posted since.
+    An instant analysis is returned without its reviews if `fields` is "analysis", they can be paged through `/api/analysis/{dataId}/reviews?analysis_type=instant`.
+
     Args:
-        request (Request): The request object containing the dataId and analysisType.
-        background_tasks (BackgroundTasks): The background task manager for running the full analysis.
+        request (Request): The request object containing the dataId, analysisType and optionally refresh and fields.
 
     Returns:
         JSONResponse: A JSON response containing the analysis result or an error message if any exceptions occur.
@@ -122,17 +165,18 @@ async def analyze_restaurant(request: Request, background_tasks: BackgroundTasks
 
     if analysis_type == "instant":
         try:
-            review_result = await manager.get_instant_analysis(data_id) 
+            include_reviews = data.get("fields", "all") != "analysis"
+            review_result = await manager.get_instant_analysis(data_id, include_reviews=include_reviews) 
             #print(review_result)
             if isinstance(review_result, dict):
-                return JSONResponse(content=review_result)
-            return JSONResponse(content=review_result.model_dump())
+                return FastJSONResponse(content=review_result)
+            return Response(content=review_result.model_dump_json(exclude=None if include_reviews else {"reviews"}), media_type="application/json")
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     elif analysis_type == "full":
         try:
-            token = await manager.get_full_analysis(data_id, background_tasks)
-            return JSONResponse(content=token)
+            token = await manager.get_full_analysis(data_id, refresh=bool(data.get("refresh", False)))
+            return FastJSONResponse(content=token)
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     else:
@@ -140,51 +184,153 @@ async def analyze_restaurant(request: Request, background_tasks: BackgroundTasks
 
 
 @app.get("/api/analysis/{token}")
-async def get_analysis_result(token: str):
+async def get_analysis_result(token: str, request: Request, fields: str = "all"):
     """
     Retrieve the analysis result for the given token.
 
+    A completed result is served pre-encoded, compressed if the client accepts it, with an ETag: 
+    a matching `If-None-Match` header gets a 304 response.
+
     Args:
         token (str): The token of the analysis result to be retrieved.
+        request (Request): The request object, used for the `If-None-Match` and `Accept-Encoding` headers.
+        fields (str): "all" for the analysis with all its reviews, or "analysis" for the analysis alone, 
+            its reviews being paged through `/api/analysis/{token}/reviews`. Defaults to "all".
 
     Returns:
-        JSONResponse: A JSON response containing the analysis result or an error message if any exceptions occur.
+        Response: A JSON response containing the analysis result or an error message if any exceptions occur.
 
     Raises:
         HTTPException: If any exceptions occur during the retrieval of the analysis result.
     """
     try:
-        result = await manager.get_analysis_result(token)
+        result = await manager.get_encoded_result(token, fields="analysis" if fields == "analysis" else "all")
         # with open("output.json", "w") as f:
         #     f.write(json.dumps(result, indent=4))
         # with open("output.json", "r") as f:
         #     result = json.load(f)
-        return JSONResponse(content=result)
+        if isinstance(result, dict):
+            return FastJSONResponse(content=result)
+        return encoded_response(result, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@app.get("/api/analysis/{token}/reviews")
+async def get_analysis_reviews(token: str, analysis_type: str = "full", sort: str = "newest", limit: int = 20, cursor: Optional[str] = None, min_rating: Optional[float] = None, max_rating: Optional[float] = None, since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Retrieve a page of the reviews of the analysis for the given token.
+
+    Args:
+        token (str): The token of a full analysis, or the data ID of an instant analysis.
+        analysis_type (str): Either "full" or "instant". Defaults to "full".
+        sort (str): One of "newest", "oldest", "highest" and "lowest". Defaults to "newest".
+        limit (int): The number of reviews of the page, at most 100. Defaults to 20.
+        cursor (Optional[str]): The `next_cursor` of the previous page, omitted for the first page.
+        min_rating (Optional[float]): The lowest rating of the reviews.
+        max_rating (Optional[float]): The highest rating of the reviews.
+        since (Optional[str]): The earliest date of the reviews, e.g. `2024-01-31`.
+        until (Optional[str]): The latest date of the reviews, inclusive.
+
+    Returns:
+        JSONResponse: A JSON response containing the `reviews` of the page, the `next_cursor` (null on the last page) 
+        and the `total` number of reviews matching the filters.
+
+    Raises:
+        HTTPException: If there is no analysis for the token or the query is invalid.
+    """
+    try:
+        page = await manager.get_analysis_reviews(
+            token, analysis_type=analysis_type, sort=sort, limit=max(1, min(limit, 100)), cursor=cursor,
+            min_rating=min_rating, max_rating=max_rating, since=since, until=until,
+        )
+        return FastJSONResponse(content=page)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/analysis/{token}/events")
+async def stream_analysis_progress(token: str):
+    """
+    Stream the progress of the analysis for the given token as server-sent events.
+
+    Args:
+        token (str): The token of the analysis to follow.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` response sending a `progress` event each time the analysis advances, 
+        and a last `completed`, `failed` or `error` event before the stream is closed.
+    """
+    async def events():
+        try:
+            async for progress in manager.stream_progress(token):
+                event = progress["stage"] if progress["stage"] in ["completed", "failed"] else "progress"
+                yield f"event: {event}\ndata: {json.dumps(progress)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/stats")
+async def get_stats():
+    """
+    Return runtime counters of the task manager.
+
+    Returns:
+        JSONResponse: A JSON response containing the counters, e.g. how many analysis calls were coalesced.
+    """
+    return FastJSONResponse(content=manager.get_stats())
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Return the Prometheus metrics of the process: per-stage durations, LLM calls and tokens, cache hits, SerpApi pages and jobs.
+
+    Returns:
+        Response: The metrics in the Prometheus text exposition format.
+    """
+    return Response(content=await manager.get_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/api/download/{token}")
-async def download_analysis_result(token: str):
+async def download_analysis_result(token: str, request: Request, analysis_type: str = "full"):
     """
     Download the analysis result for the given token.
 
+    The report is served with an ETag derived from the analysis content, a matching `If-None-Match` header gets a 304 response.
+
     Args:
-        token (str): The token of the analysis result to be downloaded.
+        token (str): The token of the analysis result to be downloaded, the dataId for an instant analysis.
+        request (Request): The request object, used for the `If-None-Match` header.
+        analysis_type (str): "full" or "instant", the instant and full reports of a place are cached apart. Defaults to "full".
 
     Returns:
         Response: A response containing the analysis result or an error message if any exceptions occur.
 
     Raises:
-        HTTPException: If any exceptions occur during the download of the analysis result.
+        HTTPException: 404 if no instant analysis is saved for the dataId, or 500 if any other exception occurs during the download.
     """
     try:
-        pdf_content = await download_result(
-            token=token,
-            host=get_settings().host, 
-            port=get_settings().port, 
-        )
-        return Response(content=pdf_content, media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=analysis.pdf"})
+        if analysis_type == "instant":
+            # Only a saved instant analysis is downloaded, a download never starts one
+            saved = await manager.database.check_and_retrieve_place(token, "instant")
+            if not saved:
+                raise HTTPException(status_code=404, detail=f"No instant analysis saved for dataId: {token}")
+            result = saved[0]["analysis"]
+        else:
+            result = await manager.get_analysis_result(token)
+        if result.get("status") in ["in_progress", "failed"]:
+            raise ValueError(f"Analysis is not completed for token: {token}")
+        content_hash = analysis_hash(result)
+        etag = f'"{content_hash}"'
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers={"ETag": etag})
+        pdf_content = await manager.get_report_pdf(result, content_hash, analysis_type="instant" if analysis_type == "instant" else "full")
+        return Response(content=pdf_content, media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=analysis.pdf", "ETag": etag})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -195,5 +341,6 @@ if __name__ == "__main__":
         "app:app", 
         host=get_settings().host, 
         port=get_settings().port, 
-        reload=get_settings().reload
+        reload=get_settings().reload,
+        workers=get_settings().workers
     )
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+End-to-end benchmark of the `/api/analyze` instant and full analysis flows.
+
+By default the app runs in-process against the offline SerpApi and OpenAI stand-ins replaying `output.json`,
+with a throwaway database, so nothing is paid for:
+
+    python benchmarks/benchmark.py --flow both --requests 200 --concurrency 20 --llm-latency 1.5
+
+Pass `--url` to drive a running server instead, e.g. one started with `FAKE_BACKENDS=output.json`.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import httpx
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile of a list of values.
+
+    Args:
+        values (List[float]): The measured values.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 without values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+async def run_instant(client: httpx.AsyncClient, data_id: str) -> None:
+    response = await client.post("/api/analyze", json={"dataId": data_id, "analysisType": "instant"})
+    response.raise_for_status()
+
+
+async def run_full(client: httpx.AsyncClient, data_id: str) -> None:
+    response = await client.post("/api/analyze", json={"dataId": data_id, "analysisType": "full"})
+    response.raise_for_status()
+    token = response.json()["token"]
+    # Wait on the progress stream rather than polling the result
+    async with client.stream("GET", f"/api/analysis/{token}/events") as events:
+        event = None
+        async for line in events.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            if event in ["failed", "error"] and line.startswith("data: "):
+                raise RuntimeError(json.loads(line[len("data: "):]).get("error"))
+    if event != "completed":
+        raise RuntimeError(f"Progress stream ended with `{event}`")
+    response = await client.get(f"/api/analysis/{token}")
+    response.raise_for_status()
+
+
+FLOWS = {"instant": run_instant, "full": run_full}
+
+
+async def run_flow(client: httpx.AsyncClient, flow: str, requests: int, concurrency: int, places: int) -> Dict[str, Any]:
+    """
+    Run `requests` analyses of a flow, `concurrency` at a time, spread over `places` distinct data IDs.
+
+    Returns:
+        Dict[str, Any]: The number of requests and errors, the latency percentiles in milliseconds and the throughput.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(f"bench-{flow}-{run_id}-{i % places}")
+    latencies, errors = [], []
+
+    async def user():
+        while not queue.empty():
+            data_id = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                await FLOWS[flow](client, data_id)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors.append(repr(e))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "flow": flow,
+        "requests": requests,
+        "errors": len(errors),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "first_errors": errors[:3],
+    }
+
+
+async def main(args: argparse.Namespace) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    flows = ["instant", "full"] if args.flow == "both" else [args.flow]
+    manager = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        os.environ.setdefault("SERPAPI_KEY", "offline")
+        os.environ.setdefault("OPENAI_API_KEY", "offline")
+        os.environ["FAKE_BACKENDS"] = args.fixture
+        os.environ["FAKE_SERPAPI_LATENCY"] = str(args.serpapi_latency)
+        os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+        os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+        os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from app import app, manager
+        # The ASGI transport does not run the lifespan
+        await manager.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=args.timeout)
+
+    try:
+        reports = [await run_flow(client, flow, args.requests, args.concurrency, args.places or args.requests) for flow in flows]
+        stats = (await client.get("/api/stats")).json()
+    finally:
+        await client.aclose()
+        if manager is not None:
+            await manager.shutdown()
+    return reports, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the instant and full analysis flows")
+    parser.add_argument("--flow", choices=["instant", "full", "both"], default="both", help="Flow to benchmark")
+    parser.add_argument("--requests", type=int, default=50, help="Number of analyses per flow")
+    parser.add_argument("--concurrency", type=int, default=10, help="Number of analyses in flight")
+    parser.add_argument("--places", type=int, default=None, help="Number of distinct places, defaults to one per request (no cache hits)")
+    parser.add_argument("--url", default=None, help="Base URL of a running server, the app runs in-process with fake backends otherwise")
+    parser.add_argument("--fixture", default="output.json", help="Recorded analysis replayed by the fake backends")
+    parser.add_argument("--serpapi-latency", type=float, default=0.2, help="Latency in seconds of each fake SerpApi response")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Latency in seconds of each fake OpenAI completion")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Timeout in seconds of each request")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    reports, stats = asyncio.run(main(args))
+    if args.json:
+        print(json.dumps({"reports": reports, "stats": stats}, indent=2))
+    else:
+        print(f"\n{'flow':<8} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'req/s':>8}")
+        for report in reports:
+            print(f"{report['flow']:<8} {report['requests']:>8} {report['errors']:>6} {report['p50_ms']:>9} {report['p95_ms']:>9} {report['p99_ms']:>9} {report['mean_ms']:>9} {report['throughput_rps']:>8}")
+            for error in report["first_errors"]:
+                print(f"  error: {error}")
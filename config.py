@@ -1,6 +1,7 @@
 import os
 from pprint import pprint
 from dotenv import load_dotenv
+from typing import Dict
 from pydantic import BaseModel
 
 
@@ -10,25 +11,79 @@ load_dotenv()
 class Settings(BaseModel):
     port:           int                       # port to bind the server to
     host:           str                       # host to bind the server to
-    delay:          float = 0.5               # Delay in seconds between paginations through SerpApi reviews to avoid rate limiting
+    delay:          float = 0.5               # Initial delay in seconds between paginations through SerpApi reviews once rate limited, adapts to observed rate limits
     reload:         bool                      # Auto reload on file changes
+    workers:        int = 1                   # Number of web server processes, sharing analysis tokens, progress and results through the SQLite database
     country:        str = "uk"                # Country for searching places based of for autocomplete
-    batch_size:     int = 15                  # Batch size for doing full analysis
+    batch_size:     int = 15                  # Batch size for doing full analysis when BATCH_TOKEN_BUDGET is 0, and for incremental refreshes
     num_reviews:    int = 20                  # Number of reviews to analyze used in instant analysis
     max_reviews:    int = 100                 # Maximum number of reviews to consider for full analysis
     serpapi_key:    str                       # SerpApi API key
     openai_model:   str = "gpt-4o-mini" # OpenAI model to use for analysis
     num_suggestion: int = 5                   # Number of autocomplete suggestions to return
     openai_api_key: str                       # OpenAI API key
+    serpapi_http2:           bool = False     # Use HTTP/2 for SerpApi requests (requires the `h2` package)
+    serpapi_max_connections: int = 20         # Maximum number of keep-alive connections to SerpApi
+    review_store_ttl:        float = 3600     # Time in seconds stored reviews of a place are used without checking SerpApi for newer ones
+    suggestion_cache_size:   int = 1024       # Maximum number of autocomplete queries kept in the suggestion cache
+    suggestion_cache_ttl:    float = 600      # Time in seconds an autocomplete result stays in the suggestion cache
+    suggestion_cache_min_results: int = 1     # Minimum number of cached suggestions of a prefix a longer query must match to be served from them
+    browser_pool_size:       int = 2          # Number of warm browser contexts used to render PDF reports
+    embedded_workers:        int = 1          # Number of job workers running full analyses inside the web server, set to 0 when running `worker.py`
+    job_max_attempts:        int = 3          # Maximum number of times a full analysis job is tried before it is marked as failed
+    job_lease_seconds:       float = 60       # Time in seconds a job stays reserved for a worker that stopped renewing it before another worker takes it over
+    job_retention_days:      float = 7        # Time in days a finished job and its token are kept before they are deleted (0 to keep them forever)
+    stream_partial_results:  bool = True      # Publish each batch analysis of a full analysis as a provisional result as soon as it is ready
+    result_store_max_bytes:  int = 67108864   # Memory budget in bytes of the completed analysis results kept in memory, older results are read back from the database
+    result_store_ttl:        float = 86400    # Time in seconds a completed analysis result stays in memory
+    batch_token_budget:      int = 8000       # Maximum prompt tokens of a batch analysis request, reviews are packed into as few batches as fit (0 for fixed BATCH_SIZE batches)
+    combine_token_budget:    int = 12000      # Maximum prompt tokens of a call combining batch analyses
+    combine_max_fan_in:      int = 8          # Maximum number of batch analyses combined by one call
+    instant_max_age:         float = 86400    # Time in seconds an instant analysis stays fresh, a stale one is served while it is refreshed in the background (0 to never refresh)
+    compression_min_size:    int = 1024       # Size in bytes from which response bodies are compressed with gzip (or brotli when installed) for clients accepting it
+    database_path:           str = "reviews.db"  # Path of the SQLite database
+    fake_backends:           str = ""         # Path of a recorded analysis (e.g. `output.json`) replayed instead of calling SerpApi and OpenAI, for offline runs and benchmarks
+    fake_serpapi_latency:    float = 0.0      # Latency in seconds of each fake SerpApi response
+    fake_llm_latency:        float = 0.0      # Latency in seconds of each fake OpenAI completion
+    llm_concurrency:       int = 8            # Maximum number of LLM calls in flight across all models
+    llm_reserved_instant:  int = 2            # Number of LLM slots full analyses may not use, kept free for instant analyses
+    llm_model_concurrency: Dict[str, int] = {}  # Per-model LLM concurrency limits, given in `.env` as `model=limit,model=limit`
     
     def __init__(self, **data):
         if isinstance(data.get("port"), str):
             data["port"] = int(data["port"])
             data["delay"] = float(data["delay"])
+            data["workers"] = int(data["workers"])
             data["batch_size"] = int(data["batch_size"])
             data["num_reviews"] = int(data["num_reviews"])
             data["max_reviews"] = int(data["max_reviews"])
             data["num_suggestion"] = int(data["num_suggestion"])
+            data["serpapi_max_connections"] = int(data["serpapi_max_connections"])
+            data["review_store_ttl"] = float(data["review_store_ttl"])
+            data["suggestion_cache_size"] = int(data["suggestion_cache_size"])
+            data["suggestion_cache_ttl"] = float(data["suggestion_cache_ttl"])
+            data["suggestion_cache_min_results"] = int(data["suggestion_cache_min_results"])
+            data["browser_pool_size"] = int(data["browser_pool_size"])
+            data["embedded_workers"] = int(data["embedded_workers"])
+            data["job_max_attempts"] = int(data["job_max_attempts"])
+            data["job_lease_seconds"] = float(data["job_lease_seconds"])
+            data["job_retention_days"] = float(data["job_retention_days"])
+            data["result_store_max_bytes"] = int(data["result_store_max_bytes"])
+            data["result_store_ttl"] = float(data["result_store_ttl"])
+            data["batch_token_budget"] = int(data["batch_token_budget"])
+            data["combine_token_budget"] = int(data["combine_token_budget"])
+            data["combine_max_fan_in"] = int(data["combine_max_fan_in"])
+            data["instant_max_age"] = float(data["instant_max_age"])
+            data["compression_min_size"] = int(data["compression_min_size"])
+            data["fake_serpapi_latency"] = float(data["fake_serpapi_latency"])
+            data["fake_llm_latency"] = float(data["fake_llm_latency"])
+            data["llm_concurrency"] = int(data["llm_concurrency"])
+            data["llm_reserved_instant"] = int(data["llm_reserved_instant"])
+        if isinstance(data.get("llm_model_concurrency"), str):
+            data["llm_model_concurrency"] = {
+                model.strip(): int(limit) 
+                for model, limit in (item.split("=") for item in data["llm_model_concurrency"].split(",") if item.strip())
+            }
         super().__init__(**data)
         
     
@@ -42,6 +97,7 @@ def get_settings() -> Settings:
             host =           os.getenv("HOST", "0.0.0.0"),
             delay =          os.getenv("DELAY", 0.5),
             reload =         os.getenv("RELOAD", False),
+            workers =        os.getenv("WORKERS", 1),
             country =        os.getenv("COUNTRY", "uk"),
             batch_size =     os.getenv("BATCH_SIZE", 15),
             num_reviews =    os.getenv("NUM_REVIEWS", 20),
@@ -50,7 +106,32 @@ def get_settings() -> Settings:
             openai_model =   os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
             num_suggestion = os.getenv("NUM_SUGGESTION", 5),
             openai_api_key = os.getenv("OPENAI_API_KEY"),
-            
+            serpapi_http2 =           os.getenv("SERPAPI_HTTP2", False),
+            serpapi_max_connections = os.getenv("SERPAPI_MAX_CONNECTIONS", 20),
+            review_store_ttl =        os.getenv("REVIEW_STORE_TTL", 3600),
+            suggestion_cache_size =   os.getenv("SUGGESTION_CACHE_SIZE", 1024),
+            suggestion_cache_ttl =    os.getenv("SUGGESTION_CACHE_TTL", 600),
+            suggestion_cache_min_results = os.getenv("SUGGESTION_CACHE_MIN_RESULTS", 1),
+            browser_pool_size =       os.getenv("BROWSER_POOL_SIZE", 2),
+            embedded_workers =        os.getenv("EMBEDDED_WORKERS", 1),
+            job_max_attempts =        os.getenv("JOB_MAX_ATTEMPTS", 3),
+            job_lease_seconds =       os.getenv("JOB_LEASE_SECONDS", 60),
+            job_retention_days =      os.getenv("JOB_RETENTION_DAYS", 7),
+            stream_partial_results =  os.getenv("STREAM_PARTIAL_RESULTS", True),
+            result_store_max_bytes =  os.getenv("RESULT_STORE_MAX_BYTES", 67108864),
+            result_store_ttl =        os.getenv("RESULT_STORE_TTL", 86400),
+            batch_token_budget =      os.getenv("BATCH_TOKEN_BUDGET", 8000),
+            combine_token_budget =    os.getenv("COMBINE_TOKEN_BUDGET", 12000),
+            combine_max_fan_in =      os.getenv("COMBINE_MAX_FAN_IN", 8),
+            instant_max_age =         os.getenv("INSTANT_MAX_AGE", 86400),
+            compression_min_size =    os.getenv("COMPRESSION_MIN_SIZE", 1024),
+            database_path =           os.getenv("DATABASE_PATH", "reviews.db"),
+            fake_backends =           os.getenv("FAKE_BACKENDS", ""),
+            fake_serpapi_latency =    os.getenv("FAKE_SERPAPI_LATENCY", 0.0),
+            fake_llm_latency =        os.getenv("FAKE_LLM_LATENCY", 0.0),
+            llm_concurrency =       os.getenv("LLM_CONCURRENCY", 8),
+            llm_reserved_instant =  os.getenv("LLM_RESERVED_INSTANT", 2),
+            llm_model_concurrency = os.getenv("LLM_MODEL_CONCURRENCY", ""),
         )
     return SETTINGS
 
@@ -1,128 +1,1261 @@
 import aiosqlite
 import yaml, os, json
-from openai import OpenAI
+from openai import AsyncOpenAI
 from pprint import pprint
-import asyncio, uuid, httpx
-from datetime import datetime
-from fastapi import BackgroundTasks
+import asyncio, uuid, httpx, contextlib, time, hashlib, heapq, base64
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Hashable, Callable, Awaitable, Tuple, AsyncIterator
 from playwright.async_api import async_playwright
+from jinja2 import Environment, FileSystemLoader
 from review_ai.utils import (AnalysisResult, APIError, NoResultsError, 
-SuggestionResult, Review, Suggestion, DataProcessorError, HotelAnalysis)
-from review_ai.prompt import SYSTEM_PROMPT, DATA_PROMPT, BATCH_ANALYTICS_PROMPT
+SuggestionResult, Review, Suggestion, DataProcessorError, HotelAnalysis, HotelInsights)
+from review_ai.prompt import SYSTEM_PROMPT, DATA_PROMPT, BATCH_ANALYTICS_PROMPT, INTEGRATION_PROMPT
+from review_ai.jobs import JobWorker
+from review_ai.metrics import METRICS, STAGE_SECONDS, LLM_TOKENS, LLM_CALLS, timed
+from review_ai.sentiment import SentimentScorer
+from review_ai import codec
+
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into a single in-flight coroutine.
+
+    The first caller for a key starts the work, every caller arriving while it is still running
+    awaits the same task instead of starting its own SerpApi pagination and LLM calls.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize a `SingleFlight` instance with empty counters.
+        """
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def attach(self, key: Hashable) -> Optional[asyncio.Task]:
+        """
+        Attach to the running task for the given key, counting the call as coalesced.
+
+        Args:
+        - key (Hashable): The key identifying the work, e.g. `(data_id, analysis_type)`.
+
+        Returns:
+        - Optional[asyncio.Task]: The running task for the key, or None if nothing is in flight.
+        """
+        task = self._in_flight.get(key)
+        if task is None or task.done():
+            return None
+        self.calls += 1
+        self.coalesced += 1
+        return task
+
+    def launch(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Tuple[asyncio.Task, bool]:
+        """
+        Start the work for the given key unless it is already in flight.
+
+        Args:
+        - key (Hashable): The key identifying the work, e.g. `(data_id, analysis_type)`.
+        - fn (Callable[..., Awaitable[Any]]): The coroutine function to run if nothing is in flight for the key.
+        - *args, **kwargs: Arguments passed to `fn`.
+
+        Returns:
+        - Tuple[asyncio.Task, bool]: The task doing the work and whether it was started by this call.
+        """
+        task = self.attach(key)
+        if task is not None:
+            return task, False
+
+        self.calls += 1
+        self.executions += 1
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        self._in_flight[key] = task
+
+        def _forget(done_task: asyncio.Task) -> None:
+            if self._in_flight.get(key) is done_task:
+                del self._in_flight[key]
+        task.add_done_callback(_forget)
+        return task, True
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run the work for the given key, or await the already running task for it.
+
+        The shared task is shielded so a cancelled caller does not cancel the work for the other callers.
+
+        Args:
+        - key (Hashable): The key identifying the work, e.g. `(data_id, analysis_type)`.
+        - fn (Callable[..., Awaitable[Any]]): The coroutine function to run if nothing is in flight for the key.
+        - *args, **kwargs: Arguments passed to `fn`.
+
+        Returns:
+        - Any: The result of the shared task. Exceptions raised by the task are raised to every caller.
+        """
+        task, _ = self.launch(key, fn, *args, **kwargs)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the single-flight counters.
+
+        Returns:
+        - Dict[str, int]: The number of calls, executions actually started, calls coalesced into an in-flight task and currently in-flight keys.
+        """
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": sum(1 for task in self._in_flight.values() if not task.done()),
+        }
+
+
+
+class SuggestionCache:
+    """
+    A bounded in-memory LRU cache with TTL for autocomplete suggestions.
+
+    Entries are keyed by the normalized query, a coarse latitude/longitude grid cell and the type filter.
+    A query missing from the cache can still be answered locally from a cached shorter prefix of it,
+    by filtering the cached suggestions with the longer query.
+    """
+    def __init__(self, max_size: int=1024, ttl: float=600, grid_size: float=0.5, min_results: int=1) -> None:
+        """
+        Initialize a `SuggestionCache` instance.
+
+        Args:
+        - max_size (int): The maximum number of cached queries before the least recently used one is evicted. Defaults to 1024.
+        - ttl (float): The time in seconds a cached entry stays valid. Defaults to 600.
+        - grid_size (float): The size in degrees of the latitude/longitude grid cells. Defaults to 0.5.
+        - min_results (int): The minimum number of suggestions a prefix entry must still match to answer a longer query. Defaults to 1, 
+          a longer query usually narrows the suggestions of its prefix down to a few.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.grid_size = grid_size
+        self.min_results = min_results
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normalize a query by lowercasing it and collapsing whitespace.
+
+        Args:
+        - query (str): The query to normalize.
+
+        Returns:
+        - str: The normalized query.
+        """
+        return " ".join(query.lower().split())
+
+    def _key(self, query: str, latitude: float, longitude: float, filter: Optional[str]) -> Tuple[str, int, int, Optional[str]]:
+        return (query, int(latitude // self.grid_size), int(longitude // self.grid_size), filter)
+
+    def _lookup(self, key: Tuple) -> Optional[SuggestionResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def get(self, query: str, latitude: float, longitude: float, filter: Optional[str]=None) -> Optional[SuggestionResult]:
+        """
+        Get the cached suggestions for a query, either directly or filtered from a cached shorter prefix.
+
+        Args:
+        - query (str): The search query.
+        - latitude (float): The latitude of the location of the query.
+        - longitude (float): The longitude of the location of the query.
+        - filter (str): An optional suggestion type filter.
+
+        Returns:
+        - Optional[SuggestionResult]: The cached suggestions, or None on a cache miss.
+        """
+        query = self.normalize(query)
+        if (result := self._lookup(self._key(query, latitude, longitude, filter))) is not None:
+            self.hits += 1
+            return result
+
+        tokens = query.split()
+        for end in range(len(query) - 1, 0, -1):
+            prefix_result = self._lookup(self._key(query[:end], latitude, longitude, filter))
+            if prefix_result is None:
+                continue
+            matches = [
+                suggestion for suggestion in prefix_result.suggestions
+                if all(token in f"{suggestion.value} {suggestion.subtext}".lower() for token in tokens)
+            ]
+            if len(matches) >= self.min_results:
+                self.prefix_hits += 1
+                result = SuggestionResult(status=prefix_result.status, created_at=prefix_result.created_at, suggestions=matches)
+                self.put(query, latitude, longitude, result, filter)
+                return result
+
+        self.misses += 1
+        return None
+
+    def put(self, query: str, latitude: float, longitude: float, result: SuggestionResult, filter: Optional[str]=None) -> None:
+        """
+        Cache the suggestions of a query, evicting the least recently used entry if the cache is full.
+
+        Args:
+        - query (str): The search query.
+        - latitude (float): The latitude of the location of the query.
+        - longitude (float): The longitude of the location of the query.
+        - result (SuggestionResult): The suggestions to cache, ideally untruncated so longer queries can be filtered from them.
+        - filter (str): An optional suggestion type filter.
+        """
+        key = self._key(self.normalize(query), latitude, longitude, filter)
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters.
+
+        Returns:
+        - Dict[str, int]: The number of direct hits, prefix hits, misses, evictions, expirations and cached entries.
+        """
+        return {
+            "hits": self.hits,
+            "prefix_hits": self.prefix_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries),
+        }
+
+
+
+class EncodedResult:
+    """
+    A completed analysis result, or a projection of it, encoded once as a JSON response body with its compressed variants and ETag,
+    so serving it again is only a copy of bytes.
+    """
+    __slots__ = ("body", "variants", "etag")
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        """
+        Initialize an `EncodedResult` instance.
+
+        Args:
+        - data (Dict[str, Any]): The JSON-serializable result.
+        """
+        self.body = codec.dumps(data)
+        self.variants = codec.compress_variants(self.body)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()}"'
+
+    @property
+    def size(self) -> int:
+        """
+        The number of bytes held, the body and its compressed variants.
+        """
+        return len(self.body) + sum(len(variant) for variant in self.variants.values())
+
+
+
+class ResultStore:
+    """
+    A bounded in-memory store of completed analysis results by token, with a byte budget, LRU eviction and TTL.
+    Each result is kept only as its `EncodedResult`, so the byte budget bounds the memory held, by token and fields: 
+    "all" for the whole result, "analysis" for its projection without reviews.
+
+    Expiry goes through a heap ordered by expiry time, so expired results are dropped without scanning the whole store.
+    Evicted or expired results are not lost, they are rehydrated from the database by the task manager on the next request.
+    Results are stored with a version, the job that produced them, so a result updated by another process is not served stale.
+    """
+    def __init__(self, max_bytes: int=64 * 1024 * 1024, ttl: float=86400) -> None:
+        """
+        Initialize a `ResultStore` instance.
+
+        Args:
+        - max_bytes (int): The approximate memory budget in bytes, measured as the size of the encoded results and their compressed variants. Defaults to 64 MiB.
+        - ttl (float): The time in seconds a result stays in the store. Defaults to 86400.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._expiry_heap: List[Tuple[float, Tuple[str, str]]] = []
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        _, size, _, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def expire(self) -> None:
+        """
+        Drop the results whose TTL is over.
+        """
+        now = time.monotonic()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            # Heap entries of replaced results are stale and skipped
+            if entry is not None and entry[0] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+
+    def lookup(self, token: str, version: Optional[int]=None, fields: str="all") -> Optional[EncodedResult]:
+        """
+        Get the encoded result of a token, counting a hit or a miss.
+
+        Args:
+        - token (str): The token of the analysis.
+        - version (Optional[int]): The version the result must have, a result of another version is dropped as stale. Defaults to None, any version.
+        - fields (str): "all" for the whole result, or "analysis" for the result without its reviews. Defaults to "all".
+
+        Returns:
+        - Optional[EncodedResult]: The encoded result, or None if it is not in the store.
+        """
+        self.expire()
+        key = (token, fields)
+        entry = self._entries.get(key)
+        if entry is not None and version is not None and entry[3] != version:
+            self._remove(key)
+            self.stale += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def get(self, token: str, version: Optional[int]=None, fields: str="all") -> Optional[Dict[str, Any]]:
+        """
+        Get the result of a token, decoded from its encoded form.
+
+        Args:
+        - token (str): The token of the analysis.
+        - version (Optional[int]): The version the result must have, see `lookup`. Defaults to None, any version.
+        - fields (str): "all" for the whole result, or "analysis" for the result without its reviews. Defaults to "all".
+
+        Returns:
+        - Optional[Dict[str, Any]]: The result, or None if it is not in the store.
+        """
+        encoded = self.lookup(token, version, fields)
+        return codec.loads(encoded.body) if encoded is not None else None
+
+    def encoded(self, token: str, fields: str="all") -> Optional[EncodedResult]:
+        """
+        Get the encoded result of a token, without counting a lookup nor refreshing its recency.
+
+        Args:
+        - token (str): The token of the analysis.
+        - fields (str, optional): "all" for the whole result, or "analysis" for the result without its reviews. Defaults to "all".
+
+        Returns:
+        - Optional[EncodedResult]: The encoded result, or None if it is not in the store.
+        """
+        entry = self._entries.get((token, fields))
+        return entry[2] if entry is not None else None
+
+    def put(self, token: str, data: Dict[str, Any], version: Optional[int]=None, fields: str="all") -> EncodedResult:
+        """
+        Store the result of a token, evicting the least recently used results until the store fits its byte budget.
+
+        Args:
+        - token (str): The token of the analysis.
+        - data (Dict[str, Any]): The JSON-serializable result.
+        - version (Optional[int]): The version of the result, checked by `get`. Defaults to None.
+        - fields (str): "all" for the whole result, or "analysis" for the result without its reviews. Defaults to "all".
+
+        Returns:
+        - EncodedResult: The encoded result, even if it was too large to be stored.
+        """
+        self.expire()
+        key = (token, fields)
+        if key in self._entries:
+            self._remove(key)
+        encoded = EncodedResult(data)
+        size = encoded.size
+        if size > self.max_bytes:
+            return encoded
+        expires_at = time.monotonic() + self.ttl
+        self._entries[key] = (expires_at, size, encoded, version)
+        self.size_bytes += size
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            # Drop the stale heap entries left by replaced and evicted results
+            self._expiry_heap = [(expires_at, key) for key, (expires_at, *_) in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+        return encoded
+
+    def pop(self, token: str) -> None:
+        """
+        Remove the results of a token, if any.
+
+        Args:
+        - token (str): The token of the analysis.
+        """
+        for fields in ["all", "analysis"]:
+            if (token, fields) in self._entries:
+                self._remove((token, fields))
+
+    def __contains__(self, token: str) -> bool:
+        return (token, "all") in self._entries or (token, "analysis") in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the store counters.
+
+        Returns:
+        - Dict[str, int]: The number of hits, misses, evictions, expirations, results dropped as stale, stored results and their size in bytes.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale": self.stale,
+            "size": len(self._entries),
+            "size_bytes": self.size_bytes,
+        }
 
 
 
 class DataBase:
     """
     A class to handle asynchronous SQLite database operations for storing and retrieving place reviews for place data_id.
+
+    The database keeps a pool of long-lived reader connections and a single writer connection fed by a write queue,
+    so requests do not pay for opening a new connection (and its background thread) every time.
     """
-    def __init__(self, database_name: str = "reviews.db") -> None:
+    PRAGMAS = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA mmap_size=134217728",
+        "PRAGMA busy_timeout=5000",
+    ]
+    # The key columns of each order of the review index, the last one making the keys unique for keyset pagination
+    REVIEW_SORTS = {
+        "newest": (["iso_date", "position"], "DESC"),
+        "oldest": (["iso_date", "position"], "ASC"),
+        "highest": (["rating", "iso_date", "position"], "DESC"),
+        "lowest": (["-rating", "iso_date", "position"], "DESC"),
+    }
+
+    def __init__(self, database_name: str = "reviews.db", pool_size: int = 4) -> None:
         """
         Initialize a `DataBase` instance.
 
         Args:
         - database_name (str, optional): The name of the SQLite database file to use. Defaults to "reviews.db".
+        - pool_size (int, optional): The number of reader connections kept open. Defaults to 4.
         """
+        self.pool_size = pool_size
         self.database_name = database_name
         self.full_table_name = "review_analysis_full"
         self.instant_table_name = "review_analysis_instant"
+        self.report_table_name = "report_pdf_cache"
+        self.reviews_table_name = "reviews"
+        self.places_table_name = "places"
+        self.jobs_table_name = "jobs"
+        self.review_index_table_name = "analysis_reviews"
+
+        self._writer = None
+        self._writer_task = None
+        self._write_queue = None
+        self._readers = None
+        self._connections = []
+        self._connect_lock = asyncio.Lock()
+        # Set when a job is queued, to wake up the job workers of this process without waiting for their next poll
+        self.jobs_available = asyncio.Event()
+
+        # Statements are built once so sqlite's per-connection statement cache can reuse them
+        self._select_sql = {
+            analysis_type: f"SELECT data_id, analysis, created_at, refreshed_at, reviews, reviews_codec FROM {table_name} WHERE data_id = ?"
+            for analysis_type, table_name in [("instant", self.instant_table_name), ("full", self.full_table_name)]
+        }
+        self._select_record_sql = {
+            analysis_type: f"SELECT data_id, analysis, created_at, refreshed_at FROM {table_name} WHERE data_id = ?"
+            for analysis_type, table_name in [("instant", self.instant_table_name), ("full", self.full_table_name)]
+        }
+        # A replaced analysis keeps the time it was first created
+        self._upsert_sql = {
+            analysis_type: f"""
+                INSERT INTO {table_name} (data_id, analysis, created_at, refreshed_at, reviews, reviews_codec) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (data_id) DO UPDATE SET 
+                    analysis = excluded.analysis, refreshed_at = excluded.refreshed_at, 
+                    reviews = excluded.reviews, reviews_codec = excluded.reviews_codec
+            """
+            for analysis_type, table_name in [("instant", self.instant_table_name), ("full", self.full_table_name)]
+        }
+        self._select_report_sql = f"SELECT pdf FROM {self.report_table_name} WHERE data_id = ? AND analysis_type = ? AND content_hash = ?"
+        self._upsert_report_sql = f"INSERT OR REPLACE INTO {self.report_table_name} (data_id, analysis_type, content_hash, pdf, created_at) VALUES (?, ?, ?, ?, ?)"
+        self._delete_report_sql = f"DELETE FROM {self.report_table_name} WHERE data_id = ? AND analysis_type = ?"
+        self._select_reviews_sql = f"SELECT review_id, iso_date, rating, user, text FROM {self.reviews_table_name} WHERE data_id = ? ORDER BY iso_date DESC"
+        self._insert_review_sql = f"INSERT OR IGNORE INTO {self.reviews_table_name} (data_id, review_id, iso_date, rating, user, text) VALUES (?, ?, ?, ?, ?, ?)"
+        self._select_place_sql = f"SELECT data_id, type, title, rating, address, total_reviews, status, created_at, updated_at FROM {self.places_table_name} WHERE data_id = ?"
+        self._upsert_place_sql = f"INSERT OR REPLACE INTO {self.places_table_name} (data_id, type, title, rating, address, total_reviews, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        self._job_columns = "id, token, data_id, kind, payload, status, priority, attempts, max_attempts, lease_owner, lease_until, error, progress, partial, created_at, updated_at"
+        self._insert_job_sql = f"INSERT OR IGNORE INTO {self.jobs_table_name} (token, data_id, kind, payload, status, priority, attempts, max_attempts, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, 0, ?, ?, ?, ?) RETURNING {self._job_columns}"
+        self._select_active_job_sql = f"SELECT {self._job_columns} FROM {self.jobs_table_name} WHERE data_id = ? AND kind = ? AND status IN ('queued', 'running')"
+        self._select_job_sql = f"SELECT {self._job_columns} FROM {self.jobs_table_name} WHERE token = ? ORDER BY id DESC LIMIT 1"
+        self._lease_job_sql = f'''
+            UPDATE {self.jobs_table_name} SET status = 'running', lease_owner = ?, lease_until = ?, attempts = attempts + 1, progress = NULL, partial = NULL, updated_at = ?
+            WHERE id = (
+                SELECT id FROM {self.jobs_table_name}
+                WHERE (status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_until < ?)
+                ORDER BY priority DESC, id LIMIT 1
+            )
+            RETURNING {self._job_columns}
+        '''
+        self._renew_lease_sql = f"UPDATE {self.jobs_table_name} SET lease_until = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running' RETURNING id"
+        self._update_job_progress_sql = f"UPDATE {self.jobs_table_name} SET progress = ?, updated_at = ? WHERE id = ? AND lease_owner = ?"
+        self._update_job_partial_sql = f"UPDATE {self.jobs_table_name} SET partial = ?, updated_at = ? WHERE id = ? AND lease_owner = ?"
+        self._finish_job_sql = f"UPDATE {self.jobs_table_name} SET status = ?, error = ?, partial = NULL, lease_owner = NULL, lease_until = NULL, available_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ?"
+        self._count_jobs_sql = f"SELECT status, COUNT(*) FROM {self.jobs_table_name} GROUP BY status"
+        self._delete_finished_jobs_sql = f"DELETE FROM {self.jobs_table_name} WHERE status IN ('completed', 'failed') AND updated_at < ? RETURNING id"
+        self._delete_review_index_sql = f"DELETE FROM {self.review_index_table_name} WHERE data_id = ? AND kind = ?"
+        self._insert_review_index_sql = f"INSERT INTO {self.review_index_table_name} (data_id, kind, position, user, date, iso_date, rating, review_text) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+        self._has_review_index_sql = f"SELECT 1 FROM {self.review_index_table_name} WHERE data_id = ? AND kind = ? LIMIT 1"
+
+    @property
+    def is_connected(self) -> bool:
+        """
+        Whether the connection pool is open.
+        """
+        return self._writer is not None
+
+    async def _open_connection(self) -> aiosqlite.Connection:
+        """
+        Open a new SQLite connection with the tuned pragmas applied.
+
+        Returns:
+        - aiosqlite.Connection: The opened connection.
+        """
+        conn = await aiosqlite.connect(self.database_name, cached_statements=256)
+        for pragma in self.PRAGMAS:
+            await conn.execute(pragma)
+        self._connections.append(conn)
+        return conn
+
+    async def connect(self) -> None:
+        """
+        Open the writer connection and the reader pool, create the tables and start the writer queue.
+
+        Calling this method on an already connected database does nothing.
+        """
+        async with self._connect_lock:
+            if self.is_connected:
+                return
+            writer = await self._open_connection()
+            self._writer = writer
+            await self.create_tables()
+
+            self._readers = asyncio.Queue()
+            for _ in range(self.pool_size):
+                self._readers.put_nowait(await self._open_connection())
+
+            self._write_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def close(self) -> None:
+        """
+        Flush the pending writes and close every connection of the pool.
+        """
+        async with self._connect_lock:
+            if not self.is_connected:
+                return
+            await self._write_queue.put(None)
+            await self._writer_task
+            for conn in self._connections:
+                await conn.close()
+            self._connections = []
+            self._writer = None
+            self._readers = None
+            self._writer_task = None
+            self._write_queue = None
+
+    async def _ensure_connected(self) -> None:
+        if not self.is_connected:
+            await self.connect()
+
+    @contextlib.asynccontextmanager
+    async def _reader(self):
+        """
+        Borrow a reader connection from the pool for the duration of the context.
+        """
+        await self._ensure_connected()
+        conn = await self._readers.get()
+        try:
+            with STAGE_SECONDS.time(stage="db_read"):
+                yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def _writer_loop(self) -> None:
+        """
+        Consume the write queue on the single writer connection.
+
+        Every write waiting in the queue is executed and committed in one transaction,
+        then each caller is resolved with its own outcome, its error included. The statements of a write
+        run in order inside a savepoint, so a failing statement rolls back the whole write and nothing else.
+        """
+        running = True
+        while running:
+            jobs = [await self._write_queue.get()]
+            while not self._write_queue.empty():
+                jobs.append(self._write_queue.get_nowait())
+            if None in jobs:
+                running = False
+                jobs = [job for job in jobs if job is not None]
+
+            outcomes = []
+            for statements, future in jobs:
+                try:
+                    if not self._writer.in_transaction:
+                        await self._writer.execute("BEGIN")
+                    await self._writer.execute("SAVEPOINT write")
+                    results = []
+                    try:
+                        for sql, params, many in statements:
+                            if many:
+                                await self._writer.executemany(sql, params)
+                                results.append([])
+                            else:
+                                async with self._writer.execute(sql, params) as cursor:
+                                    results.append(await cursor.fetchall())
+                    except Exception:
+                        await self._writer.execute("ROLLBACK TO write")
+                        raise
+                    finally:
+                        await self._writer.execute("RELEASE write")
+                    outcomes.append((future, results, None))
+                except Exception as e:
+                    # Any error, e.g. an integer parameter overflowing, fails its own write only and the loop goes on
+                    outcomes.append((future, None, e))
+            try:
+                if jobs:
+                    await self._writer.commit()
+            except Exception as e:
+                outcomes = [(future, results, error or e) for future, results, error in outcomes]
+
+            for future, results, error in outcomes:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(results)
+                else:
+                    future.set_exception(error)
+
+    async def _write(self, sql: str, params: Any = (), many: bool = False) -> List[tuple]:
+        """
+        Queue a write statement for the writer connection and wait until it is committed.
+
+        Args:
+        - sql (str): The statement to execute.
+        - params (Any): The statement parameters, or a sequence of parameters if `many` is True.
+        - many (bool): Whether to run the statement with `executemany`. Defaults to False.
+
+        Returns:
+        - List[tuple]: The rows returned by the statement, e.g. with a `RETURNING` clause. Always empty if `many` is True.
+
+        Raises:
+        - aiosqlite.Error: If the statement or the commit fails.
+        """
+        return (await self._write_all([(sql, params, many)]))[0]
+
+    async def _write_all(self, statements: List[Tuple[str, Any, bool]]) -> List[List[tuple]]:
+        """
+        Queue write statements for the writer connection, run in order as a single write, and wait until they are committed.
+        Either every statement is committed or none is.
+
+        Args:
+        - statements (List[Tuple[str, Any, bool]]): The `sql`, `params` and `many` arguments of each statement, as taken by `_write`.
+
+        Returns:
+        - List[List[tuple]]: The rows returned by each statement.
+
+        Raises:
+        - aiosqlite.Error: If any statement or the commit fails.
+        """
+        await self._ensure_connected()
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((statements, future))
+        with STAGE_SECONDS.time(stage="db_write"):
+            return await future
 
     async def create_tables(self) -> None:
         """
-        Create SQLite tables to store review analysis results.
+        Create SQLite tables to store review analysis results.
+
+        Two tables are created: review_analysis_instant and review_analysis_full.
+        Each table has six columns: `data_id`, `analysis`, `created_at`, `refreshed_at`, `reviews` and `reviews_codec`.
+        The `data_id` column is the primary key.
+        The `analysis` column stores the JSON-serialized review analysis result without its reviews,
+        which are stored compressed in the `reviews` column, encoded with the codec named in `reviews_codec` (see `review_ai.codec`).
+        The `created_at` and `refreshed_at` columns store the unix times the analysis was first saved and last replaced.
+        Columns are added to tables created before they existed. The analyses already saved then have no timestamps,
+        and keep their reviews inline in the `analysis` column.
+
+        The report_pdf_cache table stores the last rendered PDF report of each `data_id` and analysis type,
+        along with the hash of the analysis it was rendered from. A cache created before it was keyed by analysis type is dropped.
+
+        The reviews table stores every raw review fetched from SerpApi, keyed by `data_id` and `review_id`,
+        and the places table stores the place information of each `data_id` with the time it was last fetched.
+
+        The jobs table is the durable queue of full analyses, at most one job per `data_id` and kind can be queued or running.
+
+        The analysis_reviews table indexes the reviews of each saved analysis by `data_id` and kind, 
+        so they can be paginated, sorted and filtered without decoding the whole analysis.
+
+        The tables are created if they do not already exist. If the tables already exist, this method does nothing.
+        It runs directly on the writer connection and is called once by `connect`.
+        """
+        for table_name in [self.instant_table_name, self.full_table_name]:
+            await self._writer.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table_name} (
+                    data_id TEXT PRIMARY KEY,
+                    analysis TEXT,
+                    created_at REAL,
+                    refreshed_at REAL,
+                    reviews BLOB,
+                    reviews_codec TEXT
+                )
+            ''')
+            async with self._writer.execute(f"PRAGMA table_info({table_name})") as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            for column, column_type in [("created_at", "REAL"), ("refreshed_at", "REAL"), ("reviews", "BLOB"), ("reviews_codec", "TEXT")]:
+                if column not in columns:
+                    await self._writer.execute(f"ALTER TABLE {table_name} ADD COLUMN {column} {column_type}")
+        async with self._writer.execute(f"PRAGMA table_info({self.report_table_name})") as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        if columns and "analysis_type" not in columns:
+            await self._writer.execute(f"DROP TABLE {self.report_table_name}")
+        await self._writer.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.report_table_name} (
+                data_id TEXT,
+                analysis_type TEXT,
+                content_hash TEXT,
+                pdf BLOB,
+                created_at TEXT,
+                PRIMARY KEY (data_id, analysis_type)
+            )
+        ''')
+        await self._writer.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.reviews_table_name} (
+                data_id TEXT,
+                review_id TEXT,
+                iso_date TEXT,
+                rating REAL,
+                user TEXT,
+                text TEXT,
+                PRIMARY KEY (data_id, review_id)
+            )
+        ''')
+        await self._writer.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.reviews_table_name}_date ON {self.reviews_table_name} (data_id, iso_date)")
+        await self._writer.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.places_table_name} (
+                data_id TEXT PRIMARY KEY,
+                type TEXT,
+                title TEXT,
+                rating REAL,
+                address TEXT,
+                total_reviews INTEGER,
+                status TEXT,
+                created_at TEXT,
+                updated_at REAL
+            )
+        ''')
+        await self._writer.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.jobs_table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                token TEXT,
+                data_id TEXT,
+                kind TEXT,
+                payload TEXT,
+                status TEXT,
+                priority INTEGER,
+                attempts INTEGER,
+                max_attempts INTEGER,
+                lease_owner TEXT,
+                lease_until REAL,
+                available_at REAL,
+                error TEXT,
+                progress TEXT,
+                partial TEXT,
+                created_at REAL,
+                updated_at REAL
+            )
+        ''')
+        await self._writer.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{self.jobs_table_name}_active ON {self.jobs_table_name} (data_id, kind) WHERE status IN ('queued', 'running')")
+        await self._writer.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.jobs_table_name}_token ON {self.jobs_table_name} (token)")
+        await self._writer.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.jobs_table_name}_lease ON {self.jobs_table_name} (status, priority, id)")
+        await self._writer.execute(f'''
+            CREATE TABLE IF NOT EXISTS {self.review_index_table_name} (
+                data_id TEXT,
+                kind TEXT,
+                position INTEGER,
+                user TEXT,
+                date TEXT,
+                iso_date TEXT,
+                rating REAL,
+                review_text TEXT,
+                PRIMARY KEY (data_id, kind, position)
+            )
+        ''')
+        await self._writer.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.review_index_table_name}_date ON {self.review_index_table_name} (data_id, kind, iso_date, position)")
+        await self._writer.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.review_index_table_name}_rating ON {self.review_index_table_name} (data_id, kind, rating, iso_date, position)")
+        await self._writer.commit()
+
+    async def check_and_retrieve_place(self, data_id: str, data_type: Optional[str] = None, include_reviews: bool = True) -> List[Dict[str, any]]:
+        """
+        Check if a review analysis exists in the database and retrieve it if it does.
+
+        Args:
+        - data_id (str): The unique identifier for the review analysis to be retrieved.
+        - data_type (Optional[str]): The type of analysis to retrieve. If None, both types are retrieved.
+        - include_reviews (bool): Whether to load and decode the reviews of the analyses. Without them, 
+          the analyses have no "reviews" key, except the ones saved with their reviews inline. Defaults to True.
+
+        Returns:
+        - List[Dict[str, any]]: A list of review analyses matching the criteria. Each item is a dictionary
+          with keys "data_id", "type", "analysis", "created_at" and "refreshed_at", the timestamps being None 
+          for analyses saved before they were recorded. Returns an empty list if no matching analyses are found.
+        """
+        result = []
+        async with self._reader() as conn:
+            for analysis_type in ["instant", "full"]:
+                if data_type not in [analysis_type, None]:
+                    continue
+                sql = (self._select_sql if include_reviews else self._select_record_sql)[analysis_type]
+                async with conn.execute(sql, (data_id,)) as cursor:
+                    if row := await cursor.fetchone():
+                        analysis = codec.loads(row[1])
+                        if include_reviews and row[4] is not None:
+                            analysis["reviews"] = codec.unpack(row[4], row[5])
+                        result.append({
+                            "data_id": row[0],
+                            "type": analysis_type,
+                            "analysis": analysis,
+                            "created_at": row[2],
+                            "refreshed_at": row[3],
+                        })
+        
+        return result
+
+    async def save_new_data(self, data_id: str, data_type: str, data: Dict[str, any]) -> Optional[str]:
+        """
+        Save new review analysis data in the database.
+
+        Args:
+        - data_id (str): The unique identifier for the review analysis to be saved.
+        - data_type (str): The type of analysis, either "instant" or "full".
+        - data (Dict[str, any]): The review analysis result to be saved.
+
+        Returns:
+        - str: The data_id if the data is saved successfully, otherwise None.
+
+        If a review analysis with the same data_id already exists in the respective table, 
+        the existing entry will be replaced with the new data, and the cached PDF report of the data_id is invalidated.
+        The reviews are stored apart from the rest of the analysis, compressed, so the analysis loads without them,
+        and are indexed for `get_analysis_reviews`.
+
+        Raises:
+        - ValueError: If the data_type is not "instant" or "full".
+        """
+        if data_type not in ["instant", "full"]:
+            raise ValueError("data_type must be either 'instant' or 'full'")
+
+        record = codec.dumps({key: value for key, value in data.items() if key != "reviews"})
+        reviews, reviews_codec = codec.pack(data["reviews"]) if "reviews" in data else (None, None)
+        now = time.time()
+        
+        statements = [
+            (self._upsert_sql[data_type], (data_id, record, now, now, reviews, reviews_codec), False),
+            (self._delete_report_sql, (data_id, data_type), False),
+        ]
+        if "reviews" in data:
+            statements += self._review_index_statements(data_id, data_type, data["reviews"])
+        try:
+            # The analysis, its report and its review index are replaced together
+            await self._write_all(statements)
+            return data_id
+        except aiosqlite.Error as e:
+            print(f"Error saving data: {e}")
+            return None
+
+    async def index_analysis_reviews(self, data_id: str, data_type: str, reviews: List[Dict[str, Any]]) -> None:
+        """
+        Replace the indexed reviews of an analysis.
+
+        Args:
+        - data_id (str): The unique identifier of the analysed place.
+        - data_type (str): The type of analysis, either "instant" or "full".
+        - reviews (List[Dict[str, Any]]): The reviews of the analysis, as dumped from `Review` objects.
+        """
+        await self._write_all(self._review_index_statements(data_id, data_type, reviews))
+
+    def _review_index_statements(self, data_id: str, data_type: str, reviews: List[Dict[str, Any]]) -> List[Tuple[str, Any, bool]]:
+        """
+        Build the write statements replacing the indexed reviews of an analysis, see `index_analysis_reviews`.
+        """
+        def iso_date(date: str) -> str:
+            try:
+                return datetime.strptime(date, "%B %d, %Y at %I:%M %p UTC").strftime("%Y-%m-%dT%H:%M:%SZ")
+            except ValueError:
+                return ""
+
+        rows = [
+            (data_id, data_type, position, review["user"], review["date"], iso_date(review["date"]), review["rating"], review["review_text"])
+            for position, review in enumerate(reviews)
+        ]
+        statements = [(self._delete_review_index_sql, (data_id, data_type), False)]
+        if rows:
+            statements.append((self._insert_review_index_sql, rows, True))
+        return statements
+
+    async def has_review_index(self, data_id: str, data_type: str) -> bool:
+        """
+        Check whether the reviews of an analysis are indexed, which they are not for analyses saved before the index existed.
+
+        Args:
+        - data_id (str): The unique identifier of the analysed place.
+        - data_type (str): The type of analysis, either "instant" or "full".
+
+        Returns:
+        - bool: True if at least one review of the analysis is indexed.
+        """
+        async with self._reader() as conn:
+            async with conn.execute(self._has_review_index_sql, (data_id, data_type)) as cursor:
+                return await cursor.fetchone() is not None
+
+    async def get_analysis_reviews(self, data_id: str, data_type: str = "full", sort: str = "newest", limit: int = 20, cursor: Optional[str] = None, min_rating: Optional[float] = None, max_rating: Optional[float] = None, since: Optional[str] = None, until: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get a page of the indexed reviews of an analysis.
+
+        Pages are keyset paginated: the cursor holds the sort key of the last review of the previous page, 
+        so each page is one index range scan however deep it is.
+
+        Args:
+        - data_id (str): The unique identifier of the analysed place.
+        - data_type (str, optional): The type of analysis, either "instant" or "full". Defaults to "full".
+        - sort (str, optional): The order of the reviews, one of "newest", "oldest", "highest" and "lowest" rated. Defaults to "newest".
+        - limit (int, optional): The maximum number of reviews of the page. Defaults to 20.
+        - cursor (Optional[str], optional): The `next_cursor` of the previous page, None for the first page. Defaults to None.
+        - min_rating (Optional[float], optional): The lowest rating of the reviews. Defaults to None.
+        - max_rating (Optional[float], optional): The highest rating of the reviews. Defaults to None.
+        - since (Optional[str], optional): The earliest date of the reviews, as an ISO date (`2024-01-31`) or timestamp. Defaults to None.
+        - until (Optional[str], optional): The latest date of the reviews, as an ISO date, inclusive, or timestamp. Defaults to None.
+
+        Returns:
+        - Dict[str, Any]: The `reviews` of the page, the `next_cursor` or None on the last page, and the `total` number of reviews matching the filters.
+
+        Raises:
+        - ValueError: If the sort is unknown or the cursor is invalid.
+        """
+        if sort not in self.REVIEW_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        keys, direction = self.REVIEW_SORTS[sort]
+
+        filters, params = ["data_id = ?", "kind = ?"], [data_id, data_type]
+        for condition, value in [("rating >= ?", min_rating), ("rating <= ?", max_rating), ("iso_date >= ?", since), 
+                                 ("iso_date <= ?", until + "T23:59:59Z" if until and len(until) == 10 else until)]:
+            if value is not None:
+                filters.append(condition)
+                params.append(value)
+        count_sql = f"SELECT COUNT(*) FROM {self.review_index_table_name} WHERE {' AND '.join(filters)}"
+        count_params = list(params)
+
+        if cursor is not None:
+            try:
+                after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            except ValueError:
+                after = None
+            if not isinstance(after, list) or len(after) != len(keys):
+                raise ValueError("Invalid cursor")
+            filters.append(f"({', '.join(keys)}) {'<' if direction == 'DESC' else '>'} ({', '.join('?' * len(keys))})")
+            params.extend(after)
+        page_sql = f"""
+            SELECT user, date, rating, review_text, {', '.join(keys)} FROM {self.review_index_table_name}
+            WHERE {' AND '.join(filters)} ORDER BY {', '.join(f'{key} {direction}' for key in keys)} LIMIT ?
+        """
+
+        async with self._reader() as conn:
+            async with conn.execute(page_sql, (*params, limit + 1)) as rows:
+                page = await rows.fetchall()
+            async with conn.execute(count_sql, count_params) as rows:
+                total = (await rows.fetchone())[0]
+
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = base64.urlsafe_b64encode(json.dumps(list(page[-1][4:])).encode()).decode()
+        return {
+            "reviews": [{"user": row[0], "date": row[1], "rating": row[2], "review_text": row[3]} for row in page],
+            "next_cursor": next_cursor,
+            "total": total,
+        }
+
+    async def get_stored_reviews(self, data_id: str) -> List[Dict[str, Any]]:
+        """
+        Retrieve the stored raw reviews of a place, newest first.
+
+        Args:
+        - data_id (str): The unique identifier of the place.
+
+        Returns:
+        - List[Dict[str, Any]]: The stored reviews, each a dictionary with keys "review_id", "iso_date", "rating", "user" and "text".
+        """
+        async with self._reader() as conn:
+            async with conn.execute(self._select_reviews_sql, (data_id,)) as cursor:
+                return [
+                    {"review_id": row[0], "iso_date": row[1], "rating": row[2], "user": row[3], "text": row[4]}
+                    for row in await cursor.fetchall()
+                ]
+
+    async def save_reviews(self, data_id: str, reviews: List[Dict[str, Any]]) -> None:
+        """
+        Bulk insert raw reviews of a place, reviews already stored are left untouched.
+
+        Args:
+        - data_id (str): The unique identifier of the place.
+        - reviews (List[Dict[str, Any]]): The reviews, each a dictionary with keys "review_id", "iso_date", "rating", "user" and "text".
+        """
+        if not reviews:
+            return
+        rows = [(data_id, review["review_id"], review["iso_date"], review["rating"], review["user"], review["text"]) for review in reviews]
+        try:
+            await self._write(self._insert_review_sql, rows, many=True)
+        except aiosqlite.Error as e:
+            print(f"Error saving reviews: {e}")
+
+    async def get_place(self, data_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the stored place information of a data_id.
+
+        Args:
+        - data_id (str): The unique identifier of the place.
+
+        Returns:
+        - Optional[Dict[str, Any]]: The place information, with "updated_at" the unix time it was last fetched, or None if the place is unknown.
+        """
+        async with self._reader() as conn:
+            async with conn.execute(self._select_place_sql, (data_id,)) as cursor:
+                if row := await cursor.fetchone():
+                    keys = ["data_id", "type", "title", "rating", "address", "total_reviews", "status", "created_at", "updated_at"]
+                    return dict(zip(keys, row))
+        return None
+
+    async def save_place(self, place: Dict[str, Any]) -> None:
+        """
+        Save the place information of a data_id, replacing the previously stored one.
+
+        Args:
+        - place (Dict[str, Any]): The place information with keys "data_id", "type", "title", "rating", "address", "total_reviews", "status", "created_at" and "updated_at".
+        """
+        keys = ["data_id", "type", "title", "rating", "address", "total_reviews", "status", "created_at", "updated_at"]
+        try:
+            await self._write(self._upsert_place_sql, tuple(place[key] for key in keys))
+        except aiosqlite.Error as e:
+            print(f"Error saving place: {e}")
+
+    def _job_from_row(self, row: tuple) -> Dict[str, Any]:
+        keys = [key.strip() for key in self._job_columns.split(",")]
+        job = dict(zip(keys, row))
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else {}
+        job["partial"] = json.loads(job["partial"]) if job["partial"] else None
+        return job
+
+    async def enqueue_job(self, token: str, data_id: str, kind: str = "full", payload: Optional[Dict[str, Any]] = None, priority: int = 0, max_attempts: int = 3) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job, unless a job of the same kind is already queued or running for the data_id.
+
+        Args:
+        - token (str): The token used to retrieve the job status and result.
+        - data_id (str): The data_id the job is about.
+        - kind (str, optional): The kind of job. Defaults to "full".
+        - payload (Optional[Dict[str, Any]], optional): The JSON-serializable parameters of the job. Defaults to None.
+        - priority (int, optional): Jobs with a higher priority are leased first. Defaults to 0.
+        - max_attempts (int, optional): The maximum number of times the job is tried before it is marked as failed. Defaults to 3.
+
+        Returns:
+        - Tuple[Dict[str, Any], bool]: The queued or already active job, and whether it was created by this call.
+        """
+        now = time.time()
+        rows = await self._write(self._insert_job_sql, (token, data_id, kind, json.dumps(payload or {}), priority, max_attempts, now, now, now))
+        if rows:
+            self.jobs_available.set()
+            return self._job_from_row(rows[0]), True
+        async with self._reader() as conn:
+            async with conn.execute(self._select_active_job_sql, (data_id, kind)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            # The active job finished in between, queue a new one
+            return await self.enqueue_job(token, data_id, kind, payload, priority, max_attempts)
+        return self._job_from_row(row), False
+
+    async def get_job(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the latest job queued with the given token.
+
+        Args:
+        - token (str): The token of the job.
+
+        Returns:
+        - Optional[Dict[str, Any]]: The job, or None if no job has this token.
+        """
+        async with self._reader() as conn:
+            async with conn.execute(self._select_job_sql, (token,)) as cursor:
+                if row := await cursor.fetchone():
+                    return self._job_from_row(row)
+        return None
+
+    async def lease_job(self, worker_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next job to run: the queued job with the highest priority, or a running job whose lease expired.
+
+        Args:
+        - worker_id (str): The identifier of the worker taking the lease.
+        - lease_seconds (float): The duration of the lease, the worker must renew it before it expires.
+
+        Returns:
+        - Optional[Dict[str, Any]]: The leased job, or None if there is nothing to run.
+        """
+        now = time.time()
+        rows = await self._write(self._lease_job_sql, (worker_id, now + lease_seconds, now, now, now))
+        return self._job_from_row(rows[0]) if rows else None
+
+    async def renew_lease(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Extend the lease of a running job.
+
+        Args:
+        - job_id (int): The id of the job.
+        - worker_id (str): The identifier of the worker holding the lease.
+        - lease_seconds (float): The new duration of the lease from now.
+
+        Returns:
+        - bool: Whether the lease was renewed, False if the worker lost it.
+        """
+        now = time.time()
+        return bool(await self._write(self._renew_lease_sql, (now + lease_seconds, now, job_id, worker_id)))
+
+    async def update_job_progress(self, job_id: int, worker_id: str, progress: Dict[str, Any]) -> None:
+        """
+        Save the progress of a running job, so it can be followed from any process.
+
+        Args:
+        - job_id (int): The id of the job.
+        - worker_id (str): The identifier of the worker holding the lease.
+        - progress (Dict[str, Any]): The JSON-serializable stage and counters of the job.
+        """
+        await self._write(self._update_job_progress_sql, (json.dumps(progress), time.time(), job_id, worker_id))
+
+    async def update_job_partial(self, job_id: int, worker_id: str, partial: Dict[str, Any]) -> None:
+        """
+        Save the provisional result of a running job, replacing the previous one.
+
+        Args:
+        - job_id (int): The id of the job.
+        - worker_id (str): The identifier of the worker holding the lease.
+        - partial (Dict[str, Any]): The JSON-serializable provisional result.
+        """
+        await self._write(self._update_job_partial_sql, (json.dumps(partial), time.time(), job_id, worker_id))
 
-        Two tables are created: review_analysis_instant and review_analysis_full.
-        Each table has two columns: `data_id` and `analysis`. 
-        The `data_id` column is the primary key.
-        The `analysis` column stores the JSON-serialized review analysis result.
+    async def finish_job(self, job_id: int, worker_id: str, status: str, error: Optional[str] = None, retry_delay: float = 0) -> None:
+        """
+        Release a leased job with its new status.
 
-        The tables are created if they do not already exist. If the tables already exist, this method does nothing.
+        Args:
+        - job_id (int): The id of the job.
+        - worker_id (str): The identifier of the worker holding the lease.
+        - status (str): Either "completed", "failed", or "queued" to retry the job after `retry_delay` seconds.
+        - error (Optional[str], optional): The error of a failed attempt. Defaults to None.
+        - retry_delay (float, optional): The time in seconds before a job queued again can be leased. Defaults to 0.
         """
-        async with aiosqlite.connect(self.database_name) as conn:
-            for table_name in [self.instant_table_name, self.full_table_name]:
-                await conn.execute(f'''
-                    CREATE TABLE IF NOT EXISTS {table_name} (
-                        data_id TEXT PRIMARY KEY,
-                        analysis TEXT
-                    )
-                ''')
-            await conn.commit()
+        now = time.time()
+        await self._write(self._finish_job_sql, (status, error, now + retry_delay, now, job_id, worker_id))
 
-    async def check_and_retrieve_place(self, data_id: str, data_type: Optional[str] = None) -> List[Dict[str, any]]:
+    async def delete_finished_jobs(self, max_age: float) -> int:
         """
-        Check if a review analysis exists in the database and retrieve it if it does.
+        Delete the completed and failed jobs finished more than `max_age` seconds ago. 
+        Their tokens are then invalid, the analyses they saved are kept.
 
         Args:
-        - data_id (str): The unique identifier for the review analysis to be retrieved.
-        - data_type (Optional[str]): The type of analysis to retrieve. If None, both types are retrieved.
+        - max_age (float): The time in seconds a finished job is kept.
 
         Returns:
-        - List[Dict[str, any]]: A list of review analyses matching the criteria. Each item is a dictionary
-          with keys "data_id", "type", and "analysis". Returns an empty list if no matching analyses are found.
+        - int: The number of deleted jobs.
         """
-        result = []
-        async with aiosqlite.connect(self.database_name) as conn:
-            if data_type in ["instant", None]:
-                async with conn.execute(f"SELECT data_id, analysis FROM {self.instant_table_name} WHERE data_id = ?", (data_id,)) as cursor:
-                    if row := await cursor.fetchone():
-                        result.append({
-                            "data_id": row[0],
-                            "type": "instant",
-                            "analysis": json.loads(row[1])
-                        })
-            
-            if data_type in ["full", None]:
-                async with conn.execute(f"SELECT data_id, analysis FROM {self.full_table_name} WHERE data_id = ?", (data_id,)) as cursor:
-                    if row := await cursor.fetchone():
-                        result.append({
-                            "data_id": row[0],
-                            "type": "full",
-                            "analysis": json.loads(row[1])
-                        })
-        
-        return result
+        return len(await self._write(self._delete_finished_jobs_sql, (time.time() - max_age,)))
 
-    async def save_new_data(self, data_id: str, data_type: str, data: Dict[str, any]) -> Optional[str]:
+    async def count_jobs(self) -> Dict[str, int]:
         """
-        Save new review analysis data in the database.
+        Count the jobs by status.
+
+        Returns:
+        - Dict[str, int]: The number of jobs of each status.
+        """
+        async with self._reader() as conn:
+            async with conn.execute(self._count_jobs_sql) as cursor:
+                return {status: count for status, count in await cursor.fetchall()}
+
+    async def get_report_pdf(self, data_id: str, content_hash: str, analysis_type: str = "full") -> Optional[bytes]:
+        """
+        Retrieve the cached PDF report of a data_id if it was rendered from the analysis with the given hash.
 
         Args:
-        - data_id (str): The unique identifier for the review analysis to be saved.
-        - data_type (str): The type of analysis, either "instant" or "full".
-        - data (Dict[str, any]): The review analysis result to be saved.
+        - data_id (str): The unique identifier of the analysed place.
+        - content_hash (str): The hash of the analysis the report must have been rendered from.
+        - analysis_type (str, optional): The type of the analysis, "instant" or "full". Defaults to "full".
 
         Returns:
-        - str: The data_id if the data is saved successfully, otherwise None.
-
-        If a review analysis with the same data_id already exists in the respective table, 
-        the existing entry will be replaced with the new data.
+        - Optional[bytes]: The cached PDF report, or None if there is no report for this analysis.
+        """
+        async with self._reader() as conn:
+            async with conn.execute(self._select_report_sql, (data_id, analysis_type, content_hash)) as cursor:
+                if row := await cursor.fetchone():
+                    return row[0]
+        return None
 
-        Raises:
-        - ValueError: If the data_type is not "instant" or "full".
+    async def save_report_pdf(self, data_id: str, content_hash: str, pdf: bytes, analysis_type: str = "full") -> None:
         """
-        if data_type not in ["instant", "full"]:
-            raise ValueError("data_type must be either 'instant' or 'full'")
+        Cache the PDF report of a data_id, replacing any previously cached report of the same analysis type.
 
-        table_name = self.instant_table_name if data_type == "instant" else self.full_table_name
-        analysis_json = json.dumps(data)
-        
+        Args:
+        - data_id (str): The unique identifier of the analysed place.
+        - content_hash (str): The hash of the analysis the report was rendered from.
+        - pdf (bytes): The content of the PDF report.
+        - analysis_type (str, optional): The type of the analysis, "instant" or "full". Defaults to "full".
+        """
         try:
-            async with aiosqlite.connect(self.database_name) as conn:
-                await conn.execute(f"INSERT OR REPLACE INTO {table_name} (data_id, analysis) VALUES (?, ?)", 
-                                   (data_id, analysis_json))
-                await conn.commit()
-            return data_id
+            await self._write(self._upsert_report_sql, (data_id, analysis_type, content_hash, pdf, datetime.now().isoformat()))
         except aiosqlite.Error as e:
-            print(f"Error saving data: {e}")
-            return None
+            print(f"Error saving report: {e}")
 
 
 
 class DataProcessor:
     
-    def __init__(self, api_key: str, num_reviews: int=50, max_reviews: int=150, num_suggestion: int=5, language: str="en", country: str="in", delay: float=1, verbosity: bool=False) -> None:
+    def __init__(self, api_key: str, num_reviews: int=50, max_reviews: int=150, num_suggestion: int=5, language: str="en", country: str="in", delay: float=1, max_delay: float=30.0, max_retries: int=5, http2: bool=False, max_connections: int=20, timeout: float=30.0, database: Optional[DataBase]=None, review_store_ttl: float=3600, transport: Optional[httpx.AsyncBaseTransport]=None, verbosity: bool=False) -> None:
         """
         Initialize a DataProcessor object.
 
@@ -133,10 +1266,28 @@ class DataProcessor:
         - num_suggestion (int): The number of autocomplete suggestions to fetch. Defaults to 5.
         - language (str): The language of the reviews to fetch. Defaults to "en".
         - country (str): The country code of the location to search. Defaults to "in".
-        - delay (float): The delay in seconds between each search. Defaults to 1.
+        - delay (float): The initial delay in seconds between review pages once SerpApi rate limits the requests. 
+          Pages are fetched back to back until a rate limit is observed, then the delay doubles on each rate limit and halves on each success. Defaults to 1.
+        - max_delay (float): The maximum delay in seconds between review pages. Defaults to 30.0.
+        - max_retries (int): The maximum number of retries of a rate limited request. Defaults to 5.
+        - http2 (bool): Whether to use HTTP/2 for SerpApi requests, requires the `h2` package. Defaults to False.
+        - max_connections (int): The maximum number of connections kept to SerpApi. Defaults to 20.
+        - timeout (float): The timeout in seconds for a SerpApi request. Defaults to 30.0.
+        - database (Optional[DataBase]): The database used as raw review store. Fetched reviews are saved in it and read back
+          before calling SerpApi. Defaults to None, in which case every review is fetched from SerpApi.
+        - review_store_ttl (float): The time in seconds during which stored reviews of a place are served without checking SerpApi for newer ones. Defaults to 3600.
+        - transport (Optional[httpx.AsyncBaseTransport]): The HTTP transport of the client, e.g. `FakeSerpApi.transport` to work offline. Defaults to None, the network.
         - verbosity (bool): Whether to print debug messages. Defaults to False.
         """
         self.delay = delay
+        self.transport = transport
+        self.database = database
+        self.review_store_ttl = review_store_ttl
+        self.http2 = http2
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_connections = max_connections
         self.api_key = api_key
         self.country = country
         self.language = language
@@ -145,6 +1296,47 @@ class DataProcessor:
         self.max_reviews = max_reviews
         self.num_suggestion = num_suggestion
         self.base_url = "https://serpapi.com/search.json"
+        self._client = None
+        self._page_delay = 0.0
+        self.pages_fetched = 0
+        self.rate_limited = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The shared HTTP client used for every SerpApi request.
+
+        The client is created on first use and keeps connections to SerpApi alive between requests,
+        so autocomplete keystrokes and review pages do not pay for a new TLS handshake each time.
+        """
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2
+                except ImportError:
+                    http2 = False
+                    if self.verbosity:
+                        print("DataProcessor.client | `h2` is not installed, falling back to HTTP/1.1")
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                transport=self.transport,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """
+        Close the shared HTTP client and its connections to SerpApi.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
         
     def convert_datetime(self, dt_string: str) -> str:
         """
@@ -176,19 +1368,90 @@ class DataProcessor:
             return datetime.strptime(date_string, "%B %d, %Y at %I:%M %p UTC")
         return sorted(reviews, key=lambda review: parse_date(review.date), reverse=reverse)
         
-    async def get_reviews(self, data_id: str, sort_by: str = "qualityScore", use_full_reviews: bool = False) -> AnalysisResult:
+    def stats(self) -> Dict[str, float]:
         """
-        Retrieves Google Maps reviews for a given data_id.
+        Get the SerpApi pagination counters.
+
+        Returns:
+        - Dict[str, float]: The number of review pages fetched, rate limited responses and the current delay between pages.
+        """
+        return {
+            "pages_fetched": self.pages_fetched,
+            "rate_limited": self.rate_limited,
+            "page_delay": self._page_delay,
+        }
+
+    @staticmethod
+    def review_key(review: Dict[str, Any]) -> str:
+        """
+        Get a stable identifier of a raw SerpApi review.
+
+        Args:
+        - review (Dict[str, Any]): The raw review returned by SerpApi.
+
+        Returns:
+        - str: The `review_id` of the review, or a hash of its user, date and text if it has none.
+        """
+        if review.get("review_id"):
+            return review["review_id"]
+        content = f"{review.get('user', {}).get('name', '')}|{review.get('iso_date', '')}|{review.get('extracted_snippet', {}).get('original', '')}"
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    async def _fetch_page(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fetch one page of SerpApi results, backing off and retrying while the requests are rate limited.
+
+        The delay between pages adapts to the observed rate limits: it grows on a rate limited response
+        (honouring `Retry-After` when present) and shrinks back towards zero on successful responses.
+
+        Args:
+        - params (Dict[str, Any]): The query parameters of the request.
+
+        Returns:
+        - Dict[str, Any]: The JSON response.
+
+        Raises:
+        - APIError: If the request is still rate limited after `self.max_retries` retries.
+        """
+        for attempt in range(self.max_retries + 1):
+            with STAGE_SECONDS.time(stage="serpapi_page"):
+                response = await self.client.get(self.base_url, params=params)
+            if response.status_code != 429:
+                self.pages_fetched += 1
+                self._page_delay = self._page_delay / 2 if self._page_delay >= 0.1 else 0.0
+                return response.json()
+
+            self.rate_limited += 1
+            retry_after = response.headers.get("retry-after", "")
+            self._page_delay = min(self.max_delay, max(
+                self.delay, 
+                self._page_delay * 2, 
+                float(retry_after) if retry_after.isdigit() else 0.0,
+            ))
+            if self.verbosity:
+                print(f"DataProcessor._fetch_page | Rate limited by SerpApi, retrying in {self._page_delay:.2f}s ({attempt + 1}/{self.max_retries})")
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._page_delay)
+        raise APIError("SerpApi requests are rate limited")
+
+    async def iter_review_pages(self, data_id: str, sort_by: str = "qualityScore", since: Optional[str] = None, known_ids: Optional[set] = None, stop_at_known: bool = True):
+        """
+        Stream the Google Maps review pages of a given data_id.
+
+        Reviews older than `since` or whose key (see `review_key`) is in `known_ids` are filtered out.
+        When the reviews are sorted by `newestFirst`, the pagination stops after the first page containing such a review,
+        since every following page only holds older reviews. The caller stops it early once it has enough reviews.
 
         Args:
         - data_id (str): The data_id of the location to retrieve reviews for.
         - sort_by (str, optional): The field to sort the reviews by. Defaults to "qualityScore".
-        - use_full_reviews (bool, optional): Whether to retrieve all reviews or just the top self.num_reviews. Defaults to False.
+        - since (Optional[str], optional): An ISO timestamp, only reviews newer than it are yielded. Defaults to None.
+        - known_ids (Optional[set], optional): Keys of reviews already known, which are not yielded. Defaults to None.
+        - stop_at_known (bool, optional): Whether to stop a `newestFirst` pagination at the first filtered out review. Defaults to True.
 
-        Returns:
-        - AnalysisResult: An AnalysisResult object containing the retrieved reviews, sorted by date in descending order.
+        Yields:
+        - Tuple[Dict[str, Any], List[Dict[str, Any]]]: The JSON response of each page and its new raw reviews.
         """
-        _reviews = []
         params = {
             "data_id": data_id,
             "sort_by": sort_by,
@@ -196,80 +1459,216 @@ class DataProcessor:
             "api_key": self.api_key,
             "engine": "google_maps_reviews",
         }
-        
-        place_info = None
-        search_metadata = None
-        search_parameters = None
+        page = 0
+        while True:
+            data = await self._fetch_page(params)
+            page_reviews = data.get("reviews", [])
+            new_reviews = [
+                review for review in page_reviews
+                if not (since and review.get("iso_date", "") <= since)
+                and not (known_ids and self.review_key(review) in known_ids)
+            ]
+            if self.verbosity:
+                print(f"DataProcessor.iter_review_pages | {page} | New {len(new_reviews)} reviews fetched for data_id {data_id}")
+            yield data, new_reviews
+
+            if stop_at_known and sort_by == "newestFirst" and len(new_reviews) < len(page_reviews):
+                # Already known reviews reached
+                return
+            if "serpapi_pagination" not in data or "next" not in data["serpapi_pagination"]:
+                # No more pages
+                return
+
+            params["next_page_token"] = data["serpapi_pagination"]["next_page_token"]
+            page += 1
+            if self._page_delay:
+                await asyncio.sleep(self._page_delay)
+
+    def _normalize_review(self, review: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Flatten a raw SerpApi review into the shape stored in the review store.
 
-        try:
-            async with httpx.AsyncClient() as client:
-                count = 0
-                while True:
-                    response = await client.get(self.base_url, params=params)
-                    data = response.json()
-
-                    print(data)
-
-                    if not place_info:
-                        place_info = data.get("place_info", {})
-                    if not search_metadata:
-                        search_metadata = data.get("search_metadata", {})
-                    if not search_parameters:
-                        search_parameters = data.get("search_parameters", {})
-
-                    new_reviews = data.get("reviews", [])
-                    _reviews.extend(new_reviews)
-                    if self.verbosity:
-                        print(f"DataProcessor.get_reviews | {count} | New {len(new_reviews)} reviews fetched for data_id {data_id}")
-                        count+=1
+        Args:
+        - review (Dict[str, Any]): The raw review returned by SerpApi.
+
+        Returns:
+        - Dict[str, Any]: The review with keys "review_id", "iso_date", "rating", "user" and "text".
+        """
+        return {
+            "review_id": self.review_key(review),
+            "iso_date": review.get("iso_date", ""),
+            "rating": review.get("rating", 0),
+            "user": review.get("user", {}).get("name", ""),
+            "text": review.get("extracted_snippet", {}).get("original", ""),
+        }
 
-                    if use_full_reviews:
-                        if len(_reviews) >= self.max_reviews:
-                            break
-                    elif len(_reviews) >= self.num_reviews:
-                        break
+    async def _fetch_reviews(self, data_id: str, target: int, sort_by: str, since: Optional[str], known_ids: set, stop_at_known: bool, fetched: List[Dict[str, Any]], on_page: Optional[Callable[[], Awaitable[None]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Page through SerpApi reviews until `target` new reviews are collected or the pagination ends.
 
-                    if "serpapi_pagination" not in data or "next" not in data["serpapi_pagination"]:
-                        # No more pages
-                        break
+        Args:
+        - data_id (str): The data_id of the location to retrieve reviews for.
+        - target (int): The number of new reviews after which the pagination stops.
+        - sort_by (str): The field to sort the reviews by.
+        - since (Optional[str]): An ISO timestamp, only reviews newer than it are collected.
+        - known_ids (set): Keys of reviews already known, which are not collected.
+        - stop_at_known (bool): Whether to stop a `newestFirst` pagination at the first known review.
+        - fetched (List[Dict[str, Any]]): The list the normalized new reviews are appended to, so they are kept if a later page fails.
+        - on_page (Optional[Callable[[], Awaitable[None]]]): Called after each page is collected. Defaults to None.
 
-                    params["next_page_token"] = data["serpapi_pagination"]["next_page_token"]
-                    await asyncio.sleep(self.delay)
-                    if self.verbosity:
-                        print(f"DataProcessor.get_reviews | Going to visit next review page for data_id {data_id}")
+        Returns:
+        - Optional[Dict[str, Any]]: The place information of the first page, or None if no page was fetched.
+        """
+        place = None
+        collected = 0
+        pages = self.iter_review_pages(data_id, sort_by=sort_by, since=since, known_ids=known_ids, stop_at_known=stop_at_known)
+        async with contextlib.aclosing(pages):
+            async for data, new_reviews in pages:
+                if place is None:
+                    place_info = data.get("place_info", {})
+                    search_metadata = data.get("search_metadata", {})
+                    place = {
+                        "data_id": data.get("search_parameters", {}).get("data_id", data_id),
+                        "type": place_info.get("type", ""),
+                        "title": place_info.get("title", ""),
+                        "rating": place_info.get("rating", 0.0),
+                        "address": place_info.get("address", ""),
+                        "total_reviews": place_info.get("reviews", 0),
+                        "status": search_metadata.get("status", ""),
+                        "created_at": search_metadata.get("created_at", ""),
+                        "updated_at": time.time(),
+                    }
+                for review in new_reviews:
+                    known_ids.add(self.review_key(review))
+                    fetched.append(self._normalize_review(review))
+                collected += len(new_reviews)
+                if on_page is not None:
+                    await on_page()
+                if collected >= target:
+                    break
+        return place
+
+    def _build_result(self, place: Dict[str, Any], reviews: List[Dict[str, Any]]) -> AnalysisResult:
+        """
+        Build an AnalysisResult from place information and normalized reviews.
+
+        Args:
+        - place (Dict[str, Any]): The place information, as stored in the review store.
+        - reviews (List[Dict[str, Any]]): The normalized reviews.
+
+        Returns:
+        - AnalysisResult: An AnalysisResult object containing the reviews, sorted by date in ascending order.
+        """
+        return AnalysisResult(
+            type=place["type"],
+            title=place["title"],
+            rating=place["rating"],
+            address=place["address"],
+            status=place["status"],
+            reviews=self.sort_reviews_by_date([Review(
+                rating=review["rating"],
+                user=review["user"],
+                date=self.convert_datetime(review["iso_date"]),
+                review_text=review["text"],
+            ) for review in reviews]),
+            total_reviews=place["total_reviews"],
+            data_id=place["data_id"],
+            created_at=place["created_at"],
+            newest_review_at=max((review["iso_date"] for review in reviews), default=None),
+        )
+
+    @timed("get_reviews")
+    async def get_reviews(self, data_id: str, sort_by: str = "qualityScore", use_full_reviews: bool = False, since: Optional[str] = None, known_ids: Optional[set] = None, target: Optional[int] = None, progress: Optional[Callable[..., Awaitable[None]]] = None) -> AnalysisResult:
+        """
+        Retrieves Google Maps reviews for a given data_id.
+
+        When a review store is configured, the stored reviews are read first. If the place was fetched less than
+        `self.review_store_ttl` seconds ago and enough reviews are stored, SerpApi is not called at all. Otherwise the newest
+        reviews are paged until the stored ones are reached, and older pages are only fetched if reviews are still missing,
+        unless `since` or `known_ids` bound the request to the newest reviews.
+        Every fetched review is saved in the store.
 
-            if not use_full_reviews:
-                _reviews = _reviews[:self.num_reviews]
+        Args:
+        - data_id (str): The data_id of the location to retrieve reviews for.
+        - sort_by (str, optional): The field to sort the reviews by. Defaults to "qualityScore".
+        - use_full_reviews (bool, optional): Whether to retrieve all reviews or just the top self.num_reviews. Defaults to False.
+        - since (Optional[str], optional): An ISO timestamp, only reviews newer than it are kept. Together with `sort_by="newestFirst"`
+          the pagination stops at the first page reaching an older review. Defaults to None.
+        - known_ids (Optional[set], optional): Keys of reviews already known (see `review_key`), which are skipped. Together with 
+          `sort_by="newestFirst"` the pagination stops at the first page reaching a known review. Defaults to None.
+        - target (Optional[int], optional): The number of reviews after which the pagination stops. Defaults to self.max_reviews 
+          if `use_full_reviews` is True, otherwise self.num_reviews.
+        - progress (Optional[Callable[..., Awaitable[None]]], optional): Called with the "fetching" stage, `pages_fetched` and 
+          `reviews` counters after each page fetched from SerpApi. Defaults to None.
 
-            #print(_reviews)
+        Returns:
+        - AnalysisResult: An AnalysisResult object containing the retrieved reviews, sorted by date in descending order.
+        """
+        target = target or (self.max_reviews if use_full_reviews else self.num_reviews)
+        excluded = set(known_ids or ())
+        
+        place = None
+        stored = []
+        if self.database is not None:
+            place = await self.database.get_place(data_id)
+            stored = [
+                review for review in await self.database.get_stored_reviews(data_id)
+                if review["review_id"] not in excluded and not (since and review["iso_date"] <= since)
+            ]
+        known = excluded | {review["review_id"] for review in stored}
+        fetched = []
+        fetched_place = None
+        pages_fetched = 0
+
+        async def on_page():
+            nonlocal pages_fetched
+            pages_fetched += 1
+            if progress is not None:
+                await progress("fetching", pages_fetched=pages_fetched, reviews=len(stored) + len(fetched))
 
-            reviews = [Review(
-                rating=review.get("rating", 0),
-                user=review.get("user", {}).get("name", ""),
-                date=self.convert_datetime(review.get("iso_date", "")),
-                review_text=review.get("extracted_snippet", {}).get("original", "")
-            ) for review in _reviews]
+        try:
+            if place is None or not stored:
+                # Nothing stored yet, plain pagination
+                fetched_place = await self._fetch_reviews(data_id, target, sort_by, since, known, True, fetched, on_page)
+            elif len(stored) < target or time.time() - place["updated_at"] > self.review_store_ttl:
+                # Newest reviews until the stored ones are reached
+                fetched_place = await self._fetch_reviews(data_id, target, "newestFirst", since, known, True, fetched, on_page) or place
+                missing = target - len(stored) - len(fetched)
+                # Reviews older than `since` or than the known ones are not wanted, the newest pages had them all
+                bounded = since is not None or bool(excluded)
+                if missing > 0 and not bounded and fetched_place["total_reviews"] > len(known):
+                    if self.verbosity:
+                        print(f"DataProcessor.get_reviews | {missing} reviews still missing for data_id {data_id}, fetching older pages")
+                    fetched_place = await self._fetch_reviews(data_id, missing, sort_by, since, known, False, fetched, on_page) or fetched_place
+            elif self.verbosity:
+                print(f"DataProcessor.get_reviews | Reviews served from the review store for data_id {data_id}")
+
+            place = fetched_place or place
+            if place is None:
+                raise APIError(f"No place information returned for data_id {data_id}")
+            
+            if self.database is not None and fetched_place is not None:
+                await self.database.save_reviews(data_id, fetched)
+                await self.database.save_place(fetched_place)
+
+            if stored:
+                reviews = sorted(fetched + stored, key=lambda review: review["iso_date"], reverse=True)
+            else:
+                # Keep the SerpApi order when nothing came from the store
+                reviews = fetched
             
             if self.verbosity:
                 print(f"DataProcessor.get_reviews | Reviews collection completed for data_id {data_id}")
 
-            return AnalysisResult(
-                type=place_info.get("type", ""),
-                title=place_info.get("title", ""),
-                rating=place_info.get("rating", 0.0),
-                address=place_info.get("address", ""),
-                status=search_metadata.get("status", ""),
-                reviews=self.sort_reviews_by_date(reviews),
-                total_reviews=place_info.get("reviews", 0),
-                data_id=search_parameters.get("data_id", ""),
-                created_at=search_metadata.get("created_at", ""),
-            )  
+            return self._build_result(place, reviews[:target])
 
         except Exception as e:
-            if _reviews:
+            if fetched:
                 if self.verbosity:
                     print(f"Warning: Partial results due to API error: {str(e)}")
-                return self._create_partial_result(_reviews, data_id)
+                if self.database is not None:
+                    await self.database.save_reviews(data_id, fetched)
+                return self._create_partial_result(fetched + stored, data_id)
         
             if self.verbosity:    
                 print(f"Failed to fetch reviews for data_id {data_id} due to : {e}")
@@ -281,17 +1680,17 @@ class DataProcessor:
         Creates an AnalysisResult object with the given reviews, marked as a partial result.
 
         Args:
-        - reviews (List[Dict]): The list of reviews to include in the result.
+        - reviews (List[Dict]): The list of normalized reviews to include in the result.
         - data_id (str): The data_id of the location to associate the partial result with.
 
         Returns:
         - AnalysisResult: An AnalysisResult object with the given reviews, type, title, rating, address, status, total_reviews, data_id, and created_at fields populated.
         """
         formatted_reviews = [Review(
-            date=review.get("iso_date", ""),
-            rating=review.get("rating", 0),
-            user=review.get("user", {}).get("name", ""),
-            review_text=review.get("extracted_snippet", {}).get("original", ""),
+            date=review["iso_date"],
+            rating=review["rating"],
+            user=review["user"],
+            review_text=review["text"],
         ) for review in reviews]
 
         return AnalysisResult(
@@ -306,7 +1705,7 @@ class DataProcessor:
             created_at="",
         )
             
-    async def get_suggestions(self, query: str, longitude: float, latitude: float, filter: Optional[str]=None) -> SuggestionResult:
+    async def get_suggestions(self, query: str, longitude: float, latitude: float, filter: Optional[str]=None, truncate: bool=True) -> SuggestionResult:
         """
         Retrieves Google Maps Autocomplete suggestions for the given query, filtered by the given longitude and latitude.
         
@@ -315,9 +1714,10 @@ class DataProcessor:
         - longitude (float): The longitude of the location to filter suggestions by.
         - latitude (float): The latitude of the location to filter suggestions by.
         - filter (str): An optional filter to limit the suggestions to a specific type (e.g. "establishment", "geocode", etc.).
+        - truncate (bool): Whether to return at most self.num_suggestion suggestions. Defaults to True.
         
         Returns:
-        - SuggestionResult: An object containing the status of the request, a list of up to self.num_suggestion Suggestion objects, and the created_at timestamp of the request.
+        - SuggestionResult: An object containing the status of the request, a list of up to self.num_suggestion Suggestion objects (or all of them if `truncate` is False), and the created_at timestamp of the request.
         
         Raises:
         - APIError: If the request to the API fails.
@@ -334,9 +1734,8 @@ class DataProcessor:
                 "engine": "google_maps_autocomplete",
             }
 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(self.base_url, params=params)
-                results = response.json()
+            response = await self.client.get(self.base_url, params=params)
+            results = response.json()
 
             if "suggestions" not in results:
                 raise NoResultsError(f"No suggestions found for query: '{query}'")
@@ -361,7 +1760,7 @@ class DataProcessor:
 
             return SuggestionResult(
                 status=results["search_metadata"]["status"],
-                suggestions=suggestions[:self.num_suggestion],
+                suggestions=suggestions[:self.num_suggestion] if truncate else suggestions,
                 created_at=results["search_metadata"]["created_at"],
             )
 
@@ -377,7 +1776,7 @@ class DataProcessor:
 
 
 class ReviewAnalyzer:
-    def __init__(self, model: str, api_key: str|List[str], system_prompt: str, data_prompt: str, batch_analytics_prompt: str, verbosity: bool=False) -> None:
+    def __init__(self, model: str, api_key: str|List[str], system_prompt: str, data_prompt: str, batch_analytics_prompt: str, integration_prompt: Optional[str]=None, max_concurrency: int=8, reserved_instant: int=2, model_concurrency: Optional[Dict[str, int]]=None, sentiment_scorer: Optional[SentimentScorer]=None, verbosity: bool=False) -> None:
         """
         Initializes the ReviewAnalyzer object with the given parameters.
 
@@ -387,14 +1786,52 @@ class ReviewAnalyzer:
         - system_prompt (str): The system prompt to send to the model as part of the analysis request.
         - data_prompt (str): The data prompt to send to the model as part of the analysis request.
         - batch_analytics_prompt (str): The batch analytics prompt to send to the model as part of the analysis request.
+        - integration_prompt (Optional[str]): The prompt used to update a previous analysis with new reviews. Defaults to `INTEGRATION_PROMPT`.
+        - max_concurrency (int): The maximum number of LLM calls in flight across all models. Defaults to 8.
+        - reserved_instant (int): The number of the `max_concurrency` slots that full analyses may not use, so instant analyses are never starved. Defaults to 2.
+        - model_concurrency (Optional[Dict[str, int]]): Optional per-model limits on the number of LLM calls in flight. Defaults to None.
+        - sentiment_scorer (Optional[SentimentScorer]): Computes the overall sentiment of the analyses from their reviews, so the LLM does not have to. Defaults to a `SentimentScorer` with default settings.
         - verbosity (bool): Whether to print debug messages during the analysis process. Defaults to False.
         """
         self.model = model
+        self.sentiment_scorer = sentiment_scorer or SentimentScorer()
         self.verbosity = verbosity
         self.data_prompt = data_prompt
         self.system_prompt = system_prompt
-        self.client = OpenAI(api_key=api_key)
         self.batch_analytics_prompt = batch_analytics_prompt
+        self.integration_prompt = integration_prompt or INTEGRATION_PROMPT
+        self.model_concurrency = model_concurrency or {}
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self.client = AsyncOpenAI(api_key=api_key, http_client=self.http_client)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._full_semaphore = asyncio.Semaphore(max(1, max_concurrency - reserved_instant))
+        self._model_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._encoding = None
+
+    async def close(self) -> None:
+        """
+        Close the HTTP connections kept alive by the OpenAI client.
+        """
+        await self.client.close()
+
+    def _model_semaphore(self, model: str) -> Optional[asyncio.Semaphore]:
+        """
+        Get the semaphore limiting the concurrent calls for the given model, if a limit is configured.
+
+        Args:
+        - model (str): The name of the model.
+
+        Returns:
+        - Optional[asyncio.Semaphore]: The semaphore for the model, or None if the model has no limit.
+        """
+        if model not in self.model_concurrency:
+            return None
+        if model not in self._model_semaphores:
+            self._model_semaphores[model] = asyncio.Semaphore(self.model_concurrency[model])
+        return self._model_semaphores[model]
 
     def reviews_to_string(self, reviews: List[Review]) -> str:
         """
@@ -408,137 +1845,537 @@ class ReviewAnalyzer:
         """
         return "\n".join([f"- {review.user} gave a rating of '{review.rating}/5' on '{review.date}' with comment {review.review_text}" for review in reviews])
 
-    def _generate_(self, messages: List[dict]):
+    def count_tokens(self, text: str) -> int:
+        """
+        Estimate the number of tokens of a text for the model.
+
+        The count is exact when the optional `tiktoken` package knows the model, otherwise it is estimated as one token per 4 characters.
+
+        Args:
+        - text (str): The text to count the tokens of.
+
+        Returns:
+        - int: The number of tokens.
+        """
+        if self._encoding is None:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.encoding_for_model(self.model or "gpt-4o-mini")
+            except Exception:
+                self._encoding = False
+        if self._encoding:
+            return len(self._encoding.encode(text))
+        return -(-len(text) // 4)
+
+    def _analysis_messages(self, review_analysis: AnalysisResult) -> List[dict]:
+        return [
+            {"role": "system", "content": self.system_prompt.format(
+                name=review_analysis.title, 
+                rating=review_analysis.rating, 
+                address=review_analysis.address,
+                todays_date=datetime.now().strftime("%Y-%m-%d"),
+                total_reviews=review_analysis.total_reviews,
+            )},
+            {"role": "user", "content": self.data_prompt.format(
+                reviews=self.reviews_to_string(review_analysis.reviews)
+            )}
+        ]
+
+    def serialize_partial(self, analysis: AnalysisResult) -> str:
+        """
+        Serialize a partial analysis for a combine prompt, as its date range followed by its analysis in YAML.
+
+        Empty fields and the hotel name, already in the system prompt, are left out, and long lines are not wrapped.
+
+        Args:
+        - analysis (AnalysisResult): The partial analysis, with the hotel_analysis field populated.
+
+        Returns:
+        - str: The compact serialization of the partial analysis.
+        """
+        def prune(value):
+            if isinstance(value, dict):
+                return {key: pruned for key, item in value.items() if (pruned := prune(item)) not in (None, "", [], {})}
+            if isinstance(value, list):
+                return [pruned for item in value if (pruned := prune(item)) not in (None, "", [], {})]
+            return value
+
+        data = prune(analysis.hotel_analysis.model_dump(exclude={"hotel_name", "overall_sentiment"}))
+        return f"[{analysis.reviews[0].date} to {analysis.reviews[-1].date}]\n" + yaml.safe_dump(data, sort_keys=False, allow_unicode=True, width=float("inf"))
+
+    def combine_overhead(self, analysis: AnalysisResult) -> int:
+        """
+        Count the prompt tokens of a combine call spent outside of the serialized partial analyses.
+
+        Args:
+        - analysis (AnalysisResult): Any of the partial analyses to combine, for the hotel information of the prompt.
+
+        Returns:
+        - int: The number of tokens of the system prompt.
+        """
+        return self.count_tokens(self._combine_messages([analysis])[0]["content"])
+
+    def _combine_messages(self, analysis_results: List[AnalysisResult]) -> List[dict]:
+        return [
+            {"role": "system", "content": self.batch_analytics_prompt.format(
+                name=analysis_results[0].title, 
+                rating=analysis_results[0].rating, 
+                address=analysis_results[0].address,
+                todays_date=datetime.now().strftime("%Y-%m-%d"),
+                total_reviews=analysis_results[0].total_reviews,
+            )},
+            {"role": "user", "content": "\n---\n\n".join([self.serialize_partial(result) for result in analysis_results])}
+        ]
+
+    def plan_batches(self, review_analysis: AnalysisResult, token_budget: int) -> Tuple[List[List[Review]], Dict[str, Any]]:
+        """
+        Split the reviews of an analysis into as few batches as possible with prompts under a token budget.
+
+        The reviews keep their order, and the batches are balanced so they take about the same time to analyse (see `pack_in_order`).
+        A review longer than the budget on its own gets a batch of its own.
+
+        Args:
+        - review_analysis (AnalysisResult): The analysis holding the reviews to split.
+        - token_budget (int): The maximum number of prompt tokens of an analysis request, system and data prompts included.
+
+        Returns:
+        - Tuple[List[List[Review]], Dict[str, Any]]: The batches of reviews, and the plan: the number of `batches` and `reviews`, 
+          the prompt `overhead` and `budget` in tokens, and the estimated `tokens` of each batch prompt.
+        """
+        empty = review_analysis.model_copy(update={"reviews": []})
+        overhead = sum(self.count_tokens(message["content"]) for message in self._analysis_messages(empty))
+        costs = [self.count_tokens(self.reviews_to_string([review])) + 1 for review in review_analysis.reviews]
+        bounds = pack_in_order(costs, token_budget - overhead)
+
+        batches = [review_analysis.reviews[start:end] for start, end in bounds]
+        plan = {
+            "batches": len(batches),
+            "reviews": len(costs),
+            "overhead": overhead,
+            "budget": token_budget,
+            "tokens": [overhead + sum(costs[start:end]) for start, end in bounds],
+        }
+        if self.verbosity:
+            print(f"ReviewAnalyzer.plan_batches | Planned {plan['batches']} batches for {plan['reviews']} reviews, prompt tokens per batch: {plan['tokens']}")
+        return batches, plan
+
+    async def _generate_(self, messages: List[dict], priority: str="instant"):
         """
         Uses the OpenAI LLM to generate text based on the provided messages.
 
+        The call waits for a free slot of the global limit and of the per-model limit. Full analysis calls
+        additionally wait for a slot of the full analysis limit, which leaves `reserved_instant` slots for instant calls.
+
         Args:
         - messages (List[dict]): The messages to provide to the LLM, where each message is a dictionary containing the following keys:
             - role (str): The role of the message, either "system" or "user".
             - content (str): The content of the message.
+        - priority (str): Either "instant" or "full", the kind of analysis the call belongs to. Defaults to "instant".
 
         Returns:
-        - AnalysisResult: The generated text, parsed as an AnalysisResult object.
+        - The completion, parsed as a `HotelInsights` object.
         """
-        if self.verbosity:
-            print("ReviewAnalyzer._generate_ | LLM Call")
-        return self.client.beta.chat.completions.parse(
-            messages=messages,
-            max_completion_tokens=3000,
-            response_format=HotelAnalysis,
-            model=self.model or "gpt-4o-mini",
-        )
+        model = self.model or "gpt-4o-mini"
+        async with contextlib.AsyncExitStack() as stack:
+            if priority == "full":
+                await stack.enter_async_context(self._full_semaphore)
+            if (model_semaphore := self._model_semaphore(model)) is not None:
+                await stack.enter_async_context(model_semaphore)
+            await stack.enter_async_context(self._semaphore)
+
+            if self.verbosity:
+                print(f"ReviewAnalyzer._generate_ | LLM Call ({priority})")
+            LLM_CALLS.inc(model=model, priority=priority)
+            with STAGE_SECONDS.time(stage=f"llm_{priority}"):
+                completion = await self.client.beta.chat.completions.parse(
+                    messages=messages,
+                    max_completion_tokens=3000,
+                    response_format=HotelInsights,
+                    model=model,
+                )
+            if (usage := getattr(completion, "usage", None)) is not None:
+                LLM_TOKENS.inc(usage.prompt_tokens, model=model, kind="prompt")
+                LLM_TOKENS.inc(usage.completion_tokens, model=model, kind="completion")
+            return completion
+
+    def _hotel_analysis(self, completion, reviews: List[Review]) -> HotelAnalysis:
+        """
+        Complete the insights generated by the LLM with the overall sentiment of the reviews they cover.
+
+        Args:
+        - completion: The completion returned by `_generate_`.
+        - reviews (List[Review]): The reviews the analysis covers.
+
+        Returns:
+        - HotelAnalysis: The full analysis.
+        """
+        insights = completion.choices[0].message.parsed
+        return HotelAnalysis(**dict(insights), overall_sentiment=self.sentiment_scorer.score(reviews))
 
-    async def generate_analysis(self, review_analysis: AnalysisResult) -> AnalysisResult:
+    async def generate_analysis(self, review_analysis: AnalysisResult, priority: str="instant") -> AnalysisResult:
         """
         Uses the OpenAI LLM to generate an analysis of the provided reviews.
 
         Args:
         - review_analysis (AnalysisResult): The analysis to generate text for, including the reviews to consider.
+        - priority (str): Either "instant" or "full", the kind of analysis the call belongs to. Defaults to "instant".
 
         Returns:
         - AnalysisResult: The generated analysis, with the hotel_analysis field populated with the generated text.
         """
+        messages = self._analysis_messages(review_analysis)
+        if self.verbosity:
+            print("ReviewAnalyzer.generate_analysis | Generating analysis for the reviews")
+        completion = await self._generate_(messages, priority=priority)
+        review_analysis.hotel_analysis = self._hotel_analysis(completion, review_analysis.reviews)
+        return review_analysis
+    
+    @timed("combine")
+    async def combine_analysis(self, analysis_results: List[AnalysisResult], priority: str="full") -> AnalysisResult:
+        """
+        Uses the OpenAI LLM to combine the analysis of multiple batches of reviews.
+
+        Args:
+        - analysis_results (List[AnalysisResult]): The analysis results to combine, each containing the reviews to consider and the generated analysis.
+        - priority (str): Either "instant" or "full", the kind of analysis the call belongs to. Defaults to "full".
+
+        Returns:
+        - AnalysisResult: The combined analysis, with the hotel_analysis field populated with the generated text.
+        """
+        if len(analysis_results) == 1:
+            return analysis_results[0]
+        
+        messages = self._combine_messages(analysis_results)
+        if self.verbosity:
+            print("ReviewAnalyzer.combine_analysis | Combining analysis together")
+        completion = await self._generate_(messages, priority=priority)
+        # The combined analysis covers the reviews of all its parts
+        analysis = analysis_results[0].model_copy(update={"reviews": [review for result in analysis_results for review in result.reviews]})
+        analysis.hotel_analysis = self._hotel_analysis(completion, analysis.reviews)
+        return analysis
+
+    async def integrate_analysis(self, previous_analysis: AnalysisResult, new_reviews: AnalysisResult, priority: str="full", score_sentiment: bool=True) -> AnalysisResult:
+        """
+        Uses the OpenAI LLM to update a previous analysis with new reviews, without re-analysing the previous reviews.
+
+        Args:
+        - previous_analysis (AnalysisResult): The previous analysis, with the hotel_analysis field populated.
+        - new_reviews (AnalysisResult): The latest place information and the reviews not covered by the previous analysis.
+        - priority (str): Either "instant" or "full", the kind of analysis the call belongs to. Defaults to "full".
+        - score_sentiment (bool): Whether to score the overall sentiment of the merged reviews. When integrating several batches in a row,
+          it can be scored once after the last one, the previous overall sentiment being kept until then. Defaults to True.
+
+        Returns:
+        - AnalysisResult: The place information of `new_reviews` with the reviews of both analyses, new ones first, 
+          and the hotel_analysis field populated with the updated analysis.
+        """
         messages = [
             {"role": "system", "content": self.system_prompt.format(
-                name=review_analysis.title, 
-                rating=review_analysis.rating, 
-                address=review_analysis.address,
+                name=new_reviews.title, 
+                rating=new_reviews.rating, 
+                address=new_reviews.address,
                 todays_date=datetime.now().strftime("%Y-%m-%d"),
-                total_reviews=review_analysis.total_reviews,
+                total_reviews=new_reviews.total_reviews,
             )},
-            {"role": "user", "content": self.data_prompt.format(
-                reviews=self.reviews_to_string(review_analysis.reviews)
+            {"role": "user", "content": self.integration_prompt.format(
+                previous_analysis=yaml.dump(previous_analysis.hotel_analysis.model_dump(exclude={"overall_sentiment"})),
+                new_reviews=self.reviews_to_string(new_reviews.reviews),
             )}
         ]
         if self.verbosity:
-            print("ReviewAnalyzer.generate_analysis | Generating analysis for the reviews")
-        loop = asyncio.get_event_loop()
-        completion = await loop.run_in_executor(None, self._generate_, messages)
-        review_analysis.hotel_analysis = completion.choices[0].message.parsed
-        return review_analysis
+            print(f"ReviewAnalyzer.integrate_analysis | Integrating {len(new_reviews.reviews)} new reviews into the previous analysis")
+        completion = await self._generate_(messages, priority=priority)
+        analysis = new_reviews.model_copy(update={"reviews": new_reviews.reviews + previous_analysis.reviews})
+        if score_sentiment:
+            analysis.hotel_analysis = self._hotel_analysis(completion, analysis.reviews)
+        else:
+            insights = completion.choices[0].message.parsed
+            analysis.hotel_analysis = HotelAnalysis(**dict(insights), overall_sentiment=previous_analysis.hotel_analysis.overall_sentiment)
+        return analysis
     
-    async def combine_analysis(self, analysis_results: List[AnalysisResult]) -> AnalysisResult:
+    
+
+class CombinePlanner:
+    """
+    Plans and runs the tree of combine calls merging the batch analyses of a full analysis into one.
+
+    Each level groups consecutive partial analyses into as few combine calls as fit the token budget and the fan-in,
+    using the serialized size of each partial, so small analyses are combined in a single call while large ones get 
+    more, smaller calls. The levels are planned one at a time, from the actual size of the partials combined so far.
+    """
+    def __init__(self, analyzer: "ReviewAnalyzer", token_budget: int=12000, max_fan_in: int=8, verbosity: bool=False) -> None:
+        """
+        Initialize a `CombinePlanner` instance.
+
+        Args:
+        - analyzer (ReviewAnalyzer): The analyzer used to serialize, count the tokens of, and combine the partial analyses. Only its 
+          `count_tokens`, `serialize_partial`, `combine_overhead` and `combine_analysis` methods are used.
+        - token_budget (int): The maximum number of prompt tokens of a combine call, system prompt included. Defaults to 12000.
+        - max_fan_in (int): The maximum number of partial analyses combined by one call, at least 2. Defaults to 8.
+        - verbosity (bool): Whether to print debug messages. Defaults to False.
+        """
+        self.analyzer = analyzer
+        self.token_budget = token_budget
+        self.max_fan_in = max(max_fan_in, 2)
+        self.verbosity = verbosity
+        self.calls = 0
+        self.levels = 0
+        self.prompt_tokens = 0
+
+    def plan_level(self, partials: List[AnalysisResult]) -> Tuple[List[List[AnalysisResult]], List[int]]:
+        """
+        Group the partial analyses of one level of the combine tree.
+
+        Args:
+        - partials (List[AnalysisResult]): The partial analyses to combine, in date order.
+
+        Returns:
+        - Tuple[List[List[AnalysisResult]], List[int]]: The groups of partial analyses, one combine call each, and the estimated prompt tokens of each call.
+        """
+        overhead = self.analyzer.combine_overhead(partials[0])
+        costs = [self.analyzer.count_tokens(self.analyzer.serialize_partial(partial)) + 2 for partial in partials]
+        bounds = pack_in_order(costs, self.token_budget - overhead, self.max_fan_in)
+        if len(bounds) == len(partials):
+            # Every partial fills a call on its own, combine them by pairs anyway so the tree converges
+            bounds = [(start, min(start + 2, len(partials))) for start in range(0, len(partials), 2)]
+        return [partials[start:end] for start, end in bounds], [overhead + sum(costs[start:end]) for start, end in bounds]
+
+    async def combine(self, partials: List[AnalysisResult], progress: Optional[Callable[..., Awaitable[None]]]=None, priority: str="full") -> AnalysisResult:
         """
-        Uses the OpenAI LLM to combine the analysis of multiple batches of reviews.
+        Combine partial analyses level by level until a single analysis is left.
 
         Args:
-        - analysis_results (List[AnalysisResult]): The analysis results to combine, each containing the reviews to consider and the generated analysis.
+        - partials (List[AnalysisResult]): The partial analyses to combine, in date order.
+        - progress (Optional[Callable[..., Awaitable[None]]]): Called with the "combining" stage, the `level` and its number of `groups` before each level. Defaults to None.
+        - priority (str): Either "instant" or "full", the kind of analysis the calls belong to. Defaults to "full".
 
         Returns:
-        - AnalysisResult: The combined analysis, with the hotel_analysis field populated with the generated text.
+        - AnalysisResult: The combined analysis.
         """
-        if len(analysis_results) == 1:
-            return analysis_results[0]
-        
-        messages = [
-            {"role": "system", "content": self.batch_analytics_prompt.format(
-                name=analysis_results[0].title, 
-                rating=analysis_results[0].rating, 
-                address=analysis_results[0].address,
-                todays_date=datetime.now().strftime("%Y-%m-%d"),
-                total_reviews=analysis_results[0].total_reviews,
-            )},
-            {"role": "user", "content": "\n---\n\n".join([
-                f"[{analysis_results[i].reviews[0].date} to {analysis_results[i].reviews[-1].date}]\n{yaml.dump(result.hotel_analysis.model_dump())}" 
-                for i, result in enumerate(analysis_results)])
-            }
-        ]
-        if self.verbosity:
-            print("ReviewAnalyzer.combine_analysis | Combining analysis together")
-        loop = asyncio.get_event_loop()
-        completion = await loop.run_in_executor(None, self._generate_, messages)
-        analysis = AnalysisResult(**analysis_results[0].model_dump())
-        analysis.hotel_analysis = completion.choices[0].message.parsed
-        return analysis
-    
-    
+        level = 1
+        while len(partials) > 1:
+            groups, tokens = self.plan_level(partials)
+            if self.verbosity:
+                print(f"CombinePlanner.combine | Level {level}: {len(partials)} partials in {len(groups)} calls, prompt tokens per call: {tokens}")
+            if progress is not None:
+                await progress("combining", level=level, groups=len(groups))
+            partials = await asyncio.gather(*[self.analyzer.combine_analysis(group, priority=priority) for group in groups])
+            self.levels += 1
+            self.calls += sum(len(group) > 1 for group in groups)
+            self.prompt_tokens += sum(count for group, count in zip(groups, tokens) if len(group) > 1)
+            level += 1
+        return partials[0]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the planner counters.
+
+        Returns:
+        - Dict[str, int]: The number of combine levels, combine calls and their estimated prompt tokens.
+        """
+        return {"levels": self.levels, "calls": self.calls, "prompt_tokens": self.prompt_tokens}
+
+
 
 class TaskManager:
-    def __init__(self, data_processor: DataProcessor, review_analyzer: ReviewAnalyzer, batch_size: int=30, verbosity: bool=False) -> None:
+    def __init__(self, data_processor: DataProcessor, review_analyzer: ReviewAnalyzer, batch_size: int=30, suggestion_cache: Optional[SuggestionCache]=None, browser_pool: Optional["BrowserPool"]=None, embedded_workers: int=1, job_max_attempts: int=3, job_lease_seconds: float=60.0, job_retention: float=7 * 86400, stream_partial_results: bool=True, result_store: Optional[ResultStore]=None, batch_token_budget: int=8000, combine_planner: Optional[CombinePlanner]=None, instant_max_age: float=86400, verbosity: bool=False) -> None:
         """
         Initializes the TaskManager object.
 
         Args:
         - data_processor (DataProcessor): The DataProcessor object to use for fetching reviews.
         - review_analyzer (ReviewAnalyzer): The ReviewAnalyzer object to use for analyzing reviews.
-        - batch_size (int): The number of reviews to process in each batch. Defaults to 30.
+        - batch_size (int): The number of reviews to process in each batch when `batch_token_budget` is 0, and in each batch of an incremental refresh. Defaults to 30.
+        - suggestion_cache (Optional[SuggestionCache]): The cache for autocomplete suggestions. Defaults to a `SuggestionCache` with default settings.
+        - browser_pool (Optional[BrowserPool]): The browser pool used to render PDF reports. Defaults to a `BrowserPool` with default settings.
+        - embedded_workers (int): The number of job workers run inside this process on startup. Set to 0 when full analyses are run by `worker.py` processes. Defaults to 1.
+        - job_max_attempts (int): The maximum number of times a full analysis job is tried. Defaults to 3.
+        - job_lease_seconds (float): The time in seconds a job stays reserved for a worker without a heartbeat before another worker may take it over. Defaults to 60.0.
+        - job_retention (float): The time in seconds a finished job, and so its token, is kept before the workers delete it. Jobs are never deleted if 0. Defaults to 7 days.
+        - stream_partial_results (bool): Whether to publish each batch analysis of a full analysis as a provisional result as soon as it is ready. Defaults to True.
+        - result_store (Optional[ResultStore]): The in-memory store of completed analysis results by token. Defaults to a `ResultStore` with default settings.
+        - batch_token_budget (int): The maximum number of prompt tokens of a batch analysis request. Reviews are packed into as few batches as fit 
+          the budget, or split into fixed batches of `batch_size` reviews if 0. Defaults to 8000.
+        - combine_planner (Optional[CombinePlanner]): The planner combining the batch analyses. Defaults to a `CombinePlanner` with default settings.
+        - instant_max_age (float): The time in seconds an instant analysis stays fresh. A stale one is still served, and refreshed in the background. 
+          Instant analyses never go stale if 0. Defaults to 86400.
         - verbosity (bool): Whether to print debug messages. Defaults to False.
         """
         self.cleanup_task = None
-        self.analysis_results = {}
+        self.result_store = result_store or ResultStore()
         self.verbosity = verbosity
         self.batch_size = batch_size
+        self.batch_token_budget = batch_token_budget
+        self.batch_plans = {"analyses": 0, "batches": 0, "reviews": 0}
         self.database = get_database()
+        self.single_flight = SingleFlight()
+        self.suggestion_cache = suggestion_cache or SuggestionCache()
+        self.browser_pool = browser_pool or BrowserPool(verbosity=verbosity)
+        self.embedded_workers = embedded_workers
+        self.job_max_attempts = job_max_attempts
+        self.job_lease_seconds = job_lease_seconds
+        self.job_retention = job_retention
+        self.stream_partial_results = stream_partial_results
+        self.jobs_enqueued = 0
+        self.jobs_coalesced = 0
+        self.instant_max_age = instant_max_age
+        self.instant_revalidations: Dict[str, asyncio.Task] = {}
+        self.instant_served = {"fresh": 0, "stale": 0, "missed": 0}
+        self.workers = []
+        self.progress_events = {}
         self.data_processor = data_processor
         self.review_analyzer = review_analyzer
+        self.combine_planner = combine_planner or CombinePlanner(review_analyzer, verbosity=verbosity)
         
+    async def startup(self) -> None:
+        """
+        Open the long-lived resources of the task manager and start its background tasks.
+
+        This is meant to be called once from the application lifespan on startup.
+        """
+        await self.database.connect()
+        await self.start_cleanup_task()
+        await self.start_workers(self.embedded_workers)
+        try:
+            await self.browser_pool.start()
+        except Exception as e:
+            # The pool is started again on the first download, the app can run without a browser
+            if self.verbosity:
+                print(f"TaskManager.startup | Failed to warm up the browser pool: {e}")
+
+    async def shutdown(self) -> None:
+        """
+        Stop the background tasks and close the long-lived resources of the task manager.
+
+        This is meant to be called once from the application lifespan on shutdown.
+        """
+        await self.stop_workers()
+        for task in list(self.instant_revalidations.values()):
+            task.cancel()
+        await asyncio.gather(*self.instant_revalidations.values(), return_exceptions=True)
+        if self.cleanup_task is not None:
+            self.cleanup_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.cleanup_task
+            self.cleanup_task = None
+        await self.database.close()
+        await self.data_processor.close()
+        await self.review_analyzer.close()
+        await self.browser_pool.close()
+
+    async def publish_progress(self, job: Dict[str, Any], stage: str, **counters) -> None:
+        """
+        Save the progress of a running job and wake up the progress streams of its token.
+
+        Args:
+        - job (Dict[str, Any]): The leased job.
+        - stage (str): The stage the analysis reached.
+        - **counters: The counters of the stage, e.g. `batches_done` and `batches_total`.
+        """
+        await self.database.update_job_progress(job["id"], job["lease_owner"], {"stage": stage, **counters})
+        self.notify_progress(job["token"])
+
+    async def publish_partial(self, job: Dict[str, Any], partial: Dict[str, Any]) -> None:
+        """
+        Save the provisional result of a running job, returned with its status until the final result replaces it.
+
+        Args:
+        - job (Dict[str, Any]): The leased job.
+        - partial (Dict[str, Any]): The provisional result.
+        """
+        await self.database.update_job_partial(job["id"], job["lease_owner"], partial)
+
+    def notify_progress(self, token: str) -> None:
+        """
+        Wake up the progress streams of a token waiting in this process.
+
+        Args:
+        - token (str): The token of the analysis.
+        """
+        if event := self.progress_events.pop(token, None):
+            event.set()
+
+    async def stream_progress(self, token: str, poll_interval: float=1.0) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Follow the progress of a full analysis until it completes or fails.
+
+        Args:
+        - token (str): The token of the analysis.
+        - poll_interval (float): The maximum time in seconds between two reads of the job, used when the job runs in another process. Defaults to 1.0.
+
+        Yields:
+        - Dict[str, Any]: The progress of the analysis each time it changes, with the "stage" and its counters. The "analysing" events 
+          carry the latest provisional result without its reviews as "partial", if any. The last event has the "completed" or "failed" 
+          stage, with the error of a failed analysis.
+
+        Raises:
+        - ValueError: If the token is invalid or expired.
+        """
+        last = None
+        while True:
+            job = await self.database.get_job(token)
+            if job is None:
+                # Tokens of analyses served without a job are their data ID, checked in the database shared by every process
+                if token in self.result_store or await self.database.check_and_retrieve_place(token, "full", include_reviews=False):
+                    yield {"stage": "completed"}
+                    return
+                raise ValueError(f"Invalid or expired token: {token}")
+            if job["status"] == "completed":
+                yield {"stage": "completed"}
+                return
+            if job["status"] == "failed":
+                yield {"stage": "failed", "error": job["error"]}
+                return
+            progress = {"stage": job["status"], **job["progress"]}
+            if progress["stage"] == "analysing" and job["partial"] is not None:
+                # The provisional result is sent with the progress, its reviews are listed once the analysis completes
+                progress["partial"] = {key: value for key, value in job["partial"].items() if key != "reviews"}
+            if progress != last:
+                last = progress
+                yield progress
+            event = self.progress_events.setdefault(token, asyncio.Event())
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(event.wait(), timeout=poll_interval)
+
+    async def start_workers(self, count: int) -> None:
+        """
+        Start job workers running full analysis jobs inside this process.
+
+        Args:
+        - count (int): The number of workers to start.
+        """
+        for _ in range(count):
+            worker = JobWorker(self, lease_seconds=self.job_lease_seconds, retention=self.job_retention, verbosity=self.verbosity)
+            worker.start()
+            self.workers.append(worker)
+
+    async def stop_workers(self) -> None:
+        """
+        Stop the job workers of this process. Jobs they were running are leased again by another worker once their lease expires.
+        """
+        for worker in self.workers:
+            await worker.stop()
+        self.workers = []
+
     async def start_cleanup_task(self):
         """
         Start a background task to clean up old analysis results.
 
-        This task periodically checks for any analysis results that are over 24 hours old
-        and removes them from the cache. If the task is already running, this function does nothing.
+        This task periodically drops the expired analysis results from the result store,
+        so their memory is freed even without traffic. If the task is already running, this function does nothing.
         """
         if self.cleanup_task is None:
-            await self.database.create_tables()
             self.cleanup_task = asyncio.create_task(self.cleanup_old_results())
 
     async def cleanup_old_results(self):
         """
         Periodically clean up old analysis results from the cache.
 
-        This task checks every hour for any analysis results that are over 24 hours old and removes them from the cache.
+        This task drops the expired analysis results from the result store every hour.
         """
         while True:
             await asyncio.sleep(3600)  # Check every hour
-            current_time = datetime.now()
-            to_remove = []
-            for token, result in self.analysis_results.items():
-                if 'created_at' in result and current_time - result['created_at'] > timedelta(hours=24):
-                    to_remove.append(token)
-            for token in to_remove:
-                del self.analysis_results[token]
+            self.result_store.expire()
         
     async def autocomplete(self, query: str, longitude: float, latitude: float, filter: Optional[str]=None) -> SuggestionResult:
         """
@@ -552,15 +2389,89 @@ class TaskManager:
 
         Returns:
         - SuggestionResult: A JSON response containing the autocomplete suggestions.
+
+        Suggestions are served from the suggestion cache when possible, SerpApi is only called on a cache miss.
+        """
+        result = self.suggestion_cache.get(query, latitude, longitude, filter)
+        if result is None:
+            result = await self.data_processor.get_suggestions(query, longitude, latitude, filter, truncate=False)
+            self.suggestion_cache.put(query, latitude, longitude, result, filter)
+        elif self.verbosity:
+            print(f"TaskManager.autocomplete | Suggestions for query `{query}` served from cache")
+        return SuggestionResult(
+            status=result.status,
+            created_at=result.created_at,
+            suggestions=result.suggestions[:self.data_processor.num_suggestion],
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get runtime counters of the task manager.
+
+        Returns:
+        - Dict[str, Any]: A dictionary of counters, including how many analysis calls were coalesced by the single-flight layer.
+        """
+        return {
+            "single_flight": self.single_flight.stats(),
+            "instant": {**self.instant_served, "revalidating": len(self.instant_revalidations)},
+            "result_store": self.result_store.stats(),
+            "batch_plans": dict(self.batch_plans),
+            "combine_plans": self.combine_planner.stats(),
+            "suggestion_cache": self.suggestion_cache.stats(),
+            "serpapi": self.data_processor.stats(),
+            "jobs": {
+                "enqueued": self.jobs_enqueued,
+                "coalesced": self.jobs_coalesced,
+                "embedded_workers": len(self.workers),
+            },
+        }
+
+    async def get_metrics(self) -> str:
         """
-        return await self.data_processor.get_suggestions(query, longitude, latitude, filter)
+        Render the Prometheus metrics of the process: the stage durations and LLM usage recorded by the spans,
+        and the runtime counters of `get_stats` and the job counts by status, collected at scrape time.
 
-    async def get_instant_analysis(self, data_id: str) -> AnalysisResult:
+        Returns:
+        - str: The metrics in the Prometheus text exposition format.
+        """
+        stats = self.get_stats()
+        jobs = await self.database.count_jobs()
+        collected = [
+            ("review_ai_suggestion_cache_requests_total", "counter", "Autocomplete lookups by outcome.",
+             [({"outcome": outcome}, stats["suggestion_cache"][key]) for outcome, key in [("hit", "hits"), ("prefix_hit", "prefix_hits"), ("miss", "misses")]]),
+            ("review_ai_result_store_requests_total", "counter", "Result store lookups by outcome.",
+             [({"outcome": "hit"}, stats["result_store"]["hits"]), ({"outcome": "miss"}, stats["result_store"]["misses"])]),
+            ("review_ai_result_store_bytes", "gauge", "Size in bytes of the results held in memory.",
+             [({}, stats["result_store"]["size_bytes"])]),
+            ("review_ai_instant_requests_total", "counter", "Instant analysis requests by freshness of the saved analysis.",
+             [({"outcome": outcome}, count) for outcome, count in stats["instant"].items() if outcome != "revalidating"]),
+            ("review_ai_single_flight_calls_total", "counter", "Analysis calls by outcome of the single-flight layer.",
+             [({"outcome": "executed"}, stats["single_flight"]["executions"]), ({"outcome": "coalesced"}, stats["single_flight"]["coalesced"])]),
+            ("review_ai_serpapi_pages_total", "counter", "SerpApi review pages fetched.",
+             [({}, stats["serpapi"]["pages_fetched"])]),
+            ("review_ai_serpapi_rate_limited_total", "counter", "SerpApi responses rate limited.",
+             [({}, stats["serpapi"]["rate_limited"])]),
+            ("review_ai_combine_calls_total", "counter", "Combine calls planned by the combine planner.",
+             [({}, stats["combine_plans"]["calls"])]),
+            ("review_ai_jobs", "gauge", "Full analysis jobs by status.",
+             [({"status": status}, jobs.get(status, 0)) for status in ["queued", "running", "completed", "failed"]]),
+        ]
+        return METRICS.render(collected)
+
+    async def get_instant_analysis(self, data_id: str, include_reviews: bool=True) -> AnalysisResult:
         """
         Get the instant analysis for the given data ID.
 
+        Concurrent requests for the same data ID that miss the database are coalesced, 
+        so only one of them fetches reviews and calls the LLM while the others await its result.
+
+        An analysis saved more than `instant_max_age` seconds ago is stale: it is still returned right away,
+        and a background refresh replaces it in the database, at most one at a time per data ID.
+
         Args:
         - data_id (str): The data ID of the location to get the analysis for.
+        - include_reviews (bool): Whether to decode the reviews of an analysis saved in the database. Without them, its reviews are left empty,
+          and can be paged through with `get_analysis_reviews`. Defaults to True.
 
         Returns:
         - AnalysisResult: A JSON response containing the analysis result.
@@ -570,10 +2481,59 @@ class TaskManager:
         """
         
         # Check if analysis already in db
-        existing_data = await self.database.check_and_retrieve_place(data_id, "instant")
+        existing_data = await self.database.check_and_retrieve_place(data_id, "instant", include_reviews=include_reviews)
         if existing_data:
+            refreshed_at = existing_data[0]["refreshed_at"] or 0
+            if self.instant_max_age and time.time() - refreshed_at > self.instant_max_age:
+                self.instant_served["stale"] += 1
+                self.revalidate_instant_analysis(data_id)
+            else:
+                self.instant_served["fresh"] += 1
             return AnalysisResult(**existing_data[0]['analysis'])
         
+        self.instant_served["missed"] += 1
+        return await self.single_flight.do((data_id, "instant"), self._process_instant_analysis_, data_id)
+
+    def revalidate_instant_analysis(self, data_id: str) -> asyncio.Task:
+        """
+        Refresh the instant analysis of a data ID in the background, unless a refresh of it is already running.
+
+        A failed refresh leaves the saved analysis in place, so it keeps being served until the next attempt.
+
+        Args:
+        - data_id (str): The data ID of the location to refresh the analysis of.
+
+        Returns:
+        - asyncio.Task: The running refresh.
+        """
+        if (task := self.instant_revalidations.get(data_id)) is not None:
+            return task
+
+        async def revalidate():
+            try:
+                await self.single_flight.do((data_id, "instant"), self._process_instant_analysis_, data_id)
+            except Exception as e:
+                if self.verbosity:
+                    print(f"TaskManager.revalidate_instant_analysis | Refresh of data_id `{data_id}` failed: {e}")
+            finally:
+                self.instant_revalidations.pop(data_id, None)
+
+        if self.verbosity:
+            print(f"TaskManager.revalidate_instant_analysis | Refreshing stale instant analysis of data_id `{data_id}`")
+        task = self.instant_revalidations[data_id] = asyncio.create_task(revalidate())
+        return task
+    
+    @timed("instant_analysis")
+    async def _process_instant_analysis_(self, data_id: str) -> AnalysisResult:
+        """
+        Fetch the reviews and generate the instant analysis for the given data ID, then save it in the database.
+
+        Args:
+        - data_id (str): The data ID of the location to get the analysis for.
+
+        Returns:
+        - AnalysisResult: The generated analysis result, or a `no_reviews` status dictionary if the place has no reviews.
+        """
         if self.verbosity:
             print(f"TaskManager.get_instant_analysis | Starting to fetch reviews for data_id `{data_id}`")
         review_result = await self.data_processor.get_reviews(data_id=data_id) 
@@ -594,210 +2554,552 @@ class TaskManager:
         
         return review_result
     
-    async def get_full_analysis(self, data_id: str, background_tasks: BackgroundTasks) -> dict:
+    async def get_full_analysis(self, data_id: str, refresh: bool=False) -> dict:
         """
         Run a full analysis of the hotel in the background.
 
         Args:
         - data_id (str): The data ID of the hotel to get the analysis for.
-        - background_tasks (BackgroundTasks): The background task manager for running the full analysis.
+        - refresh (bool): Whether to refresh a full analysis already saved in the database with the reviews posted since. Defaults to False.
 
         Returns:
         - dict: A JSON response containing the analysis token.
 
-        The full analysis is run asynchronously in the background, and the token can be used to retrieve the result.
+        The full analysis is queued in the durable job queue and run by a job worker, and the token can be used to retrieve the result.
+        If a full analysis for the same data ID is already queued or running, the caller is attached to its token instead of queuing a new one.
         """
-    
         # Check if analysis already in db
-        existing_data = await self.database.check_and_retrieve_place(data_id, "full")
-        if existing_data:
-            self.analysis_results[data_id] = {
-                "status": "completed",
-                "created_at": datetime.now(),
-                "data": existing_data[0]['analysis']
-            }
-            return {"token": data_id}
+        if not refresh:
+            # The result itself is loaded when the token is retrieved
+            if await self.database.check_and_retrieve_place(data_id, "full", include_reviews=False):
+                return {"token": data_id}
         
-        background_tasks.add_task(self._process_full_analysis_, data_id, data_id)
-        self.analysis_results[data_id] = {"status": "in_progress", "created_at": datetime.now()}
-        return {"token": data_id}
+        job, created = await self.database.enqueue_job(
+            token=data_id,
+            data_id=data_id,
+            kind="full",
+            payload={"refresh": refresh},
+            priority=0 if refresh else 10,
+            max_attempts=self.job_max_attempts,
+        )
+        if created:
+            self.jobs_enqueued += 1
+        else:
+            self.jobs_coalesced += 1
+            if self.verbosity:
+                print(f"TaskManager.get_full_analysis | Attached to active full analysis job for data_id `{data_id}`")
+        # The status of the token is now read from the job queue
+        self.result_store.pop(job["token"])
+        return {"token": job["token"]}
     
-    async def _process_full_analysis_(self, data_id: str, token: str) -> None:
+    async def _process_incremental_analysis_(self, data_id: str, previous: AnalysisResult, progress: Optional[Callable[..., Awaitable[None]]]=None) -> AnalysisResult:
+        """
+        Update a previous full analysis with the reviews posted since it was made.
+
+        Reviews are paged newest first until already analysed reviews are reached, and only these new reviews
+        are merged into the previous analysis, `batch_size` reviews per LLM call starting with the oldest.
+
+        Args:
+        - data_id (str): The data ID of the hotel to refresh the analysis for.
+        - previous (AnalysisResult): The previous full analysis, with `newest_review_at` set.
+        - progress (Optional[Callable[..., Awaitable[None]]]): Called with the stage and counters of the analysis as it advances. Defaults to None.
+
+        Returns:
+        - AnalysisResult: The updated analysis, with the new reviews prepended to the previous ones.
+        """
+        if self.verbosity:
+            print(f"TaskManager._process_incremental_analysis_ | Fetching reviews newer than {previous.newest_review_at} for data_id `{data_id}`")
+        delta = await self.data_processor.get_reviews(data_id=data_id, sort_by="newestFirst", use_full_reviews=True, since=previous.newest_review_at, progress=progress)
+        
+        result = previous
+        new_reviews = self.data_processor.sort_reviews_by_date(delta.reviews)
+        batches_total = -(-len(new_reviews) // self.batch_size)
+        for i in range(0, len(new_reviews), self.batch_size):
+            batch_result = AnalysisResult(**delta.model_dump())
+            batch_result.reviews = new_reviews[i:i + self.batch_size]
+            # The result carries the merged reviews from batch to batch, their sentiment is scored once they are all merged
+            result = await self.review_analyzer.integrate_analysis(result, batch_result, score_sentiment=False)
+            if progress is not None:
+                await progress("integrating", batches_done=i // self.batch_size + 1, batches_total=batches_total)
+        
+        if self.verbosity:
+            print(f"TaskManager._process_incremental_analysis_ | Integrated {len(new_reviews)} new reviews for data_id `{data_id}`")
+        
+        if new_reviews:
+            result.reviews = self.data_processor.sort_reviews_by_date(result.reviews, reverse=True)
+            result.hotel_analysis.overall_sentiment = self.review_analyzer.sentiment_scorer.score(result.reviews)
+            result.newest_review_at = delta.newest_review_at
+        result.rating = delta.rating or result.rating
+        result.total_reviews = delta.total_reviews or result.total_reviews
+        return result
+
+    @timed("full_analysis")
+    async def run_full_analysis(self, data_id: str, refresh: bool=False, progress: Optional[Callable[..., Awaitable[None]]]=None, partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]]=None) -> AnalysisResult:
         """
-        Process the full analysis of the hotel in the background.
+        Run the full analysis of the hotel and save it in the database. This is what a job worker runs for a full analysis job.
 
         Args:
         - data_id (str): The data ID of the hotel to get the analysis for.
-        - token (str): The analysis token to store the result.
+        - refresh (bool): Whether to refresh the full analysis saved in the database incrementally. Defaults to False.
+        - progress (Optional[Callable[..., Awaitable[None]]]): Called with the stage ("fetching", "integrating", "planned", "analysing" or "combining") 
+          and its counters as keyword arguments each time the analysis advances. Defaults to None.
+        - partial (Optional[Callable[[Dict[str, Any]], Awaitable[None]]]): Called with a provisional result each time a batch analysis is ready, 
+          made of the latest batch analysis and the reviews of the batches analysed so far. Defaults to None.
 
         Returns:
-        - None
+        - AnalysisResult: The full analysis result.
+
+        Raises:
+        - ValueError: With message "no_reviews" if the place has no reviews.
+        - RuntimeError: If the analysis could not be saved in the database.
 
-        The function is run asynchronously in the background, and the result is stored in `self.analysis_results` with the given token.
-        The result can be retrieved using the `get_analysis_result` method.
+        Previous analyses saved without `newest_review_at` are analysed again from scratch.
         """
-        try:
-            # Get full hotel reviews
+        previous = None
+        if refresh:
+            existing_data = await self.database.check_and_retrieve_place(data_id, "full")
+            previous = existing_data[0]['analysis'] if existing_data else None
+        
+        if previous is not None and previous.get("newest_review_at") and previous.get("hotel_analysis"):
+            result = await self._process_incremental_analysis_(data_id, AnalysisResult(**previous), progress)
+            if await self.database.save_new_data(data_id, "full", result.model_dump()) is None:
+                raise RuntimeError(f"Failed to save the full analysis of data_id {data_id}")
             if self.verbosity:
-                print(f"TaskManager._process_full_analysis_ | Starting to fetch reviews for data_id `{data_id}`")
-            review_result = await self.data_processor.get_reviews(data_id=data_id, use_full_reviews=True)
-            
-            if review_result.reviews == [] or (not review_result.reviews):
-                if self.verbosity:
-                    print(f"TaskManager._process_full_analysis_ | No reviews found for data_id `{data_id}`")
-                raise ValueError("no_reviews")
-            
-            batches = [review_result.reviews[i:i + self.batch_size] for i in range(0, len(review_result.reviews), self.batch_size)]
-            
-            async def process_batch(batch):
-                if self.verbosity:
-                    print(f"TaskManager._process_full_analysis_ | Processing batches of reviews for data_id `{data_id}`")
-                batch_result = AnalysisResult(**review_result.model_dump())
-                batch_result.reviews = batch
-                return await self.review_analyzer.generate_analysis(batch_result)
-            
-            async def combine_level(results: List[AnalysisResult], batch_size: int=10) -> List[AnalysisResult]:
-                if len(results) <= 1:
-                    return results
-                
-                batches = [results[i:i+batch_size] for i in range(0, len(results), batch_size)]
-                combined_results = await asyncio.gather(*[self.review_analyzer.combine_analysis(batch) for batch in batches])
+                print(f"TaskManager.run_full_analysis | Incremental analysis completed for data_id `{data_id}`")
+            return result
 
-                if len(combined_results) > 1:
-                    return await combine_level(combined_results)
-                else:
-                    return combined_results
-                
-            # Process batches asynchronously
-            batch_results = await asyncio.gather(*[process_batch(batch) for batch in batches])
-            
-            # Combining analysis results
-            final_results = await combine_level(batch_results, batch_size=self.batch_size//2)
-            final_results[0].reviews = self.data_processor.sort_reviews_by_date(review_result.reviews, reverse=True)
-            
-            # Save in db
-            await self.database.save_new_data(data_id, "full", final_results[0].model_dump())
-            
-            self.analysis_results[token] = {
-                "status": "completed", 
-                "created_at": datetime.now(),
-                "data": final_results[0].model_dump(),
-            }
+        # Get full hotel reviews
+        if self.verbosity:
+            print(f"TaskManager.run_full_analysis | Starting to fetch reviews for data_id `{data_id}`")
+        review_result = await self.data_processor.get_reviews(data_id=data_id, use_full_reviews=True, progress=progress)
+        
+        if review_result.reviews == [] or (not review_result.reviews):
             if self.verbosity:
-                print(f"TaskManager._process_full_analysis_ | Full analysis completed for token: {token}")
-        except Exception as e:
-            self.analysis_results[token] = {
-                "error": str(e),
-                "status": "failed", 
-                "created_at": datetime.now()
-            }
+                print(f"TaskManager.run_full_analysis | No reviews found for data_id `{data_id}`")
+            raise ValueError("no_reviews")
+        
+        if self.batch_token_budget:
+            batches, plan = self.review_analyzer.plan_batches(review_result, self.batch_token_budget)
+        else:
+            batches = [review_result.reviews[i:i + self.batch_size] for i in range(0, len(review_result.reviews), self.batch_size)]
+            plan = {"batches": len(batches), "reviews": len(review_result.reviews)}
+        self.batch_plans["analyses"] += 1
+        self.batch_plans["batches"] += plan["batches"]
+        self.batch_plans["reviews"] += plan["reviews"]
+        if progress is not None:
+            await progress("planned", **plan)
+        
+        async def process_batch(index, batch):
             if self.verbosity:
-                print(f"TaskManager._process_full_analysis_ | Full analysis failed for token: {token} with error: {e}")
+                print(f"TaskManager.run_full_analysis | Processing batches of reviews for data_id `{data_id}`")
+            batch_result = AnalysisResult(**review_result.model_dump())
+            batch_result.reviews = batch
+            return index, await self.review_analyzer.generate_analysis(batch_result, priority="full")
+        
+        # Process batches asynchronously, publishing each batch analysis as soon as it is ready
+        batch_results = [None] * len(batches)
+        analysed_reviews = []
+        for batches_done, next_batch in enumerate(asyncio.as_completed([process_batch(i, batch) for i, batch in enumerate(batches)]), start=1):
+            index, analysis = await next_batch
+            batch_results[index] = analysis
+            if partial is not None:
+                analysed_reviews.extend(batches[index])
+                provisional = analysis.model_copy(update={"reviews": self.data_processor.sort_reviews_by_date(analysed_reviews, reverse=True)})
+                await partial({**provisional.model_dump(), "batches_done": batches_done, "batches_total": len(batches)})
+            if progress is not None:
+                await progress("analysing", batches_done=batches_done, batches_total=len(batches))
+        
+        # Combining analysis results
+        final_result = await self.combine_planner.combine(batch_results, progress=progress)
+        final_result.reviews = self.data_processor.sort_reviews_by_date(review_result.reviews, reverse=True)
+        
+        # Save in db, a failed save fails the job so it is retried
+        if await self.database.save_new_data(data_id, "full", final_result.model_dump()) is None:
+            raise RuntimeError(f"Failed to save the full analysis of data_id {data_id}")
+        if self.verbosity:
+            print(f"TaskManager.run_full_analysis | Full analysis completed for data_id `{data_id}`")
+        return final_result
             
-    async def get_analysis_result(self, token: str) -> dict:
+    async def get_report_pdf(self, data: Dict[str, Any], content_hash: Optional[str]=None, analysis_type: str="full") -> bytes:
+        """
+        Get the PDF report of a completed analysis result, rendering it only if it is not cached yet.
+
+        Args:
+        - data (Dict[str, Any]): The completed analysis result, as returned by `get_analysis_result`.
+        - content_hash (Optional[str]): The hash of the result if already computed, see `analysis_hash`.
+        - analysis_type (str): The type of the analysis, "instant" or "full", each having its own cached report. Defaults to "full".
+
+        Returns:
+        - bytes: The content of the PDF report.
+        """
+        content_hash = content_hash or analysis_hash(data)
+        if (pdf_content := await self.database.get_report_pdf(data["data_id"], content_hash, analysis_type)) is not None:
+            if self.verbosity:
+                print(f"TaskManager.get_report_pdf | {analysis_type.capitalize()} report for data_id `{data['data_id']}` served from cache")
+            return pdf_content
+        
+        pdf_content = await download_result(data, self.browser_pool)
+        await self.database.save_report_pdf(data["data_id"], content_hash, pdf_content, analysis_type)
+        return pdf_content
+
+    async def get_analysis_result(self, token: str, include_reviews: bool=True) -> dict:
         """
         Get the analysis result for the given token.
 
         Args:
         - token (str): The token of the analysis result to be retrieved.
+        - include_reviews (bool): Whether to include the reviews of a completed analysis. Without them, the analysis is 
+          loaded without decoding its reviews, which can be paged through with `get_analysis_reviews`. Defaults to True.
 
         Returns:
-        - dict: A JSON response containing the analysis result, or a status message if the analysis is still in progress.
+        - dict: A JSON response containing the analysis result, or a status message if the analysis is still in progress. 
+          Once batch analyses are ready, the status message carries the latest provisional result under "partial".
+          A failed analysis is reported as failed only if no analysis of the place is saved, a failed refresh serves the saved one.
 
         Raises:
         - ValueError: If the token is invalid or expired.
         """
-        if token not in self.analysis_results:
-            raise ValueError(f"Invalid or expired token: {token}")
+        result = await self.get_encoded_result(token, fields="all" if include_reviews else "analysis")
+        return result if isinstance(result, dict) else codec.loads(result.body)
+
+    async def get_encoded_result(self, token: str, fields: str="all") -> EncodedResult | dict:
+        """
+        Get the analysis result for the given token, pre-encoded once it is completed.
+
+        Completed results, and their projection without reviews, are encoded when they enter the result store, 
+        so fetching the same token and fields again only copies the encoded bytes.
+
+        Args:
+        - token (str): The token of the analysis result to be retrieved.
+        - fields (str): "all" for the whole result, or "analysis" for the result without its reviews. Defaults to "all".
+
+        Returns:
+        - EncodedResult | dict: The encoded result if the analysis is completed, otherwise the status message of `get_analysis_result`.
 
-        result = self.analysis_results[token]
+        Raises:
+        - ValueError: If the token is invalid or expired.
+        """
+        # Full analyses are run by job workers, possibly in another process
+        job = await self.database.get_job(token)
+        if job is not None:
+            if job["status"] in ["queued", "running"]:
+                if job["partial"] is not None:
+                    partial = job["partial"] if fields == "all" else {key: value for key, value in job["partial"].items() if key != "reviews"}
+                    return {"status": "in_progress", "partial": partial}
+                return {"status": "in_progress"}
+
+        # A refresh queued by another process is a new job, so the result it saved replaces the one stored here
+        version = job["id"] if job is not None else 0
+        if (encoded := self.result_store.lookup(token, version, fields)) is not None:
+            return encoded
+        if fields == "analysis" and (encoded := self.result_store.lookup(token, version)) is not None:
+            result = {key: value for key, value in codec.loads(encoded.body).items() if key != "reviews"}
+            return self.result_store.put(token, result, version, fields="analysis")
         
-        if result["status"] == "completed":
-            return result["data"]
-        elif result["status"] == "in_progress":
-            return {"status": "in_progress"}
-        else:
-            return {"status": "failed", "error": "no_reviews"}
+        # Rehydrate the result from the database, tokens of analyses served without a job are their data ID
+        existing_data = await self.database.check_and_retrieve_place(job["data_id"] if job else token, "full", include_reviews=fields != "analysis")
+        if not existing_data:
+            if job is not None and job["status"] == "failed":
+                return {"status": "failed", "error": job["error"] or "no_reviews"}
+            raise ValueError(f"Invalid or expired token: {token}")
+        result = existing_data[0]['analysis']
+        if fields == "analysis":
+            # Analyses saved before their reviews were stored apart have them inline
+            result.pop("reviews", None)
+        return self.result_store.put(token, result, version, fields=fields)
+
+    async def get_analysis_reviews(self, token: str, analysis_type: str="full", **query) -> Dict[str, Any]:
+        """
+        Get a page of the reviews of a saved analysis, served from the review index of the database.
+
+        Args:
+        - token (str): The token of a full analysis, or the data ID of an instant analysis.
+        - analysis_type (str): The type of analysis, either "instant" or "full". Defaults to "full".
+        - **query: The sort, pagination and filters of the page, see `DataBase.get_analysis_reviews`.
+
+        Returns:
+        - Dict[str, Any]: The `reviews` of the page, the `next_cursor` or None on the last page, and the `total` number of reviews matching the filters.
+
+        Raises:
+        - ValueError: If there is no saved analysis for the token, or the query is invalid.
+        """
+        data_id = token
+        if analysis_type == "full" and (job := await self.database.get_job(token)) is not None:
+            data_id = job["data_id"]
+        if not await self.database.has_review_index(data_id, analysis_type):
+            # Analyses saved before the index existed are indexed on first use
+            existing_data = await self.database.check_and_retrieve_place(data_id, analysis_type)
+            if not existing_data:
+                raise ValueError(f"Invalid or expired token: {token}")
+            await self.database.index_analysis_reviews(data_id, analysis_type, existing_data[0]["analysis"].get("reviews", []))
+        return await self.database.get_analysis_reviews(data_id, analysis_type, **query)
   
   
   
-async def download_result(host: str, port: int, token: str) -> str:
-    url = f"http://{host}:{port}/retrieve"
-    pdf_filename = f"/tmp/{uuid.uuid4()}.pdf"
-    
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-        
-        await page.set_viewport_size({"width": 1920, "height": 1080})
-        await page.goto(url)
-        await page.fill('#tokenInput', token)
-        await page.click('#retrieveButton')
-        await page.wait_for_selector('#analysisContent', state='visible', timeout=10000)
-        
-        await page.evaluate('''() => {
-            const element = document.getElementById('analysisContent');
-            const rect = element.getBoundingClientRect();
-            document.body.innerHTML = '';
-            document.body.appendChild(element);
+class BrowserPool:
+    """
+    A pool of warm Chromium browser contexts used to render analysis reports as PDF.
+
+    A single Chromium instance is launched once and kept alive with `size` browser contexts.
+    Each render borrows a context for one page, so `size` is also the cap on concurrently rendered pages.
+    """
+    def __init__(self, size: int=2, verbosity: bool=False) -> None:
+        """
+        Initialize a `BrowserPool` instance. The browser is only launched by `start` or on first use.
+
+        Args:
+        - size (int): The number of browser contexts kept warm, and the maximum number of pages rendered at once. Defaults to 2.
+        - verbosity (bool): Whether to print debug messages. Defaults to False.
+        """
+        self.size = size
+        self.verbosity = verbosity
+        self._browser = None
+        self._contexts = None
+        self._playwright = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Whether the browser is launched and connected.
+        """
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self) -> None:
+        """
+        Launch Chromium and open the browser contexts of the pool.
+
+        Calling this method while the browser is running does nothing. If the browser died, it is launched again.
+        """
+        async with self._lock:
+            if self.is_running:
+                return
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch()
+            self._contexts = asyncio.Queue()
+            for _ in range(self.size):
+                self._contexts.put_nowait(await self._browser.new_context(viewport={"width": 1920, "height": 1080}))
+            if self.verbosity:
+                print(f"BrowserPool.start | Chromium launched with {self.size} warm contexts")
+
+    async def close(self) -> None:
+        """
+        Close the browser contexts, the browser and the playwright driver.
+        """
+        async with self._lock:
+            if self._browser is not None:
+                await self._browser.close()
+                self._browser = None
+                self._contexts = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        """
+        Borrow a warm browser context and open a new page in it for the duration of the context.
+        """
+        await self.start()
+        contexts = self._contexts
+        context = await contexts.get()
+        page = await context.new_page()
+        try:
+            yield page
+        finally:
+            await page.close()
+            contexts.put_nowait(context)
+
+    async def render_pdf(self, html: str) -> bytes:
+        """
+        Render the given HTML document as a PDF.
+
+        The analysis section is detached from the rest of the document and the page is sized to it,
+        the reviews column and the download button are removed.
+
+        Args:
+        - html (str): The HTML document to render.
+
+        Returns:
+        - bytes: The content of the rendered PDF.
+        """
+        async with self.page() as page:
+            # The report has no external resources, so it is ready once loaded
+            await page.set_content(html, wait_until="load")
+            await page.wait_for_selector('#analysisContent', state='visible', timeout=10000)
             
-            const divToRemove = document.evaluate(
-                '//*[@id="analysisContent"]/div/div/div[2]/div',
-                document,
-                null,
-                XPathResult.FIRST_ORDERED_NODE_TYPE,
-                null
-            ).singleNodeValue;
-            if (divToRemove) {
-                divToRemove.remove();
-            }
-            const buttonToRemove = document.evaluate(
-                '//*[@id="downloadAnalysis"]',
-                document,
-                null,
-                XPathResult.FIRST_ORDERED_NODE_TYPE,
-                null
-            ).singleNodeValue;
-            if (buttonToRemove) {
-                buttonToRemove.remove();
-            }
+            await page.evaluate('''() => {
+                const element = document.getElementById('analysisContent');
+                const rect = element.getBoundingClientRect();
+                document.body.innerHTML = '';
+                document.body.appendChild(element);
+                
+                const divToRemove = document.evaluate(
+                    '//*[@id="analysisContent"]/div/div/div[2]/div',
+                    document,
+                    null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE,
+                    null
+                ).singleNodeValue;
+                if (divToRemove) {
+                    divToRemove.remove();
+                }
+                const buttonToRemove = document.evaluate(
+                    '//*[@id="downloadAnalysis"]',
+                    document,
+                    null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE,
+                    null
+                ).singleNodeValue;
+                if (buttonToRemove) {
+                    buttonToRemove.remove();
+                }
+                
+                document.body.style.margin = '0';
+                document.body.style.width = rect.width + 'px';
+                document.body.style.height = rect.height + 'px';
+            }''')
             
-            document.body.style.margin = '0';
-            document.body.style.width = rect.width + 'px';
-            document.body.style.height = rect.height + 'px';
-        }''')
-        
-        await page.pdf(path=pdf_filename, print_background=True)
-        await browser.close()
-        
-    with open(pdf_filename, 'rb') as file:
-        pdf_content = file.read()
-    os.remove(pdf_filename)
+            return await page.pdf(print_background=True)
+
+
+
+def analysis_hash(data: Dict[str, Any]) -> str:
+    """
+    Compute a stable hash of an analysis result, used to key cached reports and as ETag.
+
+    Args:
+    - data (Dict[str, Any]): The analysis result.
+
+    Returns:
+    - str: The hex digest of the SHA-256 hash of the canonical JSON of the result.
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def pack_in_order(costs: List[int], capacity: int, max_items: Optional[int]=None) -> List[Tuple[int, int]]:
+    """
+    Split a sequence of item costs into as few consecutive groups as possible under a capacity, balancing the groups.
+
+    The number of groups is the one of a greedy packing, which is the smallest possible when the order is kept. The groups
+    are then balanced to the smallest capacity giving the same number of groups. An item costing more than the capacity 
+    on its own gets a group of its own.
 
-    return pdf_content
+    Args:
+    - costs (List[int]): The cost of each item.
+    - capacity (int): The maximum total cost of a group.
+    - max_items (Optional[int]): The maximum number of items of a group. Defaults to None, no limit.
+
+    Returns:
+    - List[Tuple[int, int]]: The start and end index of each group.
+    """
+    def pack(limit: int) -> List[Tuple[int, int]]:
+        bounds, start, used = [], 0, 0
+        for i, cost in enumerate(costs):
+            if i > start and (used + cost > limit or (max_items and i - start >= max_items)):
+                bounds.append((start, i))
+                start, used = i, 0
+            used += cost
+        if start < len(costs):
+            bounds.append((start, len(costs)))
+        return bounds
+
+    capacity = max(capacity, 1)
+    count = len(pack(capacity))
+    low, high = min(max(costs, default=1), capacity), capacity
+    while low < high:
+        middle = (low + high) // 2
+        if len(pack(middle)) <= count:
+            high = middle
+        else:
+            low = middle + 1
+    return pack(high)
+
+
+REPORT_TEMPLATES = Environment(loader=FileSystemLoader([
+    os.path.join(os.path.dirname(__file__), "templates"),
+    os.path.join(os.path.dirname(__file__), "static"),
+]))
+
+@timed("render_pdf")
+async def download_result(data: Dict[str, Any], browser_pool: BrowserPool) -> bytes:
+    """
+    Render a completed analysis result as a PDF report.
+
+    The report is rendered straight from the analysis data with the same script as the retrieve page,
+    without loading the page through the server or writing temporary files.
+
+    Args:
+    - data (Dict[str, Any]): The completed analysis result, as returned by `TaskManager.get_analysis_result`.
+    - browser_pool (BrowserPool): The browser pool used to render the PDF.
+
+    Returns:
+    - bytes: The content of the PDF report.
+    """
+    html = REPORT_TEMPLATES.get_template("report.html").render(data=data)
+    return await browser_pool.render_pdf(html)
     
 
 
 DATABASE = None
-def get_database(database_name: str = "reviews.db") -> DataBase:
+def get_database(database_name: str = "reviews.db", pool_size: int = 4) -> DataBase:
     global DATABASE
     if DATABASE is None:
-        DATABASE = DataBase(database_name)
+        DATABASE = DataBase(database_name, pool_size=pool_size)
     return DATABASE
 
 TASK_MANAGER = None
-def get_task_manager(serpapi_key: str, model: str, openai_key: str, num_reviews: int=50, max_reviews: int=150, num_suggestion: int=5, batch_size: int=30, language: str="en", country: str="in", delay: float=1, verbosity: bool=True) -> TaskManager:
+def get_task_manager(serpapi_key: str, model: str, openai_key: str, num_reviews: int=50, max_reviews: int=150, num_suggestion: int=5, batch_size: int=30, language: str="en", country: str="in", delay: float=1, serpapi_http2: bool=False, serpapi_max_connections: int=20, review_store_ttl: float=3600, suggestion_cache_size: int=1024, suggestion_cache_ttl: float=600, suggestion_cache_min_results: int=1, browser_pool_size: int=2, embedded_workers: int=1, job_max_attempts: int=3, job_lease_seconds: float=60.0, job_retention_days: float=7, stream_partial_results: bool=True, result_store_max_bytes: int=64 * 1024 * 1024, result_store_ttl: float=86400, batch_token_budget: int=8000, combine_token_budget: int=12000, combine_max_fan_in: int=8, instant_max_age: float=86400, database_path: str="reviews.db", fake_backends: Optional[str]=None, fake_serpapi_latency: float=0.0, fake_llm_latency: float=0.0, llm_concurrency: int=8, llm_reserved_instant: int=2, llm_model_concurrency: Optional[Dict[str, int]]=None, verbosity: bool=True) -> TaskManager:
     global TASK_MANAGER
     if TASK_MANAGER is None:
+        get_database(database_path)
+        transport = None
+        review_analyzer = ReviewAnalyzer(
+            model=model,
+            api_key=openai_key,
+            verbosity=verbosity,
+            data_prompt=DATA_PROMPT,
+            integration_prompt=INTEGRATION_PROMPT,
+            max_concurrency=llm_concurrency,
+            reserved_instant=llm_reserved_instant,
+            model_concurrency=llm_model_concurrency,
+            system_prompt=SYSTEM_PROMPT,
+            batch_analytics_prompt=BATCH_ANALYTICS_PROMPT
+        )
+        if fake_backends:
+            # Replay a recorded analysis instead of calling SerpApi and OpenAI, the fakes are only loaded for offline runs
+            from review_ai.fakes import load_fixture, FakeSerpApi, FakeOpenAI
+            fixture = load_fixture(fake_backends)
+            transport = FakeSerpApi(fixture, latency=fake_serpapi_latency).transport
+            review_analyzer.client = FakeOpenAI(fixture, latency=fake_llm_latency)
         TASK_MANAGER = TaskManager(
             batch_size=batch_size,
-            review_analyzer=ReviewAnalyzer(
-                model=model,
-                api_key=openai_key,
+            batch_token_budget=batch_token_budget,
+            embedded_workers=embedded_workers,
+            job_max_attempts=job_max_attempts,
+            job_lease_seconds=job_lease_seconds,
+            job_retention=job_retention_days * 86400,
+            stream_partial_results=stream_partial_results,
+            instant_max_age=instant_max_age,
+            result_store=ResultStore(
+                max_bytes=result_store_max_bytes,
+                ttl=result_store_ttl,
+            ),
+            suggestion_cache=SuggestionCache(
+                max_size=suggestion_cache_size,
+                ttl=suggestion_cache_ttl,
+                min_results=suggestion_cache_min_results,
+            ),
+            browser_pool=BrowserPool(
+                size=browser_pool_size,
+                verbosity=verbosity,
+            ),
+            review_analyzer=review_analyzer,
+            combine_planner=CombinePlanner(
+                review_analyzer,
+                token_budget=combine_token_budget,
+                max_fan_in=combine_max_fan_in,
                 verbosity=verbosity,
-                data_prompt=DATA_PROMPT,
-                system_prompt=SYSTEM_PROMPT,
-                batch_analytics_prompt=BATCH_ANALYTICS_PROMPT
             ),
             data_processor=DataProcessor(
                 delay=delay,
@@ -805,7 +3107,12 @@ def get_task_manager(serpapi_key: str, model: str, openai_key: str, num_reviews:
                 language=language,
                 verbosity=verbosity,
                 api_key=serpapi_key,
+                http2=serpapi_http2,
                 num_reviews=num_reviews, 
+                max_connections=serpapi_max_connections,
+                database=get_database(),
+                review_store_ttl=review_store_ttl,
+                transport=transport,
                 max_reviews=max_reviews,
                 num_suggestion=num_suggestion, 
             )
@@ -0,0 +1,131 @@
+import gzip
+import json
+import zlib
+from typing import Any, Dict, Tuple
+from review_ai.metrics import COMPRESSION_SECONDS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+
+# The codec of new payloads, the best one available in this environment
+CODEC = "json+zstd" if zstandard is not None else "json+zlib"
+
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard is not None else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Serialize data as compact JSON, with `orjson` when it is installed.
+
+    Args:
+    - data (Any): The JSON-serializable data.
+
+    Returns:
+    - bytes: The UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    """
+    Parse JSON, with `orjson` when it is installed.
+
+    Args:
+    - data (bytes | str): The JSON document.
+
+    Returns:
+    - Any: The parsed data.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def pack(data: Any) -> Tuple[bytes, str]:
+    """
+    Serialize and compress data with `CODEC`.
+
+    Args:
+    - data (Any): The JSON-serializable data.
+
+    Returns:
+    - Tuple[bytes, str]: The compressed payload and the name of its codec, to give back to `unpack`.
+    """
+    raw = dumps(data)
+    if CODEC == "json+zstd":
+        return _zstd_compressor.compress(raw), CODEC
+    return zlib.compress(raw, 6), CODEC
+
+
+def unpack(payload: bytes, codec: str) -> Any:
+    """
+    Decompress and parse a payload produced by `pack`.
+
+    Args:
+    - payload (bytes): The compressed payload.
+    - codec (str): The name of the codec of the payload.
+
+    Returns:
+    - Any: The data.
+
+    Raises:
+    - ValueError: If the codec is unknown, or is "json+zstd" and the optional `zstandard` package is not installed.
+    """
+    if codec == "json+zlib":
+        return loads(zlib.decompress(payload))
+    if codec == "json+zstd":
+        if _zstd_decompressor is None:
+            raise ValueError("Decoding a json+zstd payload requires the `zstandard` package")
+        return loads(_zstd_decompressor.decompress(payload))
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+# The HTTP content encodings `compress_variants` produces, in order of preference
+CONTENT_ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a response body with an HTTP content encoding of `CONTENT_ENCODINGS`, observing the time spent in `COMPRESSION_SECONDS`.
+
+    Args:
+    - body (bytes): The response body.
+    - encoding (str): "gzip", or "br" if the optional `brotli` package is installed.
+
+    Returns:
+    - bytes: The compressed body.
+    """
+    with COMPRESSION_SECONDS.time(encoding=encoding):
+        if encoding == "br":
+            return brotli.compress(body, quality=5)
+        return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """
+    Compress a response body with every HTTP content encoding available, brotli requiring the optional `brotli` package.
+
+    Args:
+    - body (bytes): The response body.
+
+    Returns:
+    - Dict[str, bytes]: The compressed body by content encoding, see `CONTENT_ENCODINGS`.
+    """
+    return {encoding: compress(body, encoding) for encoding in CONTENT_ENCODINGS}
@@ -0,0 +1,166 @@
+import json
+import random
+import asyncio
+import httpx
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from review_ai.utils import AnalysisResult
+
+
+
+def load_fixture(path: str = "output.json") -> AnalysisResult:
+    """
+    Load a recorded full analysis, like the `output.json` saved from `/api/analysis/{token}`.
+
+    Args:
+    - path (str, optional): The path of the JSON file. Defaults to "output.json".
+
+    Returns:
+    - AnalysisResult: The recorded analysis, with its place information, reviews and hotel analysis.
+    """
+    with open(path) as f:
+        return AnalysisResult(**json.load(f))
+
+
+async def _sleep(latency: float, jitter: float) -> None:
+    if latency or jitter:
+        await asyncio.sleep(latency + random.uniform(0, jitter))
+
+
+
+class FakeSerpApi:
+    """
+    An offline stand-in for SerpApi replaying the place and reviews of a recorded analysis.
+
+    Every data_id is answered with the recorded place and reviews, so a benchmark can spread its requests over
+    as many distinct places as it needs. It plugs into `DataProcessor` as its HTTP transport.
+    """
+    def __init__(self, fixture: AnalysisResult, page_size: int = 10, latency: float = 0.0, jitter: float = 0.0) -> None:
+        """
+        Initialize a `FakeSerpApi` instance.
+
+        Args:
+        - fixture (AnalysisResult): The recorded analysis to replay.
+        - page_size (int, optional): The number of reviews per page. Defaults to 10.
+        - latency (float, optional): The time in seconds each response takes. Defaults to 0.0.
+        - jitter (float, optional): The maximum random time in seconds added to the latency. Defaults to 0.0.
+        """
+        self.fixture = fixture
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.reviews = [self._raw_review(i, review) for i, review in enumerate(fixture.reviews)]
+
+    @staticmethod
+    def _raw_review(i: int, review) -> Dict[str, Any]:
+        iso_date = datetime.strptime(review.date, "%B %d, %Y at %I:%M %p UTC").strftime("%Y-%m-%dT%H:%M:%SZ")
+        return {
+            "review_id": f"fixture-{i}",
+            "rating": review.rating,
+            "user": {"name": review.user},
+            "iso_date": iso_date,
+            "extracted_snippet": {"original": review.review_text},
+        }
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        """
+        The HTTP transport to give to `DataProcessor`.
+        """
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a SerpApi request.
+
+        Args:
+        - request (httpx.Request): The request sent to SerpApi.
+
+        Returns:
+        - httpx.Response: A response shaped like the SerpApi one for the requested engine.
+        """
+        self.requests += 1
+        await _sleep(self.latency, self.jitter)
+        params = request.url.params
+        search_metadata = {"status": "Success", "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")}
+        if params.get("engine") == "google_maps_autocomplete":
+            return httpx.Response(200, json={"search_metadata": search_metadata, "suggestions": self._suggestions(params.get("q", ""))})
+
+        reviews = self.reviews
+        if params.get("sort_by") == "newestFirst":
+            reviews = sorted(reviews, key=lambda review: review["iso_date"], reverse=True)
+        page = int(params.get("next_page_token", 0))
+        data = {
+            "search_metadata": search_metadata,
+            "search_parameters": {"data_id": params.get("data_id")},
+            "place_info": {
+                "type": self.fixture.type,
+                "title": self.fixture.title,
+                "rating": self.fixture.rating,
+                "address": self.fixture.address,
+                "reviews": self.fixture.total_reviews,
+            },
+            "reviews": reviews[page * self.page_size:(page + 1) * self.page_size],
+        }
+        if (page + 1) * self.page_size < len(reviews):
+            data["serpapi_pagination"] = {"next": str(request.url), "next_page_token": str(page + 1)}
+        return httpx.Response(200, json=data)
+
+    def _suggestions(self, query: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "type": "lodging",
+                "value": f"{query.title()} {self.fixture.title}" if i else self.fixture.title,
+                "data_id": f"{self.fixture.data_id}-{i}" if i else self.fixture.data_id,
+                "subtext": self.fixture.address,
+                "latitude": 0.0,
+                "longitude": 0.0,
+            }
+            for i in range(5)
+        ]
+
+
+
+class FakeOpenAI:
+    """
+    An offline stand-in for the `AsyncOpenAI` client of `ReviewAnalyzer`, answering every structured output request
+    with the hotel analysis of a recorded analysis.
+
+    Only the client is replaced, so the analyzer's concurrency limits, batching and combine planning run as usual.
+    """
+    def __init__(self, fixture: AnalysisResult, latency: float = 0.0, jitter: float = 0.0) -> None:
+        """
+        Initialize a `FakeOpenAI` instance.
+
+        Args:
+        - fixture (AnalysisResult): The recorded analysis, with its hotel_analysis field populated.
+        - latency (float, optional): The time in seconds each completion takes. Defaults to 0.0.
+        - jitter (float, optional): The maximum random time in seconds added to the latency. Defaults to 0.0.
+        """
+        self.fixture = fixture
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=self))
+
+    async def parse(self, **kwargs) -> SimpleNamespace:
+        """
+        Answer a `beta.chat.completions.parse` request.
+
+        Returns:
+        - SimpleNamespace: A completion whose first choice holds the recorded hotel analysis parsed as the requested
+          `response_format`, with a token usage estimated at four characters per token.
+        """
+        self.requests += 1
+        await _sleep(self.latency, self.jitter)
+        parsed = kwargs["response_format"].model_validate(self.fixture.hotel_analysis.model_dump())
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(message["content"]) for message in kwargs.get("messages", [])) // 4,
+            completion_tokens=len(parsed.model_dump_json()) // 4,
+        )
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(parsed=parsed))], usage=usage)
+
+    async def close(self) -> None:
+        pass
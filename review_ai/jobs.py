@@ -0,0 +1,148 @@
+import os
+import asyncio
+import contextlib
+import functools
+import socket
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+
+
+class JobWorker:
+    """
+    Run full analysis jobs leased from the durable job queue of the database.
+
+    A job whose lease expires, because its worker crashed or was stopped, is leased again by another worker.
+    Finished jobs older than the retention are deleted by the workers from time to time, so the queue does not grow forever.
+    """
+    def __init__(self, task_manager, worker_id: Optional[str]=None, poll_interval: float=1.0, lease_seconds: float=60.0, retry_delay: float=5.0, retention: float=7 * 86400, prune_interval: float=3600, verbosity: bool=False) -> None:
+        """
+        Initialize a `JobWorker` instance.
+
+        Args:
+        - task_manager (TaskManager): The task manager running the analyses.
+        - worker_id (Optional[str]): The identifier of the worker holding the leases. Defaults to the hostname, process id and a random suffix.
+        - poll_interval (float): The maximum time in seconds to wait before polling again when the queue is empty, jobs queued 
+          by this process wake the worker right away. Defaults to 1.0.
+        - lease_seconds (float): The time in seconds a leased job stays reserved for this worker, renewed while the job runs. Defaults to 60.0.
+        - retry_delay (float): The base time in seconds before a failed job is tried again, doubled on each attempt. Defaults to 5.0.
+        - retention (float): The time in seconds a completed or failed job is kept. Jobs are never deleted if 0. Defaults to 7 days.
+        - prune_interval (float): The time in seconds between two deletions of the jobs past the retention. Defaults to 3600.
+        - verbosity (bool): Whether to print the debug logs. Defaults to False.
+        """
+        self.task_manager = task_manager
+        self.database = task_manager.database
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.pruned_at = None
+        self.verbosity = verbosity
+        self.task = None
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.pruned = 0
+
+    def start(self) -> None:
+        """
+        Start the worker loop in the background.
+        """
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stop the worker loop. A job being run is abandoned and leased again once its lease expires.
+        """
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def run(self) -> None:
+        """
+        Lease and run jobs until cancelled, deleting the finished jobs past the retention every `prune_interval` seconds. 
+        An error leasing or releasing a job is logged and the loop goes on, a job left leased is taken over once its lease expires.
+        """
+        jobs_available = self.database.jobs_available
+        while True:
+            try:
+                await self.prune()
+                # Cleared before leasing, so a job queued meanwhile sets it again and is not waited for
+                jobs_available.clear()
+                job = await self.database.lease_job(self.worker_id, self.lease_seconds)
+                if job is not None:
+                    await self.run_job(job)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"JobWorker.run | Worker `{self.worker_id}` failed to lease or release a job: {e}")
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(jobs_available.wait(), timeout=self.poll_interval)
+
+    async def prune(self) -> None:
+        """
+        Delete the finished jobs past the retention, unless they were deleted less than `prune_interval` seconds ago.
+        """
+        if not self.retention or (self.pruned_at is not None and time.monotonic() - self.pruned_at < self.prune_interval):
+            return
+        self.pruned_at = time.monotonic()
+        deleted = await self.database.delete_finished_jobs(self.retention)
+        self.pruned += deleted
+        if self.verbosity and deleted:
+            print(f"JobWorker.prune | Worker `{self.worker_id}` deleted {deleted} finished jobs")
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self.database.renew_lease(job_id, self.worker_id, self.lease_seconds):
+                return
+
+    async def run_job(self, job: Dict[str, Any]) -> None:
+        """
+        Run a leased job and release it as completed, failed or queued again for a retry.
+
+        Args:
+        - job (Dict[str, Any]): The leased job.
+        """
+        if job["attempts"] > job["max_attempts"]:
+            # The lease expired on the last attempt
+            await self.database.finish_job(job["id"], self.worker_id, "failed", error=job["error"] or "lease_expired")
+            self.failed += 1
+            return
+
+        if self.verbosity:
+            print(f"JobWorker.run_job | Worker `{self.worker_id}` running {job['kind']} job for data_id `{job['data_id']}` (attempt {job['attempts']})")
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            await self.task_manager.run_full_analysis(
+                job["data_id"], 
+                refresh=job["payload"].get("refresh", False), 
+                progress=functools.partial(self.task_manager.publish_progress, job),
+                partial=functools.partial(self.task_manager.publish_partial, job) if self.task_manager.stream_partial_results else None,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e)
+            # A place without reviews won't have any on the next attempt
+            if error == "no_reviews" or job["attempts"] >= job["max_attempts"]:
+                await self.database.finish_job(job["id"], self.worker_id, "failed", error=error)
+                self.failed += 1
+            else:
+                await self.database.finish_job(job["id"], self.worker_id, "queued", error=error, retry_delay=self.retry_delay * 2 ** (job["attempts"] - 1))
+                self.retried += 1
+            if self.verbosity:
+                print(f"JobWorker.run_job | Job for data_id `{job['data_id']}` failed: {error}")
+        else:
+            await self.database.finish_job(job["id"], self.worker_id, "completed")
+            self.completed += 1
+        finally:
+            heartbeat.cancel()
+            self.task_manager.notify_progress(job["token"])
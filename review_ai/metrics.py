@@ -0,0 +1,221 @@
+import time
+import bisect
+import functools
+import contextlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+
+class Counter:
+    """
+    A monotonically increasing Prometheus counter, optionally split by labels.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        """
+        Initialize a `Counter` instance.
+
+        Args:
+        - name (str): The metric name, ending with `_total`.
+        - documentation (str): The help text of the metric.
+        - labelnames (Sequence[str], optional): The names of the labels. Defaults to no labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increase the counter.
+
+        Args:
+        - amount (float, optional): The amount to add. Defaults to 1.
+        - **labels: The value of each label.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for key, value in sorted(self._values.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+
+class Histogram:
+    """
+    A Prometheus histogram of durations or sizes, optionally split by labels.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        Initialize a `Histogram` instance.
+
+        Args:
+        - name (str): The metric name.
+        - documentation (str): The help text of the metric.
+        - labelnames (Sequence[str], optional): The names of the labels. Defaults to no labels.
+        - buckets (Sequence[float], optional): The upper bounds of the buckets. Defaults to `DEFAULT_BUCKETS`, suited to durations in seconds.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record an observation.
+
+        Args:
+        - value (float): The observed value.
+        - **labels: The value of each label.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        # One count per bucket, then the +Inf count and the sum
+        counts = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration in seconds of the block, failed or not. Usable around `await` expressions.
+
+        Args:
+        - **labels: The value of each label.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for key, counts in sorted(self._values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield self.name + "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            cumulative += counts[-2]
+            yield self.name + "_bucket", {**labels, "le": "+Inf"}, cumulative
+            yield self.name + "_count", labels, cumulative
+            yield self.name + "_sum", labels, counts[-1]
+
+
+
+class Registry:
+    """
+    The metrics of the process, rendered in the Prometheus text exposition format.
+    """
+    def __init__(self) -> None:
+        self.metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        Create and register a counter.
+        """
+        metric = Counter(name, documentation, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Create and register a histogram.
+        """
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, collected: Optional[List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]] = None) -> str:
+        """
+        Render the registered metrics, and metrics collected at scrape time, in the Prometheus text format.
+
+        Args:
+        - collected (Optional[List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]], optional): Extra metrics as
+          (name, type, help, samples) tuples, each sample being its labels and value. Defaults to None.
+
+        Returns:
+        - str: The exposition text.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in metric.samples())
+        for name, type, documentation, samples in collected or []:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+
+METRICS = Registry()
+
+STAGE_SECONDS = METRICS.histogram(
+    "review_ai_stage_duration_seconds",
+    "Duration of the stages of the analysis pipeline.",
+    ["stage"],
+)
+LLM_TOKENS = METRICS.counter(
+    "review_ai_llm_tokens_total",
+    "Tokens used by LLM calls, from the usage reported by the completions.",
+    ["model", "kind"],
+)
+LLM_CALLS = METRICS.counter(
+    "review_ai_llm_calls_total",
+    "LLM calls by model and priority.",
+    ["model", "priority"],
+)
+
+RESPONSE_BYTES = METRICS.counter(
+    "review_ai_response_bytes_total",
+    "Bytes of compressible response bodies, before (`original`) and after (`sent`) compression, by content encoding (`identity` when sent as is).",
+    ["encoding", "kind"],
+)
+COMPRESSED_RESPONSES = METRICS.counter(
+    "review_ai_compressed_responses_total",
+    "Compressed responses by content encoding, `cached` when the compressed body was computed once for a completed result.",
+    ["encoding", "cached"],
+)
+COMPRESSION_SECONDS = METRICS.histogram(
+    "review_ai_compression_duration_seconds",
+    "CPU time spent compressing response bodies, by content encoding.",
+    ["encoding"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+
+def timed(stage: str):
+    """
+    Decorate a coroutine function to observe its duration in `STAGE_SECONDS` under the given stage.
+
+    Args:
+    - stage (str): The stage label.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -5,15 +5,15 @@ DATA_PROMPT = """Here are the Customer Reviews:
 
 
 
-SYSTEM_PROMPT = """You are an AI system designed to analyze hotel guest reviews. Your task is to process the provided reviews and generate a comprehensive analysis report following the structure defined in the HotelAnalysis Pydantic model. Analyze all aspects of the guest experience, including overall sentiment, accommodation quality, service, amenities, food and dining, location and accessibility, value for money, and online presence. 
+SYSTEM_PROMPT = """You are an AI system designed to analyze hotel guest reviews. Your task is to process the provided reviews and generate a comprehensive analysis report following the structure defined in the HotelInsights Pydantic model. Analyze all aspects of the guest experience, including overall sentiment, accommodation quality, service, amenities, food and dining, location and accessibility, value for money, and online presence. 
 
-Provide accurate, specific, and actionable insights for each category as described in the model fields. Calculate sentiment scores and percentages precisely. Identify specific aspects of rooms, service, amenities, and dining experiences mentioned in reviews. Offer practical, impactful suggestions for improvement in each area. 
+Provide accurate, specific, and actionable insights for each category as described in the model fields. Identify specific aspects of rooms, service, amenities, and dining experiences mentioned in reviews. Offer practical, impactful suggestions for improvement in each area. 
 
 Pay particular attention to recurring themes in guest feedback, both positive and negative. When analyzing accommodation, consider factors like room cleanliness, comfort, and maintenance. For service, focus on staff interactions, efficiency, and problem-solving. Evaluate amenities based on their quality, availability, and guest satisfaction. Assess food and dining options, including breakfast if offered. Consider the hotel's location in terms of convenience, nearby attractions, and any related issues.
 
 Prioritize the top 5 most critical improvements based on review frequency and potential impact on guest satisfaction and hotel performance. Ensure your analysis is objective, thorough, and directly useful for hotel management looking to enhance their business and guest experience.
 
-Format your output as a valid JSON object conforming to the HotelAnalysis model structure, with each field populated with relevant, insightful information as per the detailed field descriptions provided. Your analysis should provide a clear, actionable roadmap for hotel improvement based on guest feedback.
+Format your output as a valid JSON object conforming to the HotelInsights model structure, with each field populated with relevant, insightful information as per the detailed field descriptions provided. Your analysis should provide a clear, actionable roadmap for hotel improvement based on guest feedback.
 
 Here are the Hotel Information:
 - Name: {name}
@@ -36,26 +36,25 @@ New Customer Reviews:
 
 Instructions:
     1. Review the previous analysis and the new customer reviews.
-    2. Update the HotelAnalysis structure with insights from both sources.
+    2. Update the HotelInsights structure with insights from both sources.
     3. Give slightly more weight to recent reviews when analyzing current hotel performance and trends.
     4. Consider these points when integrating new reviews:
         - Any changes in overall sentiment or specific aspects of the hotel experience
         - New recurring themes or issues
         - Improvements in previously identified problems
         - Any notable shifts in guest experiences
-    5. Recalculate sentiment scores and percentages, incorporating both old and new reviews.
-    6. Update all sections of the analysis with new insights.
-    7. Revise the top 5 improvement priorities based on the integrated analysis.
-    8. In the summary, note any significant changes observed when comparing new reviews to the previous analysis.
+    5. Update all sections of the analysis with new insights.
+    6. Revise the top 5 improvement priorities based on the integrated analysis.
+    7. In the summary, note any significant changes observed when comparing new reviews to the previous analysis.
 
-Provide an objective, actionable analysis for hotel management. Output should be a valid JSON object conforming to the HotelAnalysis model structure, reflecting an up-to-date analysis of the hotel's performance and guest satisfaction.
+Provide an objective, actionable analysis for hotel management. Output should be a valid JSON object conforming to the HotelInsights model structure, reflecting an up-to-date analysis of the hotel's performance and guest satisfaction.
 """
 
 
 
 
 BATCH_ANALYTICS_PROMPT = """
-You are an AI system designed to analyze and synthesize multiple batches of hotel analytics data. Your task is to process the provided batch analytics and generate a comprehensive final analysis report following the structure defined in the HotelAnalysis Pydantic model. 
+You are an AI system designed to analyze and synthesize multiple batches of hotel analytics data. Your task is to process the provided batch analytics and generate a comprehensive final analysis report following the structure defined in the HotelInsights Pydantic model. 
 
 The input data is formatted as follows:
 ```
@@ -79,11 +78,10 @@ Each batch represents a specific time period and contains YAML-formatted analyti
 Analyze all aspects of the guest experience, including overall sentiment, accommodation quality, service, amenities, food and dining, location and accessibility, value for money, and online presence. Provide accurate, specific, and actionable insights for each category as described in the model fields.
 
 When synthesizing the data:
-1. Calculate overall sentiment scores and percentages by weighing recent periods more heavily.
-2. Identify persistent themes and issues across multiple time periods.
-3. Note any significant changes or trends in guest satisfaction over time.
-4. Combine and prioritize improvement suggestions, focusing on those that appear consistently or have increased in importance recently.
-5. Aggregate specific feedback on rooms, service, amenities, and dining experiences, highlighting both consistent strengths and recurring issues.
+1. Identify persistent themes and issues across multiple time periods, weighing recent periods more heavily.
+2. Note any significant changes or trends in guest satisfaction over time.
+3. Combine and prioritize improvement suggestions, focusing on those that appear consistently or have increased in importance recently.
+4. Aggregate specific feedback on rooms, service, amenities, and dining experiences, highlighting both consistent strengths and recurring issues.
 
 Pay particular attention to:
 - Long-term trends in guest feedback, both positive and negative.
@@ -97,7 +95,7 @@ Prioritize the top 5 most critical improvements based on their consistency acros
 
 Ensure your analysis is objective, thorough, and directly useful for hotel management looking to understand long-term patterns and make strategic decisions to enhance their business and guest experience.
 
-Format your output as a valid JSON object conforming to the HotelAnalysis model structure, with each field populated with relevant, insightful information synthesized from all provided time periods.
+Format your output as a valid JSON object conforming to the HotelInsights model structure, with each field populated with relevant, insightful information synthesized from all provided time periods.
 
 Here are the Hotel Information:
 - Name: {name}
@@ -0,0 +1,137 @@
+from typing import Any
+from pydantic import BaseModel
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from review_ai import codec
+from review_ai.analysis import EncodedResult
+from review_ai.metrics import COMPRESSED_RESPONSES, RESPONSE_BYTES
+
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    A JSON response encoded with `orjson` when it is installed, and pydantic models encoded by pydantic directly.
+    """
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        return codec.dumps(content)
+
+
+def accepted_encoding(headers: Headers) -> str | None:
+    """
+    Pick the preferred content encoding of `codec.CONTENT_ENCODINGS` accepted by the client.
+
+    Args:
+    - headers (Headers): The request headers, for `Accept-Encoding`.
+
+    Returns:
+    - str | None: The content encoding, or None to send the body as is.
+    """
+    accepted = {}
+    for item in headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = params.strip()[2:] if params.strip().startswith("q=") else "1"
+        try:
+            accepted[name.strip().lower()] = float(quality)
+        except ValueError:
+            continue
+    for encoding in codec.CONTENT_ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def encoded_response(encoded: EncodedResult, request: Request) -> Response:
+    """
+    Serve a pre-encoded result, compressed if the client accepts it, or a 304 response if the client already has it.
+
+    Args:
+    - encoded (EncodedResult): The encoded result.
+    - request (Request): The request, for its `If-None-Match` and `Accept-Encoding` headers.
+
+    Returns:
+    - Response: The response, with the ETag of the result.
+    """
+    headers = {"ETag": encoded.etag, "Vary": "Accept-Encoding"}
+    if encoded.etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    encoding = accepted_encoding(request.headers)
+    content = encoded.variants[encoding] if encoding is not None else encoded.body
+    RESPONSE_BYTES.inc(len(encoded.body), encoding=encoding or "identity", kind="original")
+    RESPONSE_BYTES.inc(len(content), encoding=encoding or "identity", kind="sent")
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        COMPRESSED_RESPONSES.inc(encoding=encoding, cached="true")
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+
+class CompressionMiddleware:
+    """
+    An ASGI middleware compressing response bodies with the preferred content encoding accepted by the client, brotli or gzip.
+
+    Only complete bodies of compressible types, at least `minimum_size` bytes long, are compressed: streamed responses 
+    (server-sent events, PDF reports) and responses already encoded, like the pre-compressed results of `encoded_response`, 
+    are sent as they are.
+    """
+    COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        """
+        Initialize a `CompressionMiddleware` instance.
+
+        Args:
+        - app (ASGIApp): The application to wrap.
+        - minimum_size (int, optional): The size in bytes under which bodies are sent as they are, compression not paying off. Defaults to 1024.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (encoding := accepted_encoding(Headers(scope=scope))) is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        passthrough = False
+
+        async def compressing_send(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = "content-encoding" in headers or not content_type.startswith(self.COMPRESSIBLE_TYPES)
+                if passthrough:
+                    await send(message)
+                else:
+                    # Held until the first body message tells whether the body is complete
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if start is not None:
+                body = message.get("body", b"")
+                response_start, start = start, None
+                if message.get("more_body", False) or len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(response_start)
+                    await send(message)
+                    return
+                compressed = codec.compress(body, encoding)
+                RESPONSE_BYTES.inc(len(body), encoding=encoding, kind="original")
+                RESPONSE_BYTES.inc(len(compressed), encoding=encoding, kind="sent")
+                COMPRESSED_RESPONSES.inc(encoding=encoding, cached="false")
+                headers = MutableHeaders(raw=response_start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(compressed))
+                headers.add_vary_header("Accept-Encoding")
+                await send(response_start)
+                await send({"type": "http.response.body", "body": compressed, "more_body": False})
+                return
+            await send(message)
+
+        await self.app(scope, receive, compressing_send)
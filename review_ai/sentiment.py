@@ -0,0 +1,129 @@
+import re
+from typing import List, Sequence, Tuple
+from review_ai.utils import OverallSentiment, Review
+
+
+
+POSITIVE_WORDS = frozenset("""
+amazing awesome beautiful best brilliant clean comfortable comfy cozy delicious delightful enjoyed excellent exceptional
+fantastic fabulous friendly gorgeous great helpful hospitable impeccable impressive love loved lovely nice outstanding
+peaceful perfect pleasant polite recommend recommended relaxing spacious spotless superb tasty welcoming wonderful
+""".split())
+
+NEGATIVE_WORDS = frozenset("""
+avoid awful bad bedbugs broken bugs cockroaches complaint dirty disappointed disappointing disgusting dusty filthy
+horrible mold mould noisy overpriced pathetic poor rip-off rude slow smelly stained terrible uncomfortable unclean
+unfriendly unhelpful unprofessional worse worst
+""".split())
+
+NEGATIONS = frozenset(["not", "no", "never", "hardly", "nothing", "didn't", "wasn't", "isn't", "don't", "doesn't", "weren't", "aren't", "won't", "cannot", "can't"])
+
+_WORD = re.compile(r"[a-z]+(?:['-][a-z]+)*")
+
+
+
+class SentimentScorer:
+    """
+    Computes the overall sentiment of a set of reviews locally, from their star ratings adjusted by a small lexicon over their text.
+
+    Each review is scored on the 1-5 scale as its rating shifted by up to `text_weight` towards the polarity of its text,
+    a word counting as the opposite polarity right after a negation ("not clean"). A review without a rating is scored
+    from its text alone. Reviews scoring at least `positive_threshold` are positive, those at most `negative_threshold`
+    negative and the others neutral. The scores are deterministic and take a single pass over the reviews.
+    """
+    def __init__(self, text_weight: float = 0.5, positive_threshold: float = 3.75, negative_threshold: float = 2.25) -> None:
+        """
+        Initialize a `SentimentScorer` instance.
+
+        Args:
+        - text_weight (float, optional): The maximum shift in stars of a rating by the polarity of its text. Defaults to 0.5.
+        - positive_threshold (float, optional): The lowest score of a positive review. Defaults to 3.75, so 4 and 5 star reviews are positive unless their text is negative.
+        - negative_threshold (float, optional): The highest score of a negative review. Defaults to 2.25, so 1 and 2 star reviews are negative unless their text is positive.
+        """
+        self.text_weight = text_weight
+        self.positive_threshold = positive_threshold
+        self.negative_threshold = negative_threshold
+
+    @staticmethod
+    def text_polarity(text: str) -> float:
+        """
+        Get the polarity of a review text from the lexicon.
+
+        Args:
+        - text (str): The review text.
+
+        Returns:
+        - float: The balance of positive and negative words, between -1 (only negative) and 1 (only positive), 0 without any.
+        """
+        positive = negative = 0
+        negated = False
+        for word in _WORD.findall(text.lower()):
+            if word in POSITIVE_WORDS:
+                if negated:
+                    negative += 1
+                else:
+                    positive += 1
+            elif word in NEGATIVE_WORDS:
+                if negated:
+                    positive += 1
+                else:
+                    negative += 1
+            negated = word in NEGATIONS
+        total = positive + negative
+        return (positive - negative) / total if total else 0.0
+
+    def score_reviews(self, reviews: Sequence[Review]) -> List[float]:
+        """
+        Score each review on the 1-5 scale.
+
+        Args:
+        - reviews (Sequence[Review]): The reviews to score.
+
+        Returns:
+        - List[float]: The score of each review.
+        """
+        scores = []
+        for review in reviews:
+            polarity = self.text_polarity(review.review_text) if review.review_text else 0.0
+            if review.rating:
+                score = review.rating + self.text_weight * polarity
+            else:
+                score = 3 + 2 * polarity
+            scores.append(min(5.0, max(1.0, score)))
+        return scores
+
+    def classify(self, scores: Sequence[float]) -> Tuple[int, int, int]:
+        """
+        Count the positive, neutral and negative scores.
+
+        Args:
+        - scores (Sequence[float]): The review scores.
+
+        Returns:
+        - Tuple[int, int, int]: The number of positive, neutral and negative reviews.
+        """
+        positive = sum(1 for score in scores if score >= self.positive_threshold)
+        negative = sum(1 for score in scores if score <= self.negative_threshold)
+        return positive, len(scores) - positive - negative, negative
+
+    def score(self, reviews: Sequence[Review]) -> OverallSentiment:
+        """
+        Compute the overall sentiment of a set of reviews.
+
+        Args:
+        - reviews (Sequence[Review]): The reviews to consider.
+
+        Returns:
+        - OverallSentiment: The average score and the percentages of positive, neutral and negative reviews, with 1 decimal point precision.
+          All zero without reviews.
+        """
+        if not reviews:
+            return OverallSentiment(average_score=0.0, positive_percentage=0.0, neutral_percentage=0.0, negative_percentage=0.0)
+        scores = self.score_reviews(reviews)
+        positive, neutral, negative = self.classify(scores)
+        return OverallSentiment(
+            average_score=round(sum(scores) / len(scores), 1),
+            positive_percentage=round(100 * positive / len(scores), 1),
+            neutral_percentage=round(100 * neutral / len(scores), 1),
+            negative_percentage=round(100 * negative / len(scores), 1),
+        )
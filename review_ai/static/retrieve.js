@@ -7,7 +7,8 @@ function retrieveAnalysis() {
     if (token) {
         analysisContent.innerHTML = createSkeletonLoader();
 
-        fetch(`/api/analysis/${token}`)
+        // The reviews are paged in separately, see loadReviews
+        fetch(`/api/analysis/${token}?fields=analysis`)
             .then(response => {
                 if (!response.ok) {
                     throw new Error('Network response was not ok');
@@ -16,7 +17,12 @@ function retrieveAnalysis() {
             })
             .then(data => {
                 if (data.status === "in_progress") {
-                    displayInProgressMessage();
+                    if (data.partial) {
+                        displayPartialAnalysis(data.partial);
+                    } else {
+                        displayInProgressMessage();
+                    }
+                    followProgress(token);
                 } else if (data.status === "failed") {
                     displayError(data.error);
                 } else {
@@ -30,6 +36,65 @@ function retrieveAnalysis() {
     }
 }
 
+function followProgress(token) {
+    const events = new EventSource(`/api/analysis/${token}/events`);
+
+    let showingPartial = false;
+
+    events.addEventListener('progress', event => {
+        const progress = JSON.parse(event.data);
+        if (progress.partial) {
+            // A new batch analysis was published with the progress, show it as a provisional report
+            showingPartial = true;
+            displayPartialAnalysis(progress.partial);
+        } else if (!showingPartial) {
+            displayInProgressMessage(describeProgress(progress));
+        }
+    });
+    events.addEventListener('completed', () => {
+        events.close();
+        retrieveAnalysis();
+    });
+    events.addEventListener('failed', event => {
+        events.close();
+        displayError(JSON.parse(event.data).error);
+    });
+    events.addEventListener('error', () => {
+        // Keep the in progress message, the result can still be retrieved by hand
+        events.close();
+    });
+}
+
+function displayPartialAnalysis(partial) {
+    // The reviews of a provisional report are listed once the final report is ready
+    displayAnalysis({ ...partial, reviews: partial.reviews || [] });
+    analysisContent.insertAdjacentHTML('afterbegin', `
+        <div class="bg-stone-800 border border-[#7fd36e] text-stone-300 px-4 py-3 mt-4 rounded" role="status">
+            <strong class="font-bold">Provisional report:</strong>
+            <span class="block sm:inline">based on ${partial.batches_done} of ${partial.batches_total} batches of reviews. The final report will replace it once all reviews are analysed.</span>
+        </div>
+    `);
+}
+
+function describeProgress(progress) {
+    switch (progress.stage) {
+        case 'queued':
+            return 'Your analysis is waiting for a free worker.';
+        case 'fetching':
+            return `Fetching reviews: ${progress.reviews} reviews from ${progress.pages_fetched} pages.`;
+        case 'planned':
+            return `Analysing ${progress.reviews} reviews in ${progress.batches} batches.`;
+        case 'analysing':
+            return `Analysing reviews: ${progress.batches_done} of ${progress.batches_total} batches done.`;
+        case 'integrating':
+            return `Adding new reviews: ${progress.batches_done} of ${progress.batches_total} batches done.`;
+        case 'combining':
+            return `Combining the batch analyses (round ${progress.level}).`;
+        default:
+            return 'Your analysis is being processed.';
+    }
+}
+
 function renderReviews(reviews) {
     return reviews.map(review => `
         <div class="bg-stone-800 p-4 rounded-lg border border-stone-700">
@@ -47,6 +112,48 @@ function renderReviews(reviews) {
     `).join('');
 }
 
+function reviewQuery() {
+    const [minRating, maxRating] = document.getElementById('reviewRating').value.split('-');
+    const params = new URLSearchParams({ sort: document.getElementById('reviewSort').value, limit: 10 });
+    if (minRating) {
+        params.set('min_rating', minRating);
+        params.set('max_rating', maxRating);
+    }
+    return params;
+}
+
+function loadReviews(token, reset = false) {
+    const reviewsList = document.getElementById('reviewsList');
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    const params = reviewQuery();
+    if (reset) {
+        reviewsList.innerHTML = '';
+        delete reviewsList.dataset.cursor;
+    } else if (reviewsList.dataset.cursor) {
+        params.set('cursor', reviewsList.dataset.cursor);
+    }
+
+    fetch(`/api/analysis/${token}/reviews?${params}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then(page => {
+            reviewsList.insertAdjacentHTML('beforeend', renderReviews(page.reviews));
+            document.getElementById('reviewCount').textContent = `${page.total} reviews`;
+            if (page.next_cursor) {
+                reviewsList.dataset.cursor = page.next_cursor;
+                loadMoreBtn.classList.remove('hidden');
+            } else {
+                delete reviewsList.dataset.cursor;
+                loadMoreBtn.classList.add('hidden');
+            }
+        })
+        .catch(error => console.error('Error:', error));
+}
+
 
 function displayAnalysis(analysis) {
     const starRating = '★'.repeat(Math.floor(analysis.rating)) +
@@ -292,6 +399,7 @@ function displayAnalysis(analysis) {
                 <div class="lg:col-span-1">
                     <div class="bg-stone-800 p-4 rounded-lg">
                         <h2 class="text-2xl font-bold mb-4">Reviews</h2>
+                        ${analysis.reviews ? `
                         <div id="reviewsList" class="space-y-4">
                             ${renderReviews(analysis.reviews.slice(0, 10))}
                         </div>
@@ -302,6 +410,26 @@ function displayAnalysis(analysis) {
             `<button id="loadMoreBtn" class="mt-4 bg-[#7fd36e] hover:bg-[#6ac259] text-stone-800 font-bold py-2 px-4 rounded">
                                 Load More
                             </button>` : ''
+        }` : `
+                        <div class="flex flex-wrap gap-2 mb-4">
+                            <select id="reviewSort" class="bg-stone-700 text-stone-300 rounded px-2 py-1">
+                                <option value="newest">Newest</option>
+                                <option value="oldest">Oldest</option>
+                                <option value="highest">Highest rated</option>
+                                <option value="lowest">Lowest rated</option>
+                            </select>
+                            <select id="reviewRating" class="bg-stone-700 text-stone-300 rounded px-2 py-1">
+                                <option value="">All ratings</option>
+                                <option value="4-5">Positive (4-5★)</option>
+                                <option value="3-3">Neutral (3★)</option>
+                                <option value="1-2">Negative (1-2★)</option>
+                            </select>
+                            <span id="reviewCount" class="text-stone-400 self-center"></span>
+                        </div>
+                        <div id="reviewsList" class="space-y-4"></div>
+                        <button id="loadMoreBtn" class="hidden mt-4 bg-[#7fd36e] hover:bg-[#6ac259] text-stone-800 font-bold py-2 px-4 rounded">
+                            Load More
+                        </button>`
         }
                     </div>
                 </div>
@@ -333,6 +461,16 @@ function displayAnalysis(analysis) {
         }
     });
 
+    if (!analysis.reviews) {
+        // Reviews are paged in from the server, sorted and filtered there
+        const token = tokenInput.value.trim();
+        document.getElementById('loadMoreBtn').addEventListener('click', () => loadReviews(token));
+        document.getElementById('reviewSort').addEventListener('change', () => loadReviews(token, true));
+        document.getElementById('reviewRating').addEventListener('change', () => loadReviews(token, true));
+        loadReviews(token, true);
+        return;
+    }
+
     // Add event listener for "Load More" button
     const loadMoreBtn = document.getElementById('loadMoreBtn');
     if (loadMoreBtn) {
@@ -383,7 +521,7 @@ function createSkeletonLoader() {
     `;
 }
 
-function displayInProgressMessage() {
+function displayInProgressMessage(message = "Your analysis is still being processed. Please check back later.") {
     analysisContent.innerHTML = `
         <div class="bg-stone-800 p-8 rounded-lg text-center">
             <svg class="mx-auto h-12 w-12 text-[#7fd36e] animate-spin" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24">
@@ -391,7 +529,7 @@ function displayInProgressMessage() {
                 <path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path>
             </svg>
             <h3 class="mt-4 text-xl font-medium text-stone-300">Analysis in progress</h3>
-            <p class="mt-2 text-sm text-stone-400">Your analysis is still being processed. Please check back later.</p>
+            <p class="mt-2 text-sm text-stone-400">${message}</p>
         </div>
     `;
 }
@@ -57,10 +57,10 @@ class ImprovementPriority(BaseModel):
     suggestion:       str = Field(..., description="Actionable suggestion for addressing the issue, providing a practical recommendation for implementation.")
     potential_impact: str = Field(..., description="Estimated impact of implementing the suggestion on guest satisfaction, revenue, or overall hotel performance.")
 
-class HotelAnalysis(BaseModel):
+class HotelInsights(BaseModel):
+    """The part of a `HotelAnalysis` written by the LLM, the overall sentiment being computed locally from the reviews."""
     hotel_name:                 str = Field(..., description="Full, official name of the analyzed hotel.")
     summary:                    str = Field(..., description="Concise summary of the overall guest experience and key points from the analysis.")
-    overall_sentiment:          OverallSentiment
     accommodation:              Accommodation
     service:                    Service
     amenities:                  Amenities
@@ -70,6 +70,9 @@ class HotelAnalysis(BaseModel):
     online_presence:            OnlinePresence
     top_improvement_priorities: List[ImprovementPriority] = Field(..., description="Top 5 prioritized improvements based on review frequency and potential impact on guest satisfaction and business performance.")
 
+class HotelAnalysis(HotelInsights):
+    overall_sentiment:          OverallSentiment
+
 
 #######################
 # PYDANTIC MODELS API #
@@ -99,6 +102,7 @@ class AnalysisResult(BaseModel):
     created_at:    str
     total_reviews: int
     hotel_analysis:  Optional[HotelAnalysis] = None
+    newest_review_at: Optional[str] = None  # ISO timestamp of the newest analysed review, used for incremental refreshes
 
 class AnalysisRequest(BaseModel):
     value:     str
@@ -1,14 +1,17 @@
 import os, asyncio
-from review_ai.analysis import get_data_processor
+from review_ai.analysis import DataProcessor
+from review_ai.fakes import load_fixture, FakeSerpApi
 
 
-processor = get_data_processor(
+# Replays `output.json` instead of calling SerpApi when no SerpApi key is set
+processor = DataProcessor(
     delay=1,
     country="uk",
     language="en",
     num_reviews=25,
     num_suggestion=5,
-    api_key=os.getenv("SERPAPI_KEY"),
+    api_key=os.getenv("SERPAPI_KEY", "offline"),
+    transport=None if os.getenv("SERPAPI_KEY") else FakeSerpApi(load_fixture("output.json")).transport,
 )
 
 
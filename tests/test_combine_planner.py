@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+from review_ai.analysis import CombinePlanner, pack_in_order
+
+
+class FakeAnalyzer:
+    """Partials are plain namespaces whose serialized size is their `size` in tokens."""
+    def __init__(self):
+        self.calls = []
+
+    def count_tokens(self, text):
+        return len(text)
+
+    def serialize_partial(self, analysis):
+        return "x" * analysis.size
+
+    def combine_overhead(self, analysis):
+        return 100
+
+    async def combine_analysis(self, results, priority="full"):
+        if len(results) == 1:
+            return results[0]
+        self.calls.append([result.name for result in results])
+        # A combined analysis is about as large as its largest part
+        return SimpleNamespace(name="+".join(result.name for result in results), size=max(result.size for result in results))
+
+
+def make_partials(*sizes):
+    return [SimpleNamespace(name=str(i), size=size) for i, size in enumerate(sizes)]
+
+
+def test_small_partials_are_combined_in_one_call():
+    analyzer = FakeAnalyzer()
+    planner = CombinePlanner(analyzer, token_budget=1000, max_fan_in=8)
+
+    result = asyncio.run(planner.combine(make_partials(*[50] * 6)))
+    assert analyzer.calls == [["0", "1", "2", "3", "4", "5"]]
+    assert result.name == "0+1+2+3+4+5"
+    assert planner.stats() == {"levels": 1, "calls": 1, "prompt_tokens": 100 + 6 * 52}
+
+
+def test_levels_respect_budget_and_fan_in():
+    analyzer = FakeAnalyzer()
+    planner = CombinePlanner(analyzer, token_budget=1000, max_fan_in=3)
+    levels = []
+
+    async def progress(stage, **counters):
+        levels.append(counters)
+
+    result = asyncio.run(planner.combine(make_partials(400, 400, 100, 100, 100, 100, 100), progress=progress))
+    # Balanced to [400], [400, 100, 100], [100, 100, 100] rather than the greedy [400, 400], [100, 100, 100], [100, 100]
+    assert analyzer.calls == [["1", "2", "3"], ["4", "5", "6"], ["1+2+3", "4+5+6"], ["0", "1+2+3+4+5+6"]]
+    assert levels == [{"level": 1, "groups": 3}, {"level": 2, "groups": 2}, {"level": 3, "groups": 1}]
+    assert result.name == "0+1+2+3+4+5+6"
+
+
+def test_oversized_partials_are_still_paired():
+    analyzer = FakeAnalyzer()
+    planner = CombinePlanner(analyzer, token_budget=500, max_fan_in=8)
+
+    asyncio.run(planner.combine(make_partials(600, 600, 600)))
+    assert analyzer.calls == [["0", "1"], ["0+1", "2"]]
+
+
+def test_pack_in_order_balances_groups():
+    assert pack_in_order([5, 5, 5, 5, 5, 5], capacity=20) == [(0, 3), (3, 6)]
+    assert pack_in_order([30, 1, 1], capacity=10) == [(0, 1), (1, 3)]
+    assert pack_in_order([1] * 5, capacity=100, max_items=2) == [(0, 2), (2, 4), (4, 5)]
+    assert pack_in_order([], capacity=10) == []
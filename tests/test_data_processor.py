@@ -0,0 +1,113 @@
+import asyncio, httpx
+from review_ai.analysis import DataProcessor
+
+
+def make_review(i):
+    return {
+        "review_id": f"r{i}",
+        "rating": 5,
+        "user": {"name": f"User {i}"},
+        "iso_date": f"2024-09-{30 - i:02d}T10:00:00Z",
+        "extracted_snippet": {"original": f"Review {i}"},
+    }
+
+
+def make_processor(pages, rate_limits=0):
+    calls = []
+
+    def handler(request):
+        calls.append(dict(request.url.params))
+        if len(calls) <= rate_limits:
+            return httpx.Response(429)
+        page = int(request.url.params.get("next_page_token", 0))
+        data = {
+            "place_info": {"title": "Pleasant Homes", "reviews": 100},
+            "search_metadata": {"status": "Success", "created_at": "2024-10-08"},
+            "search_parameters": {"data_id": "place"},
+            "reviews": [make_review(i) for i in pages[page]],
+        }
+        if page + 1 < len(pages):
+            data["serpapi_pagination"] = {"next": "...", "next_page_token": str(page + 1)}
+        return httpx.Response(200, json=data)
+
+    processor = DataProcessor(api_key="test", num_reviews=5, max_reviews=100, delay=0.01)
+    processor._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return processor, calls
+
+
+def test_target_count_stops_pagination():
+    processor, calls = make_processor([[0, 1, 2], [3, 4, 5], [6, 7, 8]])
+    result = asyncio.run(processor.get_reviews("place"))
+    assert len(result.reviews) == 5
+    assert len(calls) == 2
+    assert result.newest_review_at == "2024-09-30T10:00:00Z"
+
+
+def test_newest_first_stops_at_known_reviews():
+    processor, calls = make_processor([[0, 1, 2], [3, 4, 5], [6, 7, 8]])
+    result = asyncio.run(processor.get_reviews("place", sort_by="newestFirst", use_full_reviews=True, known_ids={"r4"}))
+    assert [review.review_text for review in result.reviews] == ["Review 5", "Review 3", "Review 2", "Review 1", "Review 0"]
+    assert len(calls) == 2
+
+    processor, calls = make_processor([[0, 1, 2], [3, 4, 5], [6, 7, 8]])
+    result = asyncio.run(processor.get_reviews("place", sort_by="newestFirst", use_full_reviews=True, since="2024-09-28T10:00:00Z"))
+    assert len(result.reviews) == 2
+    assert len(calls) == 1
+
+
+def test_rate_limits_back_off_and_recover():
+    processor, calls = make_processor([[0, 1, 2], [3, 4, 5]], rate_limits=2)
+    result = asyncio.run(processor.get_reviews("place"))
+    assert len(result.reviews) == 5
+    assert processor.stats()["rate_limited"] == 2
+    assert processor.stats()["pages_fetched"] == 2
+    assert processor.stats()["page_delay"] == 0.0
+
+
+def test_review_store_serves_known_places_locally(tmp_path):
+    from review_ai.analysis import DataBase
+
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        processor, calls = make_processor([[0, 1, 2], [3, 4, 5], [6, 7, 8]])
+        processor.database = database
+        try:
+            first = await processor.get_reviews("place")
+            assert len(calls) == 2
+            assert len(await database.get_stored_reviews("place")) == 6
+
+            second = await processor.get_reviews("place")
+            assert len(calls) == 2
+            assert [review.review_text for review in second.reviews] == [review.review_text for review in first.reviews]
+
+            processor.review_store_ttl = 0
+            await processor.get_reviews("place")
+            assert len(calls) == 3
+        finally:
+            await database.close()
+
+    asyncio.run(main())
+
+
+def test_bounded_refresh_does_not_page_older_reviews(tmp_path):
+    from review_ai.analysis import DataBase
+
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        processor, calls = make_processor([[3 * page + i for i in range(3)] for page in range(10)])
+        processor.database = database
+        try:
+            await processor.get_reviews("place", use_full_reviews=True)
+            assert len(calls) == 10
+            calls.clear()
+            # The stored place is outdated, its newest reviews are stored already
+            processor.review_store_ttl = 0
+            result = await processor.get_reviews("place", sort_by="newestFirst", use_full_reviews=True, since="2024-09-28T10:00:00Z")
+            return result, len(calls)
+        finally:
+            await database.close()
+            await processor.close()
+
+    result, pages = asyncio.run(main())
+    assert sorted(review.review_text for review in result.reviews) == ["Review 0", "Review 1"]
+    assert pages == 1
@@ -0,0 +1,144 @@
+import json
+import asyncio
+from review_ai.analysis import DataBase
+
+
+def test_pool_round_trip(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"), pool_size=2)
+        await database.connect()
+        try:
+            saved = await asyncio.gather(*[
+                database.save_new_data(f"place-{i}", "instant", {"title": f"Place {i}"}) for i in range(10)
+            ])
+            assert saved == [f"place-{i}" for i in range(10)]
+            [row] = await database.check_and_retrieve_place("place-3")
+            assert {key: row[key] for key in ["data_id", "type", "analysis"]} == {"data_id": "place-3", "type": "instant", "analysis": {"title": "Place 3"}}
+            assert row["created_at"] == row["refreshed_at"] is not None
+            assert await database.check_and_retrieve_place("place-3", "full") == []
+            async with database._reader() as conn:
+                async with conn.execute("PRAGMA journal_mode") as cursor:
+                    assert (await cursor.fetchone())[0] == "wal"
+        finally:
+            await database.close()
+        assert not database.is_connected
+
+    asyncio.run(main())
+
+
+def test_writer_survives_failed_writes(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        try:
+            await database.connect()
+            try:
+                await asyncio.wait_for(database._write("SELECT ?", (2 ** 70,)), timeout=1)
+            except OverflowError:
+                pass
+            else:
+                raise AssertionError("the write should fail")
+            await asyncio.wait_for(database.save_new_data("place", "instant", {"title": "Place"}), timeout=1)
+            assert (await database.check_and_retrieve_place("place"))[0]["analysis"] == {"title": "Place"}
+        finally:
+            await database.close()
+
+    asyncio.run(main())
+
+def test_failed_save_leaves_the_previous_analysis(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        review = {"user": "user", "date": "January 01, 2024 at 10:00 AM UTC", "rating": 4.0, "review_text": "Nice stay"}
+        try:
+            await database.save_new_data("place", "full", {"title": "Place", "reviews": [review]})
+            await database.save_report_pdf("place", "hash", b"%PDF")
+            # The review index insert fails after the analysis upsert and the report delete of the same write
+            database._insert_review_index_sql = "INSERT INTO missing_table VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            assert await database.save_new_data("place", "full", {"title": "New place", "reviews": [review]}) is None
+            [row] = await database.check_and_retrieve_place("place", "full")
+            assert row["analysis"] == {"title": "Place", "reviews": [review]}
+            assert await database.get_report_pdf("place", "hash") == b"%PDF"
+            assert (await database.get_analysis_reviews("place"))["total"] == 1
+        finally:
+            await database.close()
+
+    asyncio.run(main())
+
+
+def test_report_cache_is_invalidated_by_new_analysis(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        try:
+            await database.save_report_pdf("place", "hash-1", b"%PDF-1")
+            assert await database.get_report_pdf("place", "hash-1") == b"%PDF-1"
+            assert await database.get_report_pdf("place", "hash-2") is None
+
+            # The instant report of the place is cached apart from the full one
+            await database.save_report_pdf("place", "hash-3", b"%PDF-3", analysis_type="instant")
+            assert await database.get_report_pdf("place", "hash-1") == b"%PDF-1"
+            assert await database.get_report_pdf("place", "hash-3", analysis_type="instant") == b"%PDF-3"
+
+            await database.save_new_data("place", "full", {"title": "Place"})
+            assert await database.get_report_pdf("place", "hash-1") is None
+            assert await database.get_report_pdf("place", "hash-3", analysis_type="instant") == b"%PDF-3"
+        finally:
+            await database.close()
+
+    asyncio.run(main())
+
+
+def test_reviews_are_stored_apart_from_the_analysis(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        reviews = [{"user": f"user-{i}", "date": "January 01, 2024 at 10:00 AM UTC", "rating": 4.0, "review_text": "Nice stay " * 20} for i in range(100)]
+        try:
+            await database.save_new_data("place", "full", {"title": "Place", "reviews": reviews})
+            [row] = await database.check_and_retrieve_place("place", "full")
+            assert row["analysis"] == {"title": "Place", "reviews": reviews}
+            [record] = await database.check_and_retrieve_place("place", "full", include_reviews=False)
+            assert record["analysis"] == {"title": "Place"}
+
+            async with database._reader() as conn:
+                async with conn.execute(f"SELECT length(reviews), reviews_codec FROM {database.full_table_name}") as cursor:
+                    size, codec = await cursor.fetchone()
+            assert size < len(json.dumps(reviews)) / 10 and codec.startswith("json+")
+
+            # Analyses saved before the split keep their reviews inline
+            await database._write(f"INSERT INTO {database.instant_table_name} (data_id, analysis) VALUES (?, ?)", ("legacy", json.dumps({"title": "Legacy", "reviews": reviews[:1]})))
+            [legacy] = await database.check_and_retrieve_place("legacy", "instant", include_reviews=False)
+            assert legacy["analysis"] == {"title": "Legacy", "reviews": reviews[:1]} and legacy["refreshed_at"] is None
+        finally:
+            await database.close()
+
+    asyncio.run(main())
+
+
+def test_review_pages_are_sorted_filtered_and_keyset_paginated(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        reviews = [
+            {"user": f"user-{i}", "date": f"January {i + 1:02d}, 2024 at 10:00 AM UTC", "rating": float(i % 5 + 1), "review_text": f"Review {i}"}
+            for i in range(12)
+        ]
+        try:
+            await database.save_new_data("place", "full", {"title": "Place", "reviews": reviews})
+            users, cursor = [], None
+            while True:
+                page = await database.get_analysis_reviews("place", sort="newest", limit=5, cursor=cursor)
+                assert page["total"] == 12
+                users += [review["user"] for review in page["reviews"]]
+                if (cursor := page["next_cursor"]) is None:
+                    break
+            assert users == [f"user-{i}" for i in reversed(range(12))]
+
+            lowest = await database.get_analysis_reviews("place", sort="lowest", limit=3)
+            assert [(review["rating"], review["user"]) for review in lowest["reviews"]] == [(1.0, "user-10"), (1.0, "user-5"), (1.0, "user-0")]
+            second = await database.get_analysis_reviews("place", sort="lowest", limit=3, cursor=lowest["next_cursor"])
+            assert [review["user"] for review in second["reviews"]] == ["user-11", "user-6", "user-1"]
+
+            filtered = await database.get_analysis_reviews("place", sort="oldest", min_rating=4, since="2024-01-04", until="2024-01-10")
+            assert [review["user"] for review in filtered["reviews"]] == ["user-3", "user-4", "user-8", "user-9"]
+            assert filtered["total"] == 4 and filtered["next_cursor"] is None
+        finally:
+            await database.close()
+
+    asyncio.run(main())
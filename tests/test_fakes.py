@@ -0,0 +1,28 @@
+import asyncio
+from review_ai.analysis import DataBase, DataProcessor, ReviewAnalyzer, TaskManager
+from review_ai.fakes import load_fixture, FakeSerpApi, FakeOpenAI
+
+
+def test_full_analysis_runs_offline_on_the_fixture(tmp_path):
+    fixture = load_fixture("output.json")
+    serpapi = FakeSerpApi(fixture, page_size=10)
+    openai = FakeOpenAI(fixture)
+    analyzer = ReviewAnalyzer(model="gpt-4o-mini", api_key="offline", system_prompt="{name}{address}{rating}{total_reviews}{todays_date}", data_prompt="{reviews}", batch_analytics_prompt="{name}{address}{rating}{total_reviews}{todays_date}")
+    analyzer.client = openai
+    manager = TaskManager(DataProcessor(api_key="offline", max_reviews=100, transport=serpapi.transport), analyzer, batch_token_budget=300)
+    manager.database = DataBase(str(tmp_path / "reviews.db"))
+
+    async def main():
+        try:
+            return await manager.run_full_analysis("place")
+        finally:
+            await manager.database.close()
+
+    result = asyncio.run(main())
+    assert len(result.reviews) == len(fixture.reviews)
+    assert result.hotel_analysis.model_dump(exclude={"overall_sentiment"}) == fixture.hotel_analysis.model_dump(exclude={"overall_sentiment"})
+    # The sentiment is computed locally over every review rather than taken from the LLM
+    assert result.hotel_analysis.overall_sentiment == analyzer.sentiment_scorer.score(fixture.reviews)
+    assert serpapi.requests == 4
+    # Several batches and at least one combine call
+    assert openai.requests > manager.batch_plans["batches"] > 1
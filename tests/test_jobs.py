@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+from review_ai.analysis import DataBase
+from review_ai.jobs import JobWorker
+
+
+def test_enqueue_is_deduplicated_and_lease_expires(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        try:
+            job, created = await database.enqueue_job("place", "place", payload={"refresh": True})
+            assert created and job["status"] == "queued" and job["payload"] == {"refresh": True}
+            again, created = await database.enqueue_job("other-token", "place")
+            assert not created and again["id"] == job["id"]
+
+            leased = await database.lease_job("worker-1", lease_seconds=0)
+            assert leased["lease_owner"] == "worker-1" and leased["attempts"] == 1
+            # The lease already expired, so another worker takes the job over
+            taken = await database.lease_job("worker-2", lease_seconds=60)
+            assert taken["id"] == job["id"] and taken["attempts"] == 2
+            assert not await database.renew_lease(job["id"], "worker-1", 60)
+            assert await database.lease_job("worker-1", lease_seconds=60) is None
+
+            await database.finish_job(job["id"], "worker-2", "completed")
+            assert (await database.get_job("place"))["status"] == "completed"
+            _, created = await database.enqueue_job("place", "place")
+            assert created
+        finally:
+            await database.close()
+
+    asyncio.run(main())
+
+
+def test_worker_retries_then_fails(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        runs = []
+
+        async def run_full_analysis(data_id, refresh=False, progress=None, partial=None):
+            runs.append(data_id)
+            raise RuntimeError("openai down")
+
+        async def publish_progress(job, stage, **counters):
+            pass
+
+        manager = SimpleNamespace(database=database, run_full_analysis=run_full_analysis, publish_progress=publish_progress, notify_progress=lambda token: None, stream_partial_results=False)
+        worker = JobWorker(manager, worker_id="worker", retry_delay=0)
+        try:
+            await database.enqueue_job("place", "place", max_attempts=2)
+            await worker.run_job(await database.lease_job(worker.worker_id, 60))
+            job = await database.get_job("place")
+            assert job["status"] == "queued" and job["error"] == "openai down"
+
+            await worker.run_job(await database.lease_job(worker.worker_id, 60))
+            assert (await database.get_job("place"))["status"] == "failed"
+            assert runs == ["place", "place"] and worker.retried == 1 and worker.failed == 1
+        finally:
+            await database.close()
+
+    asyncio.run(main())
+
+
+def test_worker_survives_errors_and_wakes_on_enqueue(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        runs = []
+
+        async def run_full_analysis(data_id, refresh=False, progress=None, partial=None):
+            runs.append(data_id)
+
+        finish_job = database.finish_job
+
+        async def flaky_finish_job(job_id, worker_id, status, **kwargs):
+            if len(runs) == 1:
+                raise RuntimeError("disk I/O error")
+            await finish_job(job_id, worker_id, status, **kwargs)
+
+        async def publish_progress(job, stage, **counters):
+            pass
+
+        database.finish_job = flaky_finish_job
+        manager = SimpleNamespace(database=database, run_full_analysis=run_full_analysis, publish_progress=publish_progress, notify_progress=lambda token: None, stream_partial_results=False)
+        worker = JobWorker(manager, worker_id="worker", poll_interval=30)
+        try:
+            await database.connect()
+            worker.start()
+            await asyncio.sleep(0.05)
+            # Both jobs are picked up right away, the failed release of the first one does not stop the worker
+            await database.enqueue_job("first", "first")
+            await asyncio.sleep(0.2)
+            await database.enqueue_job("second", "second")
+            await asyncio.sleep(0.2)
+            assert runs == ["first", "second"]
+            assert not worker.task.done()
+            assert (await database.get_job("second"))["status"] == "completed"
+        finally:
+            await worker.stop()
+            await database.close()
+
+    asyncio.run(main())
+
+
+def test_worker_deletes_finished_jobs_past_the_retention(tmp_path):
+    async def main():
+        database = DataBase(str(tmp_path / "reviews.db"))
+        manager = SimpleNamespace(database=database)
+        worker = JobWorker(manager, worker_id="worker", retention=0.1)
+        try:
+            for token, status in [("completed", "completed"), ("failed", "failed")]:
+                job, _ = await database.enqueue_job(token, token)
+                await database.lease_job(worker.worker_id, 60)
+                await database.finish_job(job["id"], worker.worker_id, status)
+            await database.enqueue_job("running", "running")
+            await database.lease_job(worker.worker_id, 60)
+            await asyncio.sleep(0.2)
+            recent, _ = await database.enqueue_job("recent", "recent")
+            await database.lease_job(worker.worker_id, 60)
+            await database.finish_job(recent["id"], worker.worker_id, "completed")
+
+            await worker.prune()
+            assert worker.pruned == 2
+            assert await database.get_job("completed") is None and await database.get_job("failed") is None
+            assert (await database.get_job("running"))["status"] == "running"
+            assert (await database.get_job("recent"))["status"] == "completed"
+
+            # The next deletion waits for the prune interval
+            await asyncio.sleep(0.2)
+            await worker.prune()
+            assert (await database.get_job("recent"))["status"] == "completed"
+        finally:
+            await database.close()
+
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+import asyncio
+from review_ai.analysis import DataBase, DataProcessor, ReviewAnalyzer, TaskManager
+from review_ai.fakes import load_fixture, FakeSerpApi, FakeOpenAI
+from review_ai.metrics import Registry
+
+
+def test_histogram_and_counter_rendering():
+    registry = Registry()
+    seconds = registry.histogram("stage_seconds", "Stage durations.", ["stage"], buckets=[0.1, 1.0])
+    calls = registry.counter("calls_total", "Calls.", ["model"])
+    seconds.observe(0.05, stage="fetch")
+    seconds.observe(0.5, stage="fetch")
+    seconds.observe(5, stage="fetch")
+    calls.inc(model="gpt")
+    calls.inc(2, model="gpt")
+
+    lines = registry.render([("jobs", "gauge", "Jobs.", [({"status": "queued"}, 3)])]).splitlines()
+    assert lines == [
+        "# HELP stage_seconds Stage durations.",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="fetch",le="0.1"} 1',
+        'stage_seconds_bucket{stage="fetch",le="1"} 2',
+        'stage_seconds_bucket{stage="fetch",le="+Inf"} 3',
+        'stage_seconds_count{stage="fetch"} 3',
+        'stage_seconds_sum{stage="fetch"} 5.55',
+        "# HELP calls_total Calls.",
+        "# TYPE calls_total counter",
+        'calls_total{model="gpt"} 3',
+        "# HELP jobs Jobs.",
+        "# TYPE jobs gauge",
+        'jobs{status="queued"} 3',
+    ]
+
+
+def test_pipeline_stages_are_timed(tmp_path):
+    fixture = load_fixture("output.json")
+    analyzer = ReviewAnalyzer(model="gpt-4o-mini", api_key="offline", system_prompt="{name}{address}{rating}{total_reviews}{todays_date}", data_prompt="{reviews}", batch_analytics_prompt="{name}{address}{rating}{total_reviews}{todays_date}")
+    analyzer.client = FakeOpenAI(fixture)
+    manager = TaskManager(DataProcessor(api_key="offline", max_reviews=100, transport=FakeSerpApi(fixture).transport), analyzer, batch_token_budget=300)
+    manager.database = DataBase(str(tmp_path / "reviews.db"))
+
+    async def main():
+        try:
+            await manager.run_full_analysis("place")
+            return await manager.get_metrics()
+        finally:
+            await manager.database.close()
+
+    metrics = asyncio.run(main())
+    for stage in ["serpapi_page", "get_reviews", "llm_full", "combine", "db_write", "full_analysis"]:
+        assert f'review_ai_stage_duration_seconds_count{{stage="{stage}"}}' in metrics
+    assert 'review_ai_llm_tokens_total{model="gpt-4o-mini",kind="prompt"}' in metrics
+    assert "review_ai_serpapi_pages_total 4" in metrics
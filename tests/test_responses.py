@@ -0,0 +1,85 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from review_ai import codec
+from review_ai.analysis import EncodedResult
+from review_ai.metrics import COMPRESSED_RESPONSES
+from review_ai.responses import CompressionMiddleware, FastJSONResponse, encoded_response
+
+
+def make_client():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    encoded = EncodedResult({"title": "a", "reviews": [{"review_text": "é" * 1000}]})
+
+    @app.get("/result")
+    async def result(request: Request):
+        return encoded_response(encoded, request)
+
+    @app.get("/status")
+    async def status():
+        return FastJSONResponse(content={"status": "in_progress"})
+
+    @app.get("/reviews")
+    async def reviews(count: int):
+        return FastJSONResponse(content={"reviews": ["great stay"] * count})
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            yield "data: 1\n\n" * 100
+            yield "data: 2\n\n"
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return TestClient(app), encoded
+
+
+def test_encoded_response_negotiates_encoding_and_etag():
+    client, encoded = make_client()
+
+    identity = client.get("/result", headers={"Accept-Encoding": "identity"})
+    assert identity.content == encoded.body
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == encoded.etag
+
+    compressed = client.get("/result", headers={"Accept-Encoding": "gzip;q=0.5, deflate"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == codec.loads(encoded.body)
+    assert int(compressed.headers["content-length"]) == len(encoded.variants["gzip"]) < len(encoded.body)
+
+    refused = client.get("/result", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+
+    cached = client.get("/result", headers={"If-None-Match": f'"other", {encoded.etag}'})
+    assert cached.status_code == 304 and cached.content == b""
+
+
+def test_fast_json_response():
+    client, _ = make_client()
+    response = client.get("/status")
+    assert response.json() == {"status": "in_progress"}
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_middleware_compresses_large_complete_bodies():
+    client, _ = make_client()
+    compressed_before = sum(value for _, labels, value in COMPRESSED_RESPONSES.samples() if labels["cached"] == "false")
+
+    large = client.get("/reviews?count=100", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert large.json() == {"reviews": ["great stay"] * 100}
+
+    small = client.get("/reviews?count=1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    stream = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in stream.headers
+    assert stream.text.endswith("data: 2\n\n")
+
+    # Pre-encoded results are not compressed twice
+    result = client.get("/result", headers={"Accept-Encoding": "gzip"})
+    assert result.headers["content-encoding"] == "gzip" and result.json()["title"] == "a"
+
+    compressed_after = sum(value for _, labels, value in COMPRESSED_RESPONSES.samples() if labels["cached"] == "false")
+    assert compressed_after - compressed_before == 1
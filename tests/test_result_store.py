@@ -0,0 +1,73 @@
+import gzip
+import time
+from review_ai import codec
+from review_ai.analysis import EncodedResult, ResultStore
+
+
+def make_result(title):
+    return {"title": title, "reviews": [{"review_text": "x" * 100}]}
+
+
+def test_lru_eviction_keeps_byte_budget():
+    size = EncodedResult(make_result("a")).size
+    store = ResultStore(max_bytes=2 * size)
+    store.put("a", make_result("a"))
+    store.put("b", make_result("b"))
+    assert store.get("a") is not None
+    store.put("c", make_result("c"))
+
+    assert store.get("b") is None
+    assert "a" in store and "c" in store
+    assert store.stats()["size_bytes"] <= 2 * size
+    assert store.stats()["evictions"] == 1
+
+    store.put("huge", {"reviews": ["x" * 4 * size]})
+    assert "huge" not in store and "a" in store
+
+
+def test_expiry_skips_replaced_results():
+    store = ResultStore(ttl=0.05)
+    store.put("a", make_result("a"))
+    time.sleep(0.03)
+    store.put("a", make_result("a2"))
+    time.sleep(0.03)
+    assert store.get("a")["title"] == "a2"
+    time.sleep(0.03)
+    assert store.get("a") is None
+    assert store.stats() == {"hits": 1, "misses": 1, "evictions": 0, "expirations": 1, "stale": 0, "size": 0, "size_bytes": 0}
+
+
+def test_results_of_another_version_are_stale():
+    store = ResultStore()
+    store.put("a", make_result("a"), version=1)
+    assert store.get("a", 1)["title"] == "a"
+    assert store.get("a") is not None
+    assert store.get("a", 2) is None
+    assert "a" not in store
+    assert store.stats()["stale"] == 1 and store.stats()["size_bytes"] == 0
+
+
+def test_results_are_encoded_once():
+    store = ResultStore()
+    store.put("a", make_result("a"))
+    encoded = store.encoded("a")
+    assert codec.loads(encoded.body) == make_result("a")
+    assert gzip.decompress(encoded.variants["gzip"]) == encoded.body
+    assert encoded.etag == EncodedResult(make_result("a")).etag != EncodedResult(make_result("b")).etag
+    assert store.encoded("a", "analysis") is None
+    store.put("a", {"title": "a"}, fields="analysis")
+    assert codec.loads(store.encoded("a", "analysis").body) == {"title": "a"}
+    assert store.encoded("b") is None
+    store.pop("a")
+    assert "a" not in store and store.stats()["size_bytes"] == 0
+    assert store.stats()["hits"] == 0
+
+
+def test_only_the_encoded_result_is_held():
+    store = ResultStore()
+    data = make_result("a")
+    encoded = store.put("a", data)
+    data["title"] = "changed"
+    assert store.get("a") == make_result("a")
+    assert store.stats()["size_bytes"] == encoded.size
+    assert store.lookup("a") is encoded
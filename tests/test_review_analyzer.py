@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+from review_ai.analysis import ReviewAnalyzer
+from review_ai.utils import AnalysisResult, Review
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def parse(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return kwargs["model"]
+
+
+def make_analyzer(**kwargs):
+    analyzer = ReviewAnalyzer(model="gpt-4o-mini", api_key="test", system_prompt="", data_prompt="", batch_analytics_prompt="", **kwargs)
+    completions = FakeCompletions()
+    analyzer.client = SimpleNamespace(beta=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return analyzer, completions
+
+
+def test_full_calls_leave_reserved_slots_for_instant():
+    analyzer, completions = make_analyzer(max_concurrency=4, reserved_instant=1)
+
+    async def main():
+        full = [asyncio.create_task(analyzer._generate_([], priority="full")) for _ in range(6)]
+        await asyncio.sleep(0.001)
+        assert completions.in_flight == 3
+        await analyzer._generate_([], priority="instant")
+        await asyncio.gather(*full)
+
+    asyncio.run(main())
+    assert completions.max_in_flight == 4
+
+
+def test_model_concurrency_limit():
+    analyzer, completions = make_analyzer(max_concurrency=8, model_concurrency={"gpt-4o-mini": 2})
+
+    async def main():
+        await asyncio.gather(*[analyzer._generate_([]) for _ in range(5)])
+
+    asyncio.run(main())
+    assert completions.max_in_flight == 2
+
+
+def test_batches_are_packed_under_the_token_budget():
+    analyzer, _ = make_analyzer()
+    analyzer.count_tokens = lambda text: len(text.split())
+    reviews = [Review(user="user", date="today", rating=5.0, review_text="word " * words) for words in [1, 1, 1, 40, 1, 1, 30, 1]]
+    review_analysis = AnalysisResult(
+        type="Hotel", title="Place", status="Success", rating=4.0, data_id="place",
+        address="Kochi", created_at="2024-10-08 19:55:00 UTC", total_reviews=len(reviews), reviews=reviews,
+    )
+
+    batches, plan = analyzer.plan_batches(review_analysis, token_budget=80)
+    # Greedy packing gives 3 batches of [3, 3, 2] reviews, balanced to a lower largest batch
+    assert [len(batch) for batch in batches] == [3, 2, 3]
+    assert [review for batch in batches for review in batch] == reviews
+    assert all(tokens <= 80 for tokens in plan["tokens"])
+    assert plan["batches"] == 3 and plan["reviews"] == 8
@@ -0,0 +1,30 @@
+from review_ai.sentiment import SentimentScorer
+from review_ai.utils import Review
+
+
+def make_review(rating, text):
+    return Review(user="user", date="January 01, 2024 at 10:00 AM UTC", rating=rating, review_text=text)
+
+
+def test_text_polarity_handles_negations():
+    assert SentimentScorer.text_polarity("Great location, lovely staff") == 1.0
+    assert SentimentScorer.text_polarity("The room was not clean and the bathroom was dirty") == -1.0
+    assert SentimentScorer.text_polarity("Nice pool but noisy rooms") == 0.0
+    assert SentimentScorer.text_polarity("We stayed two nights") == 0.0
+
+
+def test_overall_sentiment_from_ratings_and_text():
+    reviews = [
+        make_review(5, "Excellent stay, wonderful staff"),
+        make_review(4, "Good breakfast"),
+        make_review(4, "Dirty room, rude staff, terrible"),
+        make_review(3, "Average"),
+        make_review(1, "Worst hotel"),
+        make_review(0, "Amazing views"),
+    ]
+    scorer = SentimentScorer()
+    assert scorer.score_reviews(reviews) == [5.0, 4.0, 3.5, 3.0, 1.0, 5.0]
+    sentiment = scorer.score(reviews)
+    assert sentiment.average_score == 3.6
+    assert (sentiment.positive_percentage, sentiment.neutral_percentage, sentiment.negative_percentage) == (50.0, 33.3, 16.7)
+    assert scorer.score([]).average_score == 0.0
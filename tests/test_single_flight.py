@@ -0,0 +1,37 @@
+import asyncio
+from review_ai.analysis import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    runs = []
+
+    async def work(data_id):
+        runs.append(data_id)
+        await asyncio.sleep(0.01)
+        return f"analysis-{data_id}"
+
+    async def main():
+        return await asyncio.gather(*[flight.do(("abc", "instant"), work, "abc") for _ in range(5)])
+
+    results = asyncio.run(main())
+    assert results == ["analysis-abc"] * 5
+    assert runs == ["abc"]
+    assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_are_shared_and_key_is_released():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("no_reviews")
+
+    async def main():
+        results = await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        await asyncio.sleep(0)
+        assert flight.attach("key") is None
+
+    asyncio.run(main())
+    assert flight.executions == 1
@@ -0,0 +1,65 @@
+from review_ai.analysis import SuggestionCache
+from review_ai.utils import Suggestion, SuggestionResult
+
+
+def make_result(*values):
+    return SuggestionResult(
+        status="Success",
+        created_at="2024-10-08 19:55:00 UTC",
+        suggestions=[
+            Suggestion(type="hotel", value=value, data_id=str(i), subtext="Kochi, Kerala", latitude=9.9, longitude=76.2)
+            for i, value in enumerate(values)
+        ],
+    )
+
+
+def test_hit_uses_normalized_query_and_grid_cell():
+    cache = SuggestionCache(grid_size=0.5)
+    cache.put("Sea Shore", 9.91, 76.25, make_result("Sea Shore Resort"))
+
+    assert cache.get("  sea   shore ", 9.99, 76.49) is not None
+    assert cache.get("sea shore", 10.6, 76.25) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_longer_query_is_filtered_from_prefix_entry():
+    cache = SuggestionCache(min_results=2)
+    cache.put("sea", 9.9, 76.2, make_result("Sea Shore Resort", "Sea Shore Inn", "Sea View Hotel"))
+
+    result = cache.get("sea sho", 9.9, 76.2)
+    assert [suggestion.value for suggestion in result.suggestions] == ["Sea Shore Resort", "Sea Shore Inn"]
+    assert cache.stats()["prefix_hits"] == 1
+
+    assert cache.get("sea view", 9.9, 76.2) is None
+
+
+def test_typed_query_is_served_from_its_prefix_by_default():
+    cache = SuggestionCache()
+    cache.put("gra", 9.9, 76.2, make_result(
+        "Grand Hyatt Kochi", "Grand Hotel", "Gramam Homestay", "Grace Residency",
+        "Gramercy Inn", "Granary Suites", "Grand Bay Resort", "Graceful Stay",
+    ))
+
+    # Each keystroke narrows the suggestions of the cached prefix down to a few
+    assert [suggestion.value for suggestion in cache.get("gran", 9.9, 76.2).suggestions] == [
+        "Grand Hyatt Kochi", "Grand Hotel", "Granary Suites", "Grand Bay Resort",
+    ]
+    assert [suggestion.value for suggestion in cache.get("grand hy", 9.9, 76.2).suggestions] == ["Grand Hyatt Kochi"]
+    assert cache.stats()["prefix_hits"] == 2
+    assert cache.stats()["misses"] == 0
+
+
+def test_lru_eviction_and_ttl():
+    cache = SuggestionCache(max_size=2)
+    cache.put("alpha", 0, 0, make_result("Alpha"))
+    cache.put("beta", 0, 0, make_result("Beta"))
+    cache.get("alpha", 0, 0)
+    cache.put("gamma", 0, 0, make_result("Gamma"))
+    assert cache.get("beta", 0, 0) is None
+    assert cache.stats()["evictions"] == 1
+
+    expired = SuggestionCache(ttl=0)
+    expired.put("alpha", 0, 0, make_result("Alpha"))
+    assert expired.get("alpha", 0, 0) is None
+    assert expired.stats()["expirations"] == 1
@@ -0,0 +1,344 @@
+import asyncio
+from review_ai.analysis import DataBase, DataProcessor, ReviewAnalyzer, TaskManager
+from review_ai.fakes import load_fixture, FakeOpenAI
+from review_ai.jobs import JobWorker
+from review_ai.utils import AnalysisResult, Review
+
+
+class FakeAnalyzer:
+    async def generate_analysis(self, review_analysis, priority="instant"):
+        await asyncio.sleep(0.01)
+        return review_analysis
+
+    async def combine_analysis(self, results, priority="full"):
+        return results[0]
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+    def serialize_partial(self, analysis):
+        return " ".join(review.review_text for review in analysis.reviews)
+
+    def combine_overhead(self, analysis):
+        return 10
+
+
+def make_reviews(count):
+    return [Review(user=f"user-{i}", date=f"January {i % 28 + 1:02d}, 2024 at 10:00 AM UTC", rating=4.0, review_text="Nice stay") for i in range(count)]
+
+
+def make_manager(tmp_path, reviews):
+    data_processor = DataProcessor(api_key="test")
+
+    async def get_reviews(data_id, use_full_reviews=False, progress=None, **kwargs):
+        for page in range(1, 3 if progress is not None else 1):
+            await progress("fetching", pages_fetched=page, reviews=page * len(reviews) // 2)
+        return AnalysisResult(
+            type="Hotel", title="Place", status="Success", rating=4.0, data_id=data_id,
+            address="Kochi", created_at="2024-10-08 19:55:00 UTC", total_reviews=len(reviews), reviews=reviews,
+        )
+
+    data_processor.get_reviews = get_reviews
+    manager = TaskManager(data_processor, FakeAnalyzer(), batch_size=4, batch_token_budget=0)
+    manager.database = DataBase(str(tmp_path / "reviews.db"))
+    return manager
+
+
+def test_progress_is_streamed_until_completed(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(20))
+
+    async def main():
+        try:
+            token = (await manager.get_full_analysis("place"))["token"]
+            events = []
+
+            async def follow():
+                async for progress in manager.stream_progress(token, poll_interval=0.05):
+                    events.append(progress)
+
+            follower = asyncio.create_task(follow())
+            await asyncio.sleep(0.01)
+            worker = JobWorker(manager, worker_id="worker")
+            await worker.run_job(await manager.database.lease_job(worker.worker_id, 60))
+            await asyncio.wait_for(follower, timeout=1)
+            result = await manager.get_analysis_result(token)
+            # Evicted results are read back from the database
+            manager.result_store.pop(token)
+            assert await manager.get_analysis_result(token) == result
+            return events, result
+        finally:
+            await manager.database.close()
+
+    events, result = asyncio.run(main())
+    assert events[0] == {"stage": "queued"}
+    assert events[-1] == {"stage": "completed"}
+    analysing = [event for event in events if event["stage"] == "analysing"]
+    # The provisional results are sent with the progress, without their reviews
+    assert analysing and all("reviews" not in event["partial"] for event in analysing)
+    assert result["title"] == "Place" and len(result["reviews"]) == 20
+
+
+def test_pipeline_reports_batches_and_combine_levels(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(10))
+    progress = []
+
+    async def record(stage, **counters):
+        progress.append((stage, counters))
+
+    async def main():
+        try:
+            await manager.run_full_analysis("place", progress=record)
+        finally:
+            await manager.database.close()
+
+    asyncio.run(main())
+    assert progress[:2] == [("fetching", {"pages_fetched": 1, "reviews": 5}), ("fetching", {"pages_fetched": 2, "reviews": 10})]
+    assert [counters for stage, counters in progress if stage == "analysing"][-1] == {"batches_done": 3, "batches_total": 3}
+    assert progress[-1] == ("combining", {"level": 1, "groups": 1})
+
+
+def test_batch_analyses_are_published_as_provisional_results(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(10))
+    partials = []
+
+    async def record(partial):
+        partials.append(partial)
+
+    async def main():
+        try:
+            return await manager.run_full_analysis("place", partial=record)
+        finally:
+            await manager.database.close()
+
+    result = asyncio.run(main())
+    assert [(partial["batches_done"], partial["batches_total"]) for partial in partials] == [(1, 3), (2, 3), (3, 3)]
+    assert len(partials[-1]["reviews"]) == 10
+    assert len(result.reviews) == 10
+
+
+def test_stale_instant_analysis_is_served_then_refreshed_once(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(5))
+    manager.instant_max_age = 60
+    refreshes = []
+    process = manager._process_instant_analysis_
+
+    async def refresh(data_id):
+        refreshes.append(data_id)
+        await asyncio.sleep(0.05)
+        return await process(data_id)
+
+    manager._process_instant_analysis_ = refresh
+
+    async def main():
+        try:
+            first = await manager.get_instant_analysis("place")
+            [saved] = await manager.database.check_and_retrieve_place("place", "instant")
+            # Age the saved analysis past the freshness window
+            await manager.database._write(f"UPDATE {manager.database.instant_table_name} SET refreshed_at = ? WHERE data_id = ?", (saved["refreshed_at"] - 120, "place"))
+            stale = await asyncio.gather(*[manager.get_instant_analysis("place") for _ in range(5)])
+            assert len(manager.instant_revalidations) == 1
+            await asyncio.gather(*manager.instant_revalidations.values())
+            [refreshed] = await manager.database.check_and_retrieve_place("place", "instant")
+            return first, stale, saved, refreshed
+        finally:
+            await manager.database.close()
+
+    first, stale, saved, refreshed = asyncio.run(main())
+    assert all(result == first for result in stale)
+    assert refreshes == ["place", "place"]
+    assert refreshed["created_at"] == saved["created_at"] and refreshed["refreshed_at"] >= saved["refreshed_at"]
+    assert manager.instant_served == {"fresh": 0, "stale": 5, "missed": 1}
+    assert manager.instant_revalidations == {}
+
+
+def test_analysis_is_served_without_reviews_and_reviews_are_paged(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(25))
+
+    async def main():
+        try:
+            await manager.run_full_analysis("place")
+            analysis = await manager.get_analysis_result("place", include_reviews=False)
+            # Analyses saved before the review index are indexed on first use
+            await manager.database._write(manager.database._delete_review_index_sql, ("place", "full"))
+            pages = [await manager.get_analysis_reviews("place", limit=10)]
+            while pages[-1]["next_cursor"]:
+                pages.append(await manager.get_analysis_reviews("place", limit=10, cursor=pages[-1]["next_cursor"]))
+            return analysis, pages
+        finally:
+            await manager.database.close()
+
+    analysis, pages = asyncio.run(main())
+    assert "reviews" not in analysis and analysis["title"] == "Place"
+    assert [len(page["reviews"]) for page in pages] == [10, 10, 5]
+    assert pages[0]["total"] == 25
+
+
+def test_results_are_shared_between_processes(tmp_path):
+    # Two web server processes share the database, each with its own task manager and result store
+    first, second = make_manager(tmp_path, make_reviews(8)), make_manager(tmp_path, make_reviews(8))
+
+    async def main():
+        try:
+            token = (await first.get_full_analysis("place"))["token"]
+            assert await second.get_analysis_result(token) == {"status": "in_progress"}
+            worker = JobWorker(second, worker_id="worker")
+            await worker.run_job(await second.database.lease_job(worker.worker_id, 60))
+            assert (await first.get_analysis_result(token))["title"] == "Place"
+
+            # A refresh queued by the second process is not hidden by the result stored by the first one
+            await second.get_full_analysis("place", refresh=True)
+            assert await first.get_analysis_result(token) == {"status": "in_progress"}
+            job = await second.database.lease_job(worker.worker_id, 60)
+            saved = (await second.database.check_and_retrieve_place("place", "full"))[0]["analysis"]
+            await second.database.save_new_data("place", "full", {**saved, "title": "Refreshed"})
+            await second.database.finish_job(job["id"], worker.worker_id, "completed")
+            return await first.get_analysis_result(token), await first.get_encoded_result(token, fields="analysis")
+        finally:
+            await first.database.close()
+            await second.database.close()
+
+    result, encoded = asyncio.run(main())
+    assert result["title"] == "Refreshed" and len(result["reviews"]) == 8
+    assert b'"Refreshed"' in encoded.body
+
+
+def test_refresh_sentiment_covers_every_review(tmp_path):
+    fixture = load_fixture("output.json")
+    old_reviews = [review.model_copy(update={"rating": 5.0}) for review in make_reviews(100)]
+    new_reviews = [Review(user=f"new-{i}", date=f"March {i + 1:02d}, 2024 at 10:00 AM UTC", rating=1.0, review_text="Nice stay") for i in range(8)]
+    manager = make_manager(tmp_path, new_reviews)
+    manager.review_analyzer = ReviewAnalyzer(model="gpt-4o-mini", api_key="offline", system_prompt="{name}{address}{rating}{total_reviews}{todays_date}", data_prompt="{reviews}", batch_analytics_prompt="{name}{address}{rating}{total_reviews}{todays_date}")
+    manager.review_analyzer.client = FakeOpenAI(fixture)
+    previous = AnalysisResult(
+        type="Hotel", title="Place", status="Success", rating=4.0, data_id="place", address="Kochi", created_at="2024-10-08 19:55:00 UTC",
+        total_reviews=100, reviews=old_reviews, hotel_analysis=fixture.hotel_analysis, newest_review_at="2024-01-28T10:00:00Z",
+    )
+
+    async def main():
+        try:
+            return await manager._process_incremental_analysis_("place", previous)
+        finally:
+            await manager.database.close()
+
+    # Two batches of four new reviews on top of the saved history
+    result = asyncio.run(main())
+    assert manager.review_analyzer.client.requests == 2
+    assert len(result.reviews) == 108
+    sentiment = result.hotel_analysis.overall_sentiment
+    assert sentiment == manager.review_analyzer.sentiment_scorer.score(old_reviews + new_reviews)
+    assert sentiment.average_score == 4.7 and sentiment.positive_percentage == 92.6
+
+
+def test_failed_refresh_serves_the_saved_analysis(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(8))
+    manager.job_max_attempts = 1
+    worker = JobWorker(manager, worker_id="worker")
+
+    async def main():
+        try:
+            token = (await manager.get_full_analysis("place"))["token"]
+            await worker.run_job(await manager.database.lease_job(worker.worker_id, 60))
+            saved = await manager.get_analysis_result(token)
+
+            async def serpapi_down(*args, **kwargs):
+                raise RuntimeError("serpapi down")
+
+            manager.data_processor.get_reviews = serpapi_down
+            await manager.get_full_analysis("place", refresh=True)
+            await worker.run_job(await manager.database.lease_job(worker.worker_id, 60))
+            job = await manager.database.get_job(token)
+            manager.result_store.pop(token)
+            return saved, job, await manager.get_analysis_result(token)
+        finally:
+            await manager.database.close()
+
+    saved, job, result = asyncio.run(main())
+    assert job["status"] == "failed"
+    assert result == saved
+
+
+def test_failed_first_analysis_is_reported(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(8))
+    manager.job_max_attempts = 1
+
+    async def serpapi_down(*args, **kwargs):
+        raise RuntimeError("serpapi down")
+
+    manager.data_processor.get_reviews = serpapi_down
+
+    async def main():
+        try:
+            token = (await manager.get_full_analysis("place"))["token"]
+            worker = JobWorker(manager, worker_id="worker")
+            await worker.run_job(await manager.database.lease_job(worker.worker_id, 60))
+            return await manager.get_analysis_result(token)
+        finally:
+            await manager.database.close()
+
+    assert asyncio.run(main()) == {"status": "failed", "error": "serpapi down"}
+
+
+def test_analysis_projection_is_encoded_once(tmp_path, monkeypatch):
+    from review_ai import codec
+    manager = make_manager(tmp_path, make_reviews(8))
+    encodings = []
+    compress_variants = codec.compress_variants
+
+    def counting_compress_variants(body):
+        encodings.append(body)
+        return compress_variants(body)
+
+    monkeypatch.setattr(codec, "compress_variants", counting_compress_variants)
+
+    async def main():
+        try:
+            await manager.run_full_analysis("place")
+            projections = [await manager.get_encoded_result("place", fields="analysis") for _ in range(10)]
+            results = [await manager.get_encoded_result("place") for _ in range(10)]
+            return projections, results
+        finally:
+            await manager.database.close()
+
+    projections, results = asyncio.run(main())
+    assert len(encodings) == 2
+    assert len({id(encoded) for encoded in projections}) == 1 and len({id(encoded) for encoded in results}) == 1
+    assert b'"reviews"' not in projections[0].body and b'"reviews"' in results[0].body
+
+
+def test_unsaved_analysis_is_retried(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(8))
+    worker = JobWorker(manager, worker_id="worker", retry_delay=0)
+
+    async def failed_save(data_id, data_type, data):
+        return None
+
+    async def main():
+        try:
+            token = (await manager.get_full_analysis("place"))["token"]
+            manager.database.save_new_data = failed_save
+            await worker.run_job(await manager.database.lease_job(worker.worker_id, 60))
+            return await manager.database.get_job(token)
+        finally:
+            await manager.database.close()
+
+    job = asyncio.run(main())
+    assert job["status"] == "queued" and job["error"] == "Failed to save the full analysis of data_id place"
+    assert worker.completed == 0 and worker.retried == 1
+
+
+def test_progress_of_a_saved_analysis_without_job(tmp_path):
+    manager = make_manager(tmp_path, make_reviews(8))
+
+    async def main():
+        try:
+            await manager.database.save_new_data("place", "full", {"title": "Place"})
+            events = [progress async for progress in manager.stream_progress("place")]
+            try:
+                await anext(manager.stream_progress("unknown"))
+            except ValueError:
+                return events
+            raise AssertionError("the token should be invalid")
+        finally:
+            await manager.database.close()
+
+    assert asyncio.run(main()) == [{"stage": "completed"}]
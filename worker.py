@@ -0,0 +1,44 @@
+import asyncio
+import argparse
+import multiprocessing
+
+
+def run(concurrency: int) -> None:
+    """
+    Run job workers in this process until interrupted.
+
+    Args:
+        concurrency (int): The number of full analysis jobs run at once by this process.
+    """
+    # Build the task manager the same way the web server does
+    from app import manager
+
+    async def main():
+        await manager.database.connect()
+        await manager.start_workers(concurrency)
+        try:
+            await asyncio.gather(*[worker.task for worker in manager.workers])
+        finally:
+            await manager.shutdown()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run full analysis job workers next to the web server")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of jobs run at once by each process")
+    args = parser.parse_args()
+
+    processes = [multiprocessing.Process(target=run, args=(args.concurrency,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()